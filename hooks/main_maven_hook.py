@@ -4,7 +4,14 @@ from datetime import datetime
 from typing import List
 
 from ezyvet.data.models.hook_model import HookModel
-from ezyvet.data.models.voc_variables import EMPTY_STRING_VAL
+from ezyvet.data.models.voc_variables import (
+    EMPTY_STRING_VAL,
+    VOC_CUSTOM_REQUEST_DATE_COLUMN,
+)
+
+AUDIT_TRANSACTION_DATE = (
+    "TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ')"
+)
 
 
 class MainMavenHook(HookModel):
@@ -42,6 +49,27 @@ class MainMavenHook(HookModel):
 
         return "cdl_mavenlink"
 
+    def retrieve_arrow_fetch(self) -> bool:
+        """
+        Provides if the results should be fetched as arrow batches instead of rows
+
+        Returns:
+        - bool
+        """
+
+        return True
+
+    def retrieve_result_cacheable(self) -> bool:
+        """
+        Provides if the query result can be cached.
+        Only custom requests are cached, the daily query filters against the current time
+
+        Returns:
+        - bool
+        """
+
+        return self.custom_from != EMPTY_STRING_VAL and self.custom_to != EMPTY_STRING_VAL
+
     def retrieve_columns(self) -> List[str]:
         """
         Provides the column for the hook
@@ -78,6 +106,10 @@ class MainMavenHook(HookModel):
             'astatus."ͺAudit: Value"',
         ]
 
+        # custom requests also match on the audit date, it is needed to slice coalesced requests
+        if self.custom_from != EMPTY_STRING_VAL and self.custom_to != EMPTY_STRING_VAL:
+            columns.append(AUDIT_TRANSACTION_DATE)
+
         return columns
 
     def retrieve_snowflake_csvmap(self) -> dict:
@@ -117,10 +149,22 @@ class MainMavenHook(HookModel):
             "SURVEY_CONTACT_PHONE": "Phone",
             "'MAVENLINK'": "Record Origin",
             'astatus."ͺAudit: Value"': "Audit Status",
+            AUDIT_TRANSACTION_DATE: VOC_CUSTOM_REQUEST_DATE_COLUMN,
         }
 
         return mapping
 
+    def retrieve_custom_date_columns(self) -> List[str]:
+        """
+        Provides the csv columns that place a record inside the date range of a custom request.
+        A record belongs to a custom request if any of the columns is within its date range
+
+        Returns:
+        - List[str]
+        """
+
+        return ["Project Go Live date", VOC_CUSTOM_REQUEST_DATE_COLUMN]
+
     def retrieve_exclusions(self) -> List[str]:
         """
         Provides the exclusions for the query
@@ -128,15 +172,11 @@ class MainMavenHook(HookModel):
         Returns:
         - List[str]
         """
-        generated_date = datetime.now().date()
-        # Z timezone means UTC+0
-        currentutc_date = datetime.now(tz=pytz.timezone("UTC"))
-
         # check if there is value in from and to dates
         date_exclusion = "TRUE"
 
         if self.current_records():
-            current_record_hook = f"DATEDIFF(day, TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ'), '{currentutc_date}') = 0"
+            current_record_hook = "DATEDIFF(day, TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ'), :current_utc_date) = 0"
         else:
             current_record_hook = "TRUE"
 
@@ -159,23 +199,23 @@ class MainMavenHook(HookModel):
                 )
                 OR
                 (
-                    DATEDIFF(day, PROJECT_DUE_DATE, '{generated_date}') = {self.day_filter}
+                    DATEDIFF(day, PROJECT_DUE_DATE, :generated_date) = :day_filter
                     AND NOT LOWER(PROJECT_TYPE_OLD) LIKE '%fresh%'
                     AND NOT LOWER(PROJECT_TYPE_OLD) LIKE '%remote%'
                     AND LOWER(PROJECT_TYPE_OLD) NOT IN ('self implementation', 'other - no imp required')
                 )
             )"""
         else:
-            date_exclusion = f"""
+            date_exclusion = """
             (
                 (
-                    PROJECT_DUE_DATE >= '{self.custom_from}' AND PROJECT_DUE_DATE <= '{self.custom_to}'
+                    PROJECT_DUE_DATE >= :custom_from AND PROJECT_DUE_DATE <= :custom_to
                 ) OR (
-                    ALT_SURVEY_DATE >= '{self.custom_from}' AND ALT_SURVEY_DATE <= '{self.custom_to}'
+                    ALT_SURVEY_DATE >= :custom_from AND ALT_SURVEY_DATE <= :custom_to
                 ) OR (
-                    TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ') >= '{self.custom_from}'
+                    TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ') >= :custom_from
                     AND
-                    TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ') <= '{self.custom_to}'
+                    TO_DATE(astatus.\"ͺAudit: Transaction Datetime\",'YYYY-MM-DDTHH:MI:SSZ') <= :custom_to
                 )
             )
             """
@@ -188,9 +228,7 @@ class MainMavenHook(HookModel):
 
         # Check if there is a custom request against survey_date_logic
         if self.custom_from == EMPTY_STRING_VAL or self.custom_to == EMPTY_STRING_VAL:
-            survey_date_logic = (
-                f"DATEDIFF(day, ALT_SURVEY_DATE, '{generated_date}') = 0"
-            )
+            survey_date_logic = "DATEDIFF(day, ALT_SURVEY_DATE, :generated_date) = 0"
             default_exclusion_logic = " AND ".join(base_exclusions)
             filter_logic = [f"(({default_exclusion_logic}) OR ({survey_date_logic}))"]
         else:
@@ -203,6 +241,32 @@ class MainMavenHook(HookModel):
             "(LOWER(FEEDBACK_CALL_COMPLETED) != 'waived' OR FEEDBACK_CALL_COMPLETED IS NULL)",
         ]
 
+    def retrieve_query_params(self) -> dict:
+        """
+        Provides the values bound to the parameters of the query
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+        # Z timezone means UTC+0
+        currentutc_date = datetime.now(tz=pytz.timezone("UTC"))
+
+        params = super().retrieve_query_params()
+        params.update(
+            {
+                "generated_date": str(datetime.now().date()),
+                "current_utc_date": str(currentutc_date),
+                "day_filter": self.day_filter,
+                "custom_from": self.custom_from,
+                "custom_to": self.custom_to,
+            }
+        )
+
+        return params
+
     def retrieve_sap_id_column(self) -> str:
         """
         Provides the sap id column name for the query
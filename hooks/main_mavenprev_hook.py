@@ -11,14 +11,15 @@ class MainMavenPrevHook(MainMavenHook):
 
     def retrieve_exclusions(self) -> List[str]:
         """
-        Provides the exclusions for the query
+        Provides the exclusions for the query.
+        The failed records are looked up by their unique id
 
         Returns:
         - List[str]
         """
-        sap_ids = "'" + "','".join([str(x) for x in self.sap_ids if x]) + "'"
+        unique_ids = self.retrieve_unique_id_values()
         exclusions = [
-            f"SAP_ID in ({sap_ids})",
+            f"WORKSPACE_ID in {unique_ids}",
             "PROJECT_STATUS IN ('In Progress', 'Completed')",
             "PRODUCT != 'Test Projects'",
             "ARCHIVED = FALSE",
@@ -28,6 +29,32 @@ class MainMavenPrevHook(MainMavenHook):
 
         return exclusions
 
+    def retrieve_query_params(self) -> dict:
+        """
+        Provides the values bound to the parameters of the query.
+        The previous records are only filtered by the unique ids of the failed records
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+
+        return self.retrieve_unique_id_params()
+
+    def retrieve_result_cacheable(self) -> bool:
+        """
+        Provides if the query result can be cached.
+        The previous records are filtered by the unique ids of the failed records only,
+        the query doesn't depend on the current date
+
+        Returns:
+        - bool
+        """
+
+        return True
+
     def current_records(self) -> bool:
         """
         Returns if we're grabbing the current records.
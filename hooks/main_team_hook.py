@@ -40,6 +40,16 @@ class MainTeamHook(HookModel):
 
         return "cdl_teamwork"
 
+    def retrieve_arrow_fetch(self) -> bool:
+        """
+        Provides if the results should be fetched as arrow batches instead of rows
+
+        Returns:
+        - bool
+        """
+
+        return True
+
     def retrieve_columns(self) -> List[str]:
         """
         Provides the column for the hook
@@ -109,6 +119,17 @@ class MainTeamHook(HookModel):
 
         return mapping
 
+    def retrieve_custom_date_columns(self) -> List[str]:
+        """
+        Provides the csv columns that place a record inside the date range of a custom request.
+        A record belongs to a custom request if any of the columns is within its date range
+
+        Returns:
+        - List[str]
+        """
+
+        return ["Project Go Live date"]
+
     def retrieve_exclusions(self) -> List[str]:
         """
         Provides the exclusions for the query
@@ -116,14 +137,12 @@ class MainTeamHook(HookModel):
         Returns:
         - List[str]
         """
-        generated_date = datetime.now().date()
-
         # check if there is value in from and to dates
         date_exclusion = "TRUE"
         if self.custom_from == EMPTY_STRING_VAL or self.custom_to == EMPTY_STRING_VAL:
-            date_exclusion = f"DATEDIFF(day, main.MILESTONE_DEADLINE, '{generated_date}') = {self.day_filter}"
+            date_exclusion = "DATEDIFF(day, main.MILESTONE_DEADLINE, :generated_date) = :day_filter"
         else:
-            date_exclusion = f"main.MILESTONE_DEADLINE >= '{self.custom_from}' AND main.MILESTONE_DEADLINE <= '{self.custom_to}'"
+            date_exclusion = "main.MILESTONE_DEADLINE >= :custom_from AND main.MILESTONE_DEADLINE <= :custom_to"
 
         exclusions = [
             date_exclusion,
@@ -146,6 +165,28 @@ class MainTeamHook(HookModel):
 
         return exclusions
 
+    def retrieve_query_params(self) -> dict:
+        """
+        Provides the values bound to the parameters of the query
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+        params = super().retrieve_query_params()
+        params.update(
+            {
+                "generated_date": str(datetime.now().date()),
+                "day_filter": self.day_filter,
+                "custom_from": self.custom_from,
+                "custom_to": self.custom_to,
+            }
+        )
+
+        return params
+
     def retrieve_sap_id_column(self) -> str:
         """
         Provides the sap id column name for the query
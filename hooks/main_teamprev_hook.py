@@ -11,14 +11,15 @@ class MainTeamPrevHook(MainTeamHook):
 
     def retrieve_exclusions(self) -> List[str]:
         """
-        Provides the exclusions for the query
+        Provides the exclusions for the query.
+        The failed records are looked up by their unique id
 
         Returns:
         - List[str]
         """
-        sap_ids = "'" + "','".join([str(x) for x in self.sap_ids if x]) + "'"
+        unique_ids = self.retrieve_unique_id_values()
         exclusions = [
-            f"main.SAP_ID in ({sap_ids})",
+            f"main.PROJECT_ID in {unique_ids}",
             "main.MILESTONE_COMPLETED = TRUE",
             """(
                 LOWER(main.SUB_PRODUCT) LIKE '%conversion%'
@@ -37,3 +38,17 @@ class MainTeamPrevHook(MainTeamHook):
         ]
 
         return exclusions
+
+    def retrieve_query_params(self) -> dict:
+        """
+        Provides the values bound to the parameters of the query.
+        The previous records are only filtered by the unique ids of the failed records
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+
+        return self.retrieve_unique_id_params()
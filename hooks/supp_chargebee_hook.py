@@ -77,7 +77,7 @@ class SuppChargeBeeHook(HookModel):
         Returns:
         - List[str]
         """
-        sap_ids = "'" + "','".join([str(x) for x in self.sap_ids if x]) + "'"
+        sap_ids = self.retrieve_sap_id_values()
         ## SAP IS STRING
         exclusions = [
             "STATUS in ('active', 'future')",
@@ -85,7 +85,7 @@ class SuppChargeBeeHook(HookModel):
             "SAP != '0'",
             "SAP != '1'",
             "SAP != ''",
-            f"SAP in ({sap_ids})",
+            f"SAP in {sap_ids}",
         ]
 
         return exclusions
@@ -74,14 +74,14 @@ class SuppDxHook(HookModel):
         Returns:
         - List[str]
         """
-        sap_ids = "'" + "','".join([str(x) for x in self.sap_ids if x]) + "'"
+        sap_ids = self.retrieve_sap_id_values()
 
         # SHIP_SAP_NUMBER_CONVERSION IS INT
         exclusions = [
             "SHIP_SAP_NUMBER_CONVERSION IS NOT NULL",
             "SHIP_SAP_NUMBER_CONVERSION != 0",
             "SHIP_SAP_NUMBER_CONVERSION != 1",
-            f'"SHIP_SAP_NUMBER_CONVERSION" in ({sap_ids})',
+            f'"SHIP_SAP_NUMBER_CONVERSION" in {sap_ids}',
         ]
 
         return exclusions
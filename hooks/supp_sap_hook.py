@@ -83,14 +83,14 @@ class SuppSapHook(HookModel):
         Returns:
         - List[str]
         """
-        sap_ids = "'" + "','".join([str(x) for x in self.sap_ids if x]) + "'"
+        sap_ids = self.retrieve_sap_id_values()
         # SAP Customer ID Conversion IS INT
         exclusions = [
             '"SAP Customer ID Conversion" IS NOT NULL',
             '"SAP Customer ID Conversion" != 0',
             '"SAP Customer ID Conversion" != 1',
             '"Marked For Deletion Flag" is NULL',
-            f'"SAP Customer ID Conversion" in ({sap_ids})',
+            f'"SAP Customer ID Conversion" in {sap_ids}',
         ]
 
         return exclusions
@@ -83,19 +83,31 @@ class SuppVDCHook(HookModel):
         Returns:
         - List[str]
         """
-        sap_ids = "'" + "','".join([str(x) for x in self.sap_ids if x]) + "'"
+        sap_ids = self.retrieve_sap_id_values()
         # SAP_ID IS STRING
         exclusions = [
             "SAP_ID IS NOT NULL",
             "SAP_ID != '0'",
             "SAP_ID != '1'",
             "SAP_ID != ''",
-            f"SAP_ID in ({sap_ids})",
-            "ROLE_IN_TERRITORY = 'VDC'",
+            f"SAP_ID in {sap_ids}",
         ]
 
         return exclusions
 
+    def retrieve_fusion_filter(self) -> dict:
+        """
+        Provides the filter that separates the hook from other hooks on the same table.
+
+        Syntax:
+        {"SNOWFLAKE COLUMN": "VALUE"}
+
+        Returns:
+        - dict
+        """
+
+        return {"ROLE_IN_TERRITORY": "VDC"}
+
     def retrieve_sap_id_column(self) -> str:
         """
         Provides the sap id column name for the query
@@ -1,14 +1,18 @@
-import copy
-import math
+import numpy as np
 import pandas as pd
+import re
 
 from logging import Logger
+from typing import Optional
 
 from ezyvet.data.models.voc_variables import (
     TOUCHPOINT_DEFAULT_VALUE,
     ROLE_DEFAULT_VALUE,
+    USER_BRACKET_TABLE,
 )
 from ezyvet.data.models.voc_maps import IMPLEMENTER_REGION_DICT, REGION_DICT
+from ezyvet.data.tools.bracket_binner import BracketBinner
+from ezyvet.data.tools.column_fixer import ColumnFixer
 
 
 class ComputeFields:
@@ -38,195 +42,220 @@ class ComputeFields:
         Returns:
         - DataFrame
         """
-        temp_frame = copy.deepcopy(raw_frame)
+        # the frames passed in memory keep NaN while the stored frames come back with None,
+        # the missing values are the same in both so the computed fields don't depend on the execution mode
+        temp_frame = ColumnFixer(self.logger).fix_missing_values(raw_frame.copy())
 
         self.logger.info(raw_frame)
         self.logger.info(temp_frame)
 
-        # create an instance of the columns and make it to None instead of Nan
-        temp_frame["Account Name - SAP ID"] = ""
-        temp_frame["Touchpoint"] = ""
-        temp_frame["Customer Tier"] = ""
-        temp_frame["Role"] = ""
-        temp_frame["Region"] = ""
-        temp_frame["Locale"] = ""
-
-        for index, row in temp_frame.iterrows():
-            # generate account name:
-            if row["sap_account_name"]:
-                temp_frame.loc[index, "Account Name - SAP ID"] = (
-                    row["sap_account_name"] + "-" + str(row["SAP ID"])
-                )
-            else:
-                temp_frame.loc[index, "Account Name - SAP ID"] = (
-                    "SAP_ACCOUNT_NAME_NOT_FOUND" + "-" + str(row["SAP ID"])
-                )
-
-            # generate touchpoint:
-            temp_frame.loc[index, "Touchpoint"] = TOUCHPOINT_DEFAULT_VALUE
-
-            # generate customer tier:
-            if not row["Group"]:
-                tier = "Individual"
-            else:
-                tier = "Enterprise"
-
-            if not row["Country"]:
-                temp_frame.loc[index, "Country"] = "XX"
-
-            temp_frame.loc[index, "Customer Tier"] = tier
-
-            # generate role:
-            temp_frame.loc[index, "Role"] = ROLE_DEFAULT_VALUE
-
-            # generate region
-            temp_frame.loc[index, "Region"] = self.generate_region(
-                row["Region Country"]
-            )
-
-            # generate locale:
-            temp_frame.loc[index, "Locale"] = self.generate_locale(
-                temp_frame.loc[index, "Region"]
-            )
-
-            # generate implementer office base:
-            if not row["Implementer Office Base"]:
+        # generate account name:
+        sap_ids = temp_frame["SAP ID"].astype(str)
+        account_names = temp_frame["sap_account_name"].where(
+            self.is_truthy(temp_frame["sap_account_name"])
+            & temp_frame["sap_account_name"].notnull(),
+            "SAP_ACCOUNT_NAME_NOT_FOUND",
+        )
+        temp_frame["Account Name - SAP ID"] = account_names + "-" + sap_ids
+
+        # generate touchpoint:
+        temp_frame["Touchpoint"] = TOUCHPOINT_DEFAULT_VALUE
+
+        # generate customer tier:
+        temp_frame["Customer Tier"] = np.select(
+            [self.is_truthy(temp_frame["Group"])], ["Enterprise"], "Individual"
+        )
+
+        self.fill_falsy_values(
+            temp_frame, "Country", pd.Series("XX", index=temp_frame.index)
+        )
+
+        # generate role:
+        temp_frame["Role"] = ROLE_DEFAULT_VALUE
+
+        # generate region
+        temp_frame["Region"] = self.generate_region(temp_frame["Region Country"])
+
+        # generate locale:
+        temp_frame["Locale"] = self.generate_locale(temp_frame["Region"])
+
+        # generate implementer office base:
+        self.fill_falsy_values(
+            temp_frame,
+            "Implementer Office Base",
+            self.generate_implementer_office_base(temp_frame["Team Lead / PM"]),
+        )
+
+        # generate converted from if it doesnt exist. row is probably from teamwork
+        guessConvertedFrom = temp_frame["Project Name"].str.extract(
+            r"Conversion - (.*?)(?=\)|Conversion - |\Z)", flags=re.DOTALL, expand=False
+        )
+        self.fill_falsy_values(
+            temp_frame,
+            "Converted From",
+            guessConvertedFrom,
+            guessConvertedFrom.notnull(),
+        )
+
+        # generate the user bracket if team usercount exists and it is not empty
+        if "Team UserCount" in temp_frame.columns:
+            user_counts = temp_frame.loc[
+                temp_frame["Team UserCount"].notnull(), "Team UserCount"
+            ]
+            if not user_counts.empty:
                 temp_frame.loc[
-                    index, "Implementer Office Base"
-                ] = self.generate_implementer_office_base(
-                    temp_frame.loc[index, "Team Lead / PM"]
-                )
-
-            # generate converted from if it doesnt exist. row is probably from teamwork
-            if not row["Converted From"]:
-                if "Conversion - " in row["Project Name"]:
-                    guessConvertedFrom = (
-                        row["Project Name"].split("Conversion - ")[1].split(")")[0]
-                    )
-                    temp_frame.loc[index, "Converted From"] = guessConvertedFrom
-
-            # generate the user bracket if team usercount exists and it is not empty
-            if "Team UserCount" in temp_frame.columns:
-                if not pd.isnull(temp_frame.loc[index, "Team UserCount"]):
-                    temp_frame.loc[index, "User Bracket"] = self.generate_user_bracket(
-                        row["Team UserCount"]
-                    )
-
-            ## Recomputation of data to fix issues in Teamwork Data Pull
-            # recompute the product if the value is MISC and if the project name contains Conversion - Cornerstone
-            if row["Product"]:
-                if (
-                    "MISC" in row["Product"]
-                    and "Conversion - Cornerstone" in row["Project Name"]
-                ):
-                    temp_frame.loc[index, "Product"] = "Cornerstone"
-
-            # recompute the project type if the value is MISC and if the project name contains Conversion - Cornerstone
-            if row["Project Type"]:
-                if (
-                    "MISC" in row["Project Type"]
-                    and "Conversion - Cornerstone" in row["Project Name"]
-                ):
-                    temp_frame.loc[
-                        index, "Project Type"
-                    ] = "Cornerstone Conversion / Fresh"
+                    user_counts.index, "User Bracket"
+                ] = self.generate_user_bracket(user_counts)
+
+        ## Recomputation of data to fix issues in Teamwork Data Pull
+        cornerstone_conversion = temp_frame["Project Name"].str.contains(
+            "Conversion - Cornerstone", regex=False, na=False
+        )
+
+        # recompute the product if the value is MISC and if the project name contains Conversion - Cornerstone
+        self.replace_misc_values(
+            temp_frame, "Product", "Cornerstone", cornerstone_conversion
+        )
+
+        # recompute the project type if the value is MISC and if the project name contains Conversion - Cornerstone
+        self.replace_misc_values(
+            temp_frame,
+            "Project Type",
+            "Cornerstone Conversion / Fresh",
+            cornerstone_conversion,
+        )
 
         self.logger.debug(temp_frame)
 
         return temp_frame
 
-    def generate_user_bracket(self, user_count: str) -> str:
+    def is_truthy(self, values: pd.Series) -> pd.Series:
+        """
+        Returns the python truthiness of each value.
+        None and empty strings are falsy while NaN is truthy, same as a python if statement
+
+        Args:
+        - values (Series): values to be checked
+
+        Returns:
+        - Series
+        """
+
+        return values.astype(object).astype(bool)
+
+    def fill_falsy_values(
+        self,
+        frame: pd.DataFrame,
+        column: str,
+        values: pd.Series,
+        condition: Optional[pd.Series] = None,
+    ) -> None:
+        """
+        Replaces the falsy values of the column with the provided values
+
+        Args:
+        - frame (DataFrame): frame to be updated
+        - column (str): column to be filled
+        - values (Series): values to fill the column with
+        - condition (Series): additional condition the rows have to meet to be filled
+
+        Returns:
+        - None
+        """
+        mask = ~self.is_truthy(frame[column])
+        if condition is not None:
+            mask &= condition
+
+        if mask.any():
+            frame.loc[mask, column] = values[mask]
+
+    def replace_misc_values(
+        self,
+        frame: pd.DataFrame,
+        column: str,
+        value: str,
+        cornerstone_conversion: pd.Series,
+    ) -> None:
+        """
+        Replaces the MISC values of the column for cornerstone conversion projects
+
+        Args:
+        - frame (DataFrame): frame to be updated
+        - column (str): column to be fixed
+        - value (str): value that will replace MISC
+        - cornerstone_conversion (Series): rows where the project name contains Conversion - Cornerstone
+
+        Returns:
+        - None
+        """
+        mask = (
+            self.is_truthy(frame[column])
+            & frame[column].str.contains("MISC", regex=False, na=False)
+            & cornerstone_conversion
+        )
+
+        if mask.any():
+            frame.loc[mask, column] = value
+
+    def generate_user_bracket(self, user_counts: pd.Series) -> pd.Series:
         """
         Generates the user bracket if able to
 
         Args:
-        - user_count (str): user count taken from teamwork
+        - user_counts (Series): user counts taken from teamwork
 
         Returns:
-        - str
-        """
-
-        try:
-            # try to cast the user count into integer
-            conv_int = int(user_count)
-
-            # if the casting is successful, continue with the if else maze to map the bracket.
-            if conv_int < 1:
-                raise ValueError("User Count has to be at least 1")
-            elif conv_int == 1:
-                return "1"
-            elif conv_int < 10:
-                return "2-9"
-            elif conv_int < 20:
-                return "10-19"
-            elif conv_int < 30:
-                return "20-29"
-            elif conv_int < 50:
-                return "30-49"
-            elif conv_int < 75:
-                return "50-74"
-            elif conv_int >= 750:
-                # we want to have 750+ be a catch all
-                return "750+"
-            else:
-                roundedDown = math.floor(conv_int / 25)
-                minValueRange = roundedDown * 25
-                maxValueRange = ((roundedDown + 1) * 25) - 1
-                return f"{minValueRange}-{maxValueRange}"
-
-        except Exception as e:
-            self.logger.info(
-                f"""Cannot Determine User Bracket. Original Value: {user_count}
-Error: {e}"""
-            )
-            return ""
-
-    def generate_implementer_office_base(self, team_lead: str) -> str:
+        - Series
+        """
+        binner = BracketBinner(self.logger)
+
+        return binner.bin_values(user_counts, USER_BRACKET_TABLE, "User")
+
+    def generate_implementer_office_base(self, team_leads: pd.Series) -> pd.Series:
         """
         Generates the implementer office base
 
         Args:
-        - team_lead (str): team lead of the record
+        - team_leads (Series): team lead of the records
 
         Returns:
-        - str
+        - Series
         """
 
-        if team_lead:
-            ##implementer dictionary:
-            impl_dict = IMPLEMENTER_REGION_DICT
-            return impl_dict.get(team_lead, "NA")
+        ##implementer dictionary:
+        impl_dict = IMPLEMENTER_REGION_DICT
+        office_bases = team_leads.map(impl_dict).fillna("NA")
 
-        return ""
+        return office_bases.where(self.is_truthy(team_leads), "")
 
-    def generate_locale(self, country: str) -> str:
+    def generate_locale(self, countries: pd.Series) -> pd.Series:
         """
         Generates the locale for the client
 
         Args:
-        - country (str): country of the record
+        - countries (Series): country of the records
 
         Returns:
-        - str
+        - Series
         """
 
         ##country dictionary:
         ##locale_dict = LOCALE_DICT
-        ##return locale_dict.get(country, "en_US")
+        ##return countries.map(locale_dict).fillna("en_US")
 
         ## As per discussion in teams, locale triggers branching which we dont need at the moment
-        return "en_US"
+        return pd.Series("en_US", index=countries.index)
 
-    def generate_region(self, country: str) -> str:
+    def generate_region(self, countries: pd.Series) -> pd.Series:
         """
         Generates the region for the client
 
         Args:
-        - country (str): country of the record
+        - countries (Series): country of the records
 
         Returns:
-        - str
+        - Series
         """
         region_dict = REGION_DICT
 
-        return region_dict.get(country, "EMEA")
+        return countries.map(region_dict).fillna("EMEA")
@@ -0,0 +1,156 @@
+import json
+import re
+
+from datetime import datetime, timedelta
+from logging import Logger
+from s3fs import S3FileSystem
+from typing import Dict, List, Optional
+
+from ezyvet.data.logic.file_handler import FileHandler
+from ezyvet.data.models.custom_request import customrequest
+from ezyvet.data.models.voc_variables import (
+    BUCKET,
+    DEFAULT_FILE_PATH,
+    EMPTY_STRING_VAL,
+    INTEGRATION_NAME,
+)
+
+
+class CustomRequestManifest:
+    """
+    A class that keeps the manifest of the accomplished custom requests in s3.
+
+    The manifest maps each accomplished request to the keys uploaded for it,
+    so checking the open requests is a single read instead of listing the custom request folders
+    """
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the CustomRequestManifest class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+        self.folder = f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{customrequest.FOLDER}"
+        self.path = f"{self.folder}/{customrequest.MANIFEST}"
+
+    def read_manifest(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Returns the manifest. Returns None if the manifest doesn't exist or can't be read
+
+        Returns:
+        - Optional[Dict[str, List[str]]]
+        """
+        try:
+            if not S3FileSystem().exists(self.path):
+                self.logger.info(f"{self.path} doesn't exist yet")
+                return None
+
+            with S3FileSystem().open(self.path, "r") as fs:
+                return json.load(fs)
+        except Exception as e:
+            self.logger.exception("Error occured while reading file")
+            self.logger.exception(e)
+            self.logger.exception(self.path)
+
+        return None
+
+    def upload_manifest(self, manifest: Dict[str, List[str]]):
+        """
+        Uploads the manifest to s3
+
+        Args:
+        - manifest (Dict[str, List[str]]): accomplished requests and their keys
+        """
+        try:
+            with S3FileSystem().open(self.path, "w") as fs:
+                json.dump(manifest, fs, indent=2, sort_keys=True)
+        except Exception as e:
+            self.logger.exception("Error occured while uploading file")
+            self.logger.exception(e)
+            self.logger.exception(self.path)
+
+    def rebuild_manifest(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Rebuilds the manifest from the files uploaded in the custom request folders of the recent days and uploads it.
+        Returns None if s3 can't be listed
+
+        Returns:
+        - Optional[Dict[str, List[str]]]
+        """
+        fh = FileHandler(self.logger)
+        files: List[str] = []
+        i = 0
+
+        try:
+            while i <= (customrequest.DATE_RANGE + 1):
+                date_finder = (datetime.now() - timedelta(days=i)).date()
+                files += S3FileSystem().find(
+                    fh.dynamic_folderpath_generator(date_finder, self.folder)
+                )
+                i += 1
+        except Exception as e:
+            self.logger.info("Failed to connect to s3. Skipping step")
+            self.logger.info(e)
+            return None
+
+        manifest: Dict[str, List[str]] = {}
+        for filepath in files:
+            temp_filename = filepath.split("/")[len(filepath.split("/")) - 1]
+
+            if temp_filename == "":
+                continue
+            request = re.sub("[aA-zZ]{1,}_", "", temp_filename.split(".")[0])
+            manifest.setdefault(request, []).append(
+                filepath.replace(f"{BUCKET}/", "", 1)
+            )
+
+        self.logger.info(f"Rebuilt the manifest with {len(manifest)} requests")
+        self.upload_manifest(manifest)
+
+        return manifest
+
+    def retrieve_manifest(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Returns the manifest, it is rebuilt from the listing if it is missing.
+        Returns None if neither is available
+
+        Returns:
+        - Optional[Dict[str, List[str]]]
+        """
+        manifest = self.read_manifest()
+
+        if manifest is None:
+            manifest = self.rebuild_manifest()
+
+        return manifest
+
+    def record_uploads(self, custom_filename: str, keys: List[str]):
+        """
+        Records the keys uploaded for the request in the manifest with a single upload.
+        Empty keys are skipped and nothing is recorded if every key is empty
+
+        Args:
+        - custom_filename (str): request that was accomplished
+        - keys (List[str]): keys of the uploaded files
+        """
+        uploaded_keys = [key for key in keys if key != EMPTY_STRING_VAL]
+
+        if not uploaded_keys:
+            return None
+
+        manifest = self.retrieve_manifest()
+
+        if manifest is None:
+            manifest = {}
+
+        recorded_keys = manifest.setdefault(custom_filename, [])
+        for key in uploaded_keys:
+            if key not in recorded_keys:
+                recorded_keys.append(key)
+
+        self.upload_manifest(manifest)
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+from logging import Logger
+from sqlalchemy.engine import Engine
+from typing import Dict, Tuple
+
+from ezyvet.data.models.hook_model import HookModel
+from ezyvet.data.models.voc_variables import (
+    SNOWFLAKE_ENGINE_IDLE_TIMEOUT,
+    SNOWFLAKE_POOL_MAX_OVERFLOW,
+    SNOWFLAKE_POOL_SIZE,
+)
+
+
+class SnowflakeEngineCache:
+    """
+    A class that shares the sqlalchemy engines between hooks with the same connection details.
+
+    The engines are stored on the class so every instance in the process uses the same pool.
+    """
+
+    _engines: Dict[Tuple[str, str, str], Engine] = {}
+    _last_used: Dict[Tuple[str, str, str], float] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the SnowflakeEngineCache class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+
+    def retrieve_engine_key(self, hook: HookModel) -> Tuple[str, str, str]:
+        """
+        Provides the key used to share the engine between hooks
+
+        Args:
+        - hook (HookModel): holds the connection id, database and schema
+
+        Returns:
+        - Tuple[str, str, str]
+        """
+
+        return (
+            hook.retrieve_conn_id(),
+            hook.retrieve_database(),
+            hook.retrieve_schema(),
+        )
+
+    def retrieve_engine(self, hook: HookModel) -> Engine:
+        """
+        Returns the pooled engine for the hook, creating it if it doesn't exist yet
+
+        Args:
+        - hook (HookModel): holds the connection id, database and schema
+
+        Returns:
+        - Engine
+        """
+        key = self.retrieve_engine_key(hook)
+
+        with self._lock:
+            self.evict_idle_engines()
+
+            engine = self._engines.get(key)
+            if engine is None:
+                self.logger.info(f"Creating snowflake engine for {key}")
+                alchemy_hook = SnowflakeHook(
+                    snowflake_conn_id=key[0],
+                    database=key[1],
+                    schema=key[2],
+                )
+                engine = alchemy_hook.get_sqlalchemy_engine(
+                    engine_kwargs={
+                        "pool_size": SNOWFLAKE_POOL_SIZE,
+                        "max_overflow": SNOWFLAKE_POOL_MAX_OVERFLOW,
+                        "pool_recycle": SNOWFLAKE_ENGINE_IDLE_TIMEOUT,
+                        "pool_pre_ping": True,
+                    }
+                )
+                self._engines[key] = engine
+
+            self._last_used[key] = time.monotonic()
+
+        return engine
+
+    def evict_idle_engines(self) -> None:
+        """
+        Disposes the engines that have not been used within the idle timeout.
+        The caller is expected to hold the lock
+
+        Returns:
+        - None
+        """
+        current_time = time.monotonic()
+        idle_keys = [
+            key
+            for key, last_used in self._last_used.items()
+            if current_time - last_used > SNOWFLAKE_ENGINE_IDLE_TIMEOUT
+        ]
+
+        for key in idle_keys:
+            self.logger.info(f"Disposing idle snowflake engine for {key}")
+            self._engines.pop(key).dispose()
+            self._last_used.pop(key)
+
+    def dispose_engines(self) -> None:
+        """
+        Disposes all of the cached engines. Should be called when the task is done with snowflake
+
+        Returns:
+        - None
+        """
+        with self._lock:
+            for key, engine in self._engines.items():
+                self.logger.info(f"Disposing snowflake engine for {key}")
+                engine.dispose()
+
+            self._engines.clear()
+            self._last_used.clear()
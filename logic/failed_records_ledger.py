@@ -0,0 +1,151 @@
+import datetime as dt
+import pandas as pd
+
+from logging import Logger
+from s3fs import S3FileSystem
+
+from ezyvet.data.logic.file_handler import FileHandler
+from ezyvet.data.models.voc_variables import (
+    BUCKET,
+    DEFAULT_FILE_PATH,
+    FAILED_LEDGER_FILENAME,
+    FAILED_LEDGER_FOLDER,
+    FAILED_LEDGER_RETENTION_DAYS,
+    INTEGRATION_NAME,
+    OLD_COMPARISON_COLUMNS,
+    VOC_JOIN_UNIQUE_ID,
+)
+from ezyvet.data.tools.column_fixer import ColumnFixer
+from ezyvet.data.tools.record_key_index import RecordKeyIndex
+
+
+class FailedRecordsLedger:
+    """
+    A class that keeps the rolling ledger of the failed records in s3.
+
+    Failed records stay in the ledger until they are valid or haven't been seen for FAILED_LEDGER_RETENTION_DAYS
+    """
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the FailedRecordsLedger class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+        self.path = f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{FAILED_LEDGER_FOLDER}/{FAILED_LEDGER_FILENAME}"
+
+    def read_ledger(self) -> pd.DataFrame:
+        """
+        Returns the failed records ledger. Returns an empty frame if the ledger doesn't exist yet
+
+        Returns:
+        - pd.DataFrame
+        """
+        # the ledger doesn't exist until the first run uploads it
+        if not S3FileSystem().exists(self.path):
+            self.logger.info(f"Failed records ledger doesn't exist yet {self.path}")
+            return pd.DataFrame()
+
+        fh = FileHandler(self.logger)
+
+        return fh.read_parquetfile_to_frame(self.path)
+
+    def hash_keys(self, frame: pd.DataFrame) -> pd.Series:
+        """
+        Returns the key of each record, the unique id is compared without decimals
+
+        Args:
+        - frame (pd.DataFrame): frame to be hashed
+
+        Returns:
+        - pd.Series
+        """
+        fixer = ColumnFixer(self.logger)
+        key_frame = fixer.fix_column_remove_decimals(
+            frame[OLD_COMPARISON_COLUMNS].copy(), VOC_JOIN_UNIQUE_ID
+        )
+
+        return RecordKeyIndex(self.logger, OLD_COMPARISON_COLUMNS).hash_keys(key_frame)
+
+    def update_ledger(
+        self,
+        invalid_frame: pd.DataFrame,
+        processed_frame: pd.DataFrame,
+        current_date: dt.date,
+    ) -> pd.DataFrame:
+        """
+        Updates the ledger with the failed records of the current execution and uploads it to s3
+
+        Records processed in the current execution that are no longer invalid are removed.
+        Records that failed again keep their first seen date. Their attempts are increased once per day,
+        so retries and reruns on the same day don't count as another attempt
+
+        Args:
+        - invalid_frame (pd.DataFrame): failed records of the current execution
+        - processed_frame (pd.DataFrame): every record processed in the current execution
+        - current_date (dt.date): date of the current execution
+
+        Returns:
+        - pd.DataFrame
+        """
+        current_timestamp = pd.Timestamp(current_date)
+        ledger = self.read_ledger()
+
+        failed_records = invalid_frame.copy()
+        failed_keys = self.hash_keys(failed_records)
+
+        # keep a single entry per failed record
+        failed_records = failed_records[~failed_keys.duplicated()]
+        failed_keys = failed_keys[~failed_keys.duplicated()]
+
+        failed_records["First Seen"] = current_timestamp
+        failed_records["Last Seen"] = current_timestamp
+        failed_records["Attempts"] = 1
+
+        remaining_records = pd.DataFrame()
+        if not ledger.empty:
+            ledger_keys = self.hash_keys(ledger)
+            processed_keys = self.hash_keys(processed_frame)
+
+            resolved = ledger_keys.isin(processed_keys) & ~ledger_keys.isin(failed_keys)
+            expired = ledger["Last Seen"] < current_timestamp - pd.Timedelta(
+                days=FAILED_LEDGER_RETENTION_DAYS
+            )
+
+            self.logger.info(
+                f"Removing {resolved.sum()} resolved and {(expired & ~resolved).sum()} expired failed records"
+            )
+
+            ledger = ledger[~resolved & ~expired]
+            ledger_keys = ledger_keys[~resolved & ~expired]
+
+            # carry over the history of the records that failed again
+            history = ledger.set_index(ledger_keys)
+            repeated = failed_keys.isin(history.index)
+            failed_records.loc[repeated, "First Seen"] = failed_keys[repeated].map(
+                history["First Seen"]
+            )
+            seen_before = (
+                failed_keys[repeated].map(history["Last Seen"]) < current_timestamp
+            )
+            failed_records.loc[repeated, "Attempts"] = failed_keys[repeated].map(
+                history["Attempts"]
+            ) + seen_before.astype(int)
+
+            remaining_records = ledger[~ledger_keys.isin(failed_keys)]
+
+        updated_ledger = pd.concat(
+            [remaining_records, failed_records], ignore_index=True
+        )
+
+        self.logger.info(f"Failed records ledger has {len(updated_ledger.index)} records")
+
+        fh = FileHandler(self.logger)
+        fh.upload_frame_to_parquet(self.path, updated_ledger)
+
+        return updated_ledger
@@ -1,15 +1,19 @@
 import pandas as pd
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
 from s3fs import S3FileSystem
-from typing import List
+from typing import Iterable, List, Optional, Tuple
 
 from ezyvet.data.logic.frame_holder import FrameHolder
 from ezyvet.data.models.voc_variables import (
     BUCKET,
+    CONSOLIDATION_MAX_WORKERS,
     DEFAULT_FILE_PATH,
     EMPTY_STRING_VAL,
     INTEGRATION_NAME,
+    VOC_CONSOLIDATION_WINDOW_DAYS,
+    VOC_FILE_FORMATS,
     VOC_NA_VALUES,
 )
 
@@ -21,10 +25,144 @@ class FileHandler:
 
     def __init__(self, logger: Logger):
         self.logger = logger
+        self.readers = {
+            "csv": self.read_csvfile_to_frame,
+            "csv.gz": self.read_csvfile_to_frame,
+            "parquet": self.read_parquetfile_to_frame,
+        }
+        self.uploaders = {
+            "csv": self.upload_frame_to_csv,
+            "csv.gz": self.upload_frame_to_compressed_csv,
+            "parquet": self.upload_frame_to_parquet,
+        }
+
+    def read_file_to_frame(self, path: str, file_format: str = "csv") -> pd.DataFrame:
+        """
+        Reads the file with the reader of the format and returns DataFrame
+
+        Args:
+        - path (str): path of the file
+        - file_format (str): format of the file, one of VOC_FILE_FORMATS. Default is csv
+
+        Returns:
+        - pd.DataFrame
+        """
+
+        return self.readers[file_format](path)
+
+    def upload_frame(
+        self, path: str, frame: pd.DataFrame, file_format: str = "csv"
+    ) -> bool:
+        """
+        Uploads the dataframe with the uploader of the format to provided s3 path and returns if it was uploaded
+
+        Args:
+        - path (str): upload path of the file
+        - frame (pd.DataFrame): dataframe to be uploaded
+        - file_format (str): format of the file, one of VOC_FILE_FORMATS. Default is csv
+
+        Returns:
+        - bool
+        """
+
+        return self.uploaders[file_format](path, frame)
+
+    def upload_chunks(
+        self, path: str, chunks: Iterable[pd.DataFrame], file_format: str = "csv"
+    ) -> bool:
+        """
+        Uploads the chunks as a single file to provided s3 path. Returns if any records were uploaded.
+        Csv files are appended chunk by chunk, other formats need every chunk at once.
+        Nothing is uploaded if every chunk is empty and the partial file is removed if the upload fails
+
+        Args:
+        - path (str): upload path of the file
+        - chunks (Iterable[pd.DataFrame]): chunks to be uploaded, with the same columns
+        - file_format (str): format of the file, one of VOC_FILE_FORMATS. Default is csv
+
+        Returns:
+        - bool
+        """
+        if file_format not in ["csv", "csv.gz"]:
+            frames = [chunk for chunk in chunks if not chunk.empty]
+
+            if not frames:
+                return False
+
+            return self.upload_frame(
+                path, pd.concat(frames, ignore_index=True), file_format
+            )
+
+        # each compressed chunk is a gzip member, the members are read as a single file
+        compression = "gzip" if file_format == "csv.gz" else None
+        columns: Optional[List[str]] = None
+        fs = None
+        uploaded = True
+
+        try:
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+
+                # the header is only written with the first chunk
+                header = fs is None
+                if header:
+                    fs = S3FileSystem().open(path, "wb")
+                    columns = chunk.columns.to_list()
+
+                chunk.reindex(columns=columns).to_csv(
+                    fs, index=False, header=header, compression=compression
+                )
+        except Exception as e:
+            self.logger.exception("Error occured while uploading file")
+            self.logger.exception(e)
+            self.logger.exception(path)
+            uploaded = False
+        finally:
+            if fs is not None:
+                fs.close()
+
+        if not uploaded:
+            self.remove_partial_file(path)
+            return False
+
+        return fs is not None
+
+    def remove_partial_file(self, path: str) -> None:
+        """
+        Removes the file left behind by a failed upload so it isn't taken as uploaded
+
+        Args:
+        - path (str): upload path of the file
+
+        Returns:
+        - None
+        """
+        try:
+            if S3FileSystem().exists(path):
+                S3FileSystem().rm(path)
+        except Exception as e:
+            self.logger.exception("Error occured while removing files")
+            self.logger.exception(e)
+            self.logger.exception(path)
+
+    def retrieve_file_extension(self, file_format: str) -> str:
+        """
+        Returns the file extension of the format
+
+        Args:
+        - file_format (str): format of the file, one of VOC_FILE_FORMATS
+
+        Returns:
+        - str
+        """
+
+        return VOC_FILE_FORMATS[file_format]
 
     def read_csvfile_to_frame(self, path: str) -> pd.DataFrame:
         """
-        Reads csv file and returns DataFrame
+        Reads csv file and returns DataFrame.
+        Compressed csv files are decompressed based from their file extension
 
         Args:
         - path (str): path of the csv
@@ -45,6 +183,28 @@ class FileHandler:
 
         return frame
 
+    def read_parquetfile_to_frame(self, path: str) -> pd.DataFrame:
+        """
+        Reads parquet file and returns DataFrame
+
+        Args:
+        - path (str): path of the parquet file
+
+        Returns:
+        - pd.DataFrame
+        """
+
+        frame = pd.DataFrame()
+        try:
+            with S3FileSystem().open(path, "rb") as fs:
+                frame = pd.read_parquet(fs)
+        except Exception as e:
+            self.logger.exception("Error occured while reading file")
+            self.logger.exception(e)
+            self.logger.exception(path)
+
+        return frame
+
     def consolidate_dataframe(
         self,
         current_day: int,
@@ -52,11 +212,14 @@ class FileHandler:
         prefix: str,
         file_paths: List[str] = [],
         to_date: dt.date = dt.datetime.now(),
+        file_format: str = "csv",
+        max_workers: int = CONSOLIDATION_MAX_WORKERS,
     ) -> pd.DataFrame:
         """
         Returns the consolidated dataframe based from the daterange provided.
 
-        Consolidation only happens on Tuesdays and Thursdays for Reporting
+        Consolidation only happens on Tuesdays and Thursdays for Reporting.
+        The files are read concurrently and the missing days are reported
 
         Args:
         - current_day (int): Day of the week in integer (0 - Sunday)
@@ -64,6 +227,8 @@ class FileHandler:
         - prefix (str): contains the prefix to be used by the consolidation logic
         - file_paths (List[str]): file paths to be consolidated
         - to_date (dt.date): The last day included in the consolidated file. Default uses the current date
+        - file_format (str): format of the files to be consolidated. Days without it fall back to csv
+        - max_workers (int): number of files read at the same time. 1 reads the files sequentially
 
         Returns:
         - pd.DataFrame
@@ -71,24 +236,24 @@ class FileHandler:
 
         lim = 0
 
-        if current_day == 1:
-            lim = 5
-        elif current_day == 3:
-            lim = 2
+        if current_day in VOC_CONSOLIDATION_WINDOW_DAYS:
+            lim = VOC_CONSOLIDATION_WINDOW_DAYS[current_day]
         else:
             message = "Current day is not included in mapping."
             self.logger.exception(message)
             exit(1)
 
         i = 0
-        consolidated_frame = pd.DataFrame()
+        file_paths = list(file_paths)
 
         # check if we have provided the filepaths in the function already
         if len(file_paths) == 0:
             # generate the file path of the previous executions
             while i < lim:
                 date_loop = (to_date - dt.timedelta(days=i)).date()
-                filename = self.dynamic_filename_generator(prefix, date_loop)
+                filename = self.dynamic_filename_generator(
+                    prefix, date_loop, self.retrieve_file_extension(file_format)
+                )
                 dynamic_path = self.dynamic_folderpath_generator(date_loop)
                 key = (
                     f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{dynamic_path}/{filename}"
@@ -96,14 +261,42 @@ class FileHandler:
                 file_paths.append(f"s3://{BUCKET}/{key}")
                 i += 1
 
-        # read and consolidate the files to a singular dataframe
-        for individual_path in file_paths:
-            reader = self.read_csvfile_to_frame(individual_path)
-            consolidated_frame = pd.concat(
-                [consolidated_frame, reader],
-                ignore_index=True,
+        # read the files of each day, missing days are returned as None
+        if max_workers <= 1:
+            frames = [
+                self.read_daily_file(individual_path, file_format)
+                for individual_path in file_paths
+            ]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(file_paths))
+            ) as executor:
+                # map returns the frames in the order of the paths, not by completion
+                frames = list(
+                    executor.map(
+                        lambda individual_path: self.read_daily_file(
+                            individual_path, file_format
+                        ),
+                        file_paths,
+                    )
+                )
+
+        missing_paths = [
+            individual_path
+            for individual_path, frame in zip(file_paths, frames)
+            if frame is None
+        ]
+        if missing_paths:
+            self.logger.warning(
+                f"Missing {len(missing_paths)} of {len(file_paths)} files to consolidate: {missing_paths}"
             )
 
+        # consolidate the files to a singular dataframe
+        found_frames = [frame for frame in frames if frame is not None]
+        consolidated_frame = pd.DataFrame()
+        if found_frames:
+            consolidated_frame = pd.concat(found_frames, ignore_index=True)
+
         if consolidated_frame.empty:
             return EMPTY_STRING_VAL
 
@@ -116,13 +309,71 @@ class FileHandler:
 
         return finalised_frame
 
-    def upload_frame_to_csv(self, path: str, frame: pd.DataFrame):
+    def read_daily_file(
+        self, path: str, file_format: str = "csv"
+    ) -> Optional[pd.DataFrame]:
+        """
+        Reads the file of a day and returns DataFrame.
+        Days uploaded before the format was available fall back to the csv. Returns None if the day is missing
+
+        Args:
+        - path (str): path of the file
+        - file_format (str): format of the file, one of VOC_FILE_FORMATS. Default is csv
+
+        Returns:
+        - Optional[pd.DataFrame]
+        """
+        daily_file = self.retrieve_daily_file(path, file_format)
+
+        if daily_file is None:
+            return None
+
+        frame = self.read_file_to_frame(*daily_file)
+
+        # csv files are read with the na values as empty, other formats keep them
+        if daily_file[1] not in ["csv", "csv.gz"]:
+            frame = self.retrieve_na_safe_frame(frame)
+
+        return frame
+
+    def retrieve_daily_file(
+        self, path: str, file_format: str = "csv"
+    ) -> Optional[Tuple[str, str]]:
         """
-        Uploads the dataframe as csv to provided s3 path
+        Returns the path and format of the file of a day.
+        Days uploaded before the format was available fall back to the csv. Returns None if the day is missing
+
+        Args:
+        - path (str): path of the file
+        - file_format (str): format of the file, one of VOC_FILE_FORMATS. Default is csv
+
+        Returns:
+        - Optional[Tuple[str, str]]
+        """
+        candidates = [(path, file_format)]
+        if file_format != "csv":
+            csv_path = path.replace(
+                self.retrieve_file_extension(file_format),
+                self.retrieve_file_extension("csv"),
+            )
+            candidates.append((csv_path, "csv"))
+
+        for candidate_path, candidate_format in candidates:
+            if S3FileSystem().exists(candidate_path):
+                return candidate_path, candidate_format
+
+        return None
+
+    def upload_frame_to_csv(self, path: str, frame: pd.DataFrame) -> bool:
+        """
+        Uploads the dataframe as csv to provided s3 path and returns if it was uploaded
 
         Args:
         - path (str): upload path of the csv
         - frame (pd.DataFrame): dataframe to be uploaded
+
+        Returns:
+        - bool
         """
         try:
             with S3FileSystem().open(path, "w") as fs:
@@ -131,6 +382,97 @@ class FileHandler:
             self.logger.exception("Error occured while uploading file")
             self.logger.exception(e)
             self.logger.exception(path)
+            self.remove_partial_file(path)
+            return False
+
+        return True
+
+    def upload_frame_to_compressed_csv(self, path: str, frame: pd.DataFrame) -> bool:
+        """
+        Uploads the dataframe as gzip compressed csv to provided s3 path and returns if it was uploaded
+
+        Args:
+        - path (str): upload path of the compressed csv
+        - frame (pd.DataFrame): dataframe to be uploaded
+
+        Returns:
+        - bool
+        """
+        try:
+            with S3FileSystem().open(path, "wb") as fs:
+                frame.to_csv(fs, index=False, compression="gzip")
+        except Exception as e:
+            self.logger.exception("Error occured while uploading file")
+            self.logger.exception(e)
+            self.logger.exception(path)
+            self.remove_partial_file(path)
+            return False
+
+        return True
+
+    def upload_frame_to_parquet(self, path: str, frame: pd.DataFrame) -> bool:
+        """
+        Uploads the dataframe as parquet to provided s3 path and returns if it was uploaded.
+        Text columns are stored as strings so mixed types don't fail the conversion
+
+        Args:
+        - path (str): upload path of the parquet file
+        - frame (pd.DataFrame): dataframe to be uploaded
+
+        Returns:
+        - bool
+        """
+        temp_frame = self.retrieve_parquet_safe_frame(frame)
+
+        try:
+            with S3FileSystem().open(path, "wb") as fs:
+                temp_frame.to_parquet(fs, index=False)
+        except Exception as e:
+            self.logger.exception("Error occured while uploading file")
+            self.logger.exception(e)
+            self.logger.exception(path)
+            self.remove_partial_file(path)
+            return False
+
+        return True
+
+    def retrieve_parquet_safe_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns a copy of the dataframe with the text columns as strings, the same way they are stored in parquet.
+        Empty values are kept
+
+        Args:
+        - frame (pd.DataFrame): dataframe to be converted
+
+        Returns:
+        - pd.DataFrame
+        """
+        temp_frame = frame.copy()
+        for column in temp_frame.select_dtypes(include="object").columns:
+            temp_frame[column] = temp_frame[column].where(
+                temp_frame[column].isnull(), temp_frame[column].astype(str)
+            )
+
+        return temp_frame
+
+    def retrieve_na_safe_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns a copy of the dataframe with the VOC_NA_VALUES of the text columns as empty values,
+        the same way they are read from csv. Keeps the duplicate checks independent of the file format
+
+        Args:
+        - frame (pd.DataFrame): dataframe to be converted
+
+        Returns:
+        - pd.DataFrame
+        """
+        temp_frame = frame.copy()
+        for column in temp_frame.select_dtypes(include="object").columns:
+            temp_frame[column] = temp_frame[column].where(
+                ~temp_frame[column].isin(VOC_NA_VALUES)
+            )
+
+        return temp_frame
 
     def dynamic_filename_generator(
         self, prefix: str, date: dt.date, file_extension: str = ".csv"
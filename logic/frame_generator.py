@@ -1,23 +1,33 @@
-import copy
+import logging
 import pandas as pd
 
 from logging import Logger
-from typing import List
+from typing import List, Tuple
 
 from ezyvet.data.models.voc_variables import (
     DATE_COLUMNS,
     FLOAT_COLUMNS,
     OLD_COMPARISON_COLUMNS,
+    SINGLE_PASS_MERGE,
     STRING_COLUMNS,
+    VOC_FAILURE_REASON_COLUMN,
+    VOC_INVALID_JOIN_REASON,
+    VOC_INVALID_JOIN_VALUES,
     VOC_JOIN_COLUMN,
+    VOC_PROCESSED_COLUMNS,
+    VOC_REQUIRED_COLUMNS,
     VOC_SURVEY_EXPORT,
     VOC_SURVEY_EXPORT,
     VOC_SURVEY_FAILED_EXPORT_ADDONS,
     VOC_REVENUE_FRAME_LIST,
+    VOC_REVENUE_LINES,
     VOC_REVENUE_EXPORT,
     VOC_JOIN_UNIQUE_ID,
+    VOC_ROLE_CONTACT_COLUMNS,
+    VOC_ROLE_CONTACT_PREFIXES,
 )
 from ezyvet.data.tools.column_fixer import ColumnFixer
+from ezyvet.data.tools.record_key_index import RecordKeyIndex
 
 
 class FrameGenerator:
@@ -38,7 +48,10 @@ class FrameGenerator:
         self.logger = logger
 
     def merge_frames(
-        self, base_frame: pd.DataFrame, supp_frames: List[pd.DataFrame]
+        self,
+        base_frame: pd.DataFrame,
+        supp_frames: List[pd.DataFrame],
+        single_pass: bool = SINGLE_PASS_MERGE,
     ) -> pd.DataFrame:
         """
         Merges the frames by the join column horizontally
@@ -46,6 +59,7 @@ class FrameGenerator:
         Args:
         - base_frame (DataFrame): The base frame where the supplimental frames will be merged against
         - supp_frames (List[DataFrame]): List of frames to be merged against each other.
+        - single_pass (bool): Joins all of the supplemental frames in one step. The supplemental frames are deduplicated by the join column
 
         Returns:
         - DataFrame
@@ -54,12 +68,34 @@ class FrameGenerator:
         fixer = ColumnFixer(self.logger)
         fixed_base = fixer.fix_column_to_string(base_frame, [VOC_JOIN_COLUMN])
 
+        indexed_frames: List[pd.DataFrame] = []
         for frame in supp_frames:
             # prepare and the frame to be merged
             frame = fixer.fix_column_to_string(frame, [VOC_JOIN_COLUMN])
-            self.logger.debug(frame.to_markdown())
-
-            fixed_base = fixed_base.merge(frame, on=VOC_JOIN_COLUMN, how="left")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(frame.to_markdown())
+
+            self.report_fan_out(frame)
+
+            if single_pass:
+                indexed_frames.append(
+                    frame.drop_duplicates(VOC_JOIN_COLUMN, keep="first").set_index(
+                        VOC_JOIN_COLUMN
+                    )
+                )
+            else:
+                fixed_base = fixed_base.merge(frame, on=VOC_JOIN_COLUMN, how="left")
+
+        if single_pass:
+            # align every supplemental frame to the join column of the base and attach them at once
+            join_ids = fixed_base[VOC_JOIN_COLUMN].to_numpy()
+            aligned_frames = [
+                frame.reindex(join_ids).set_axis(fixed_base.index)
+                for frame in indexed_frames
+            ]
+            fixed_base = pd.concat([fixed_base] + aligned_frames, axis=1).reset_index(
+                drop=True
+            )
 
         fixed_base = fixer.fix_column_to_string(fixed_base, STRING_COLUMNS)
         fixed_base = fixer.fix_column_to_float(fixed_base, FLOAT_COLUMNS)
@@ -70,6 +106,31 @@ class FrameGenerator:
 
         return fixed_base
 
+    def report_fan_out(self, frame: pd.DataFrame) -> None:
+        """
+        Warns if the supplemental frame has duplicated join values.
+        A left merge against duplicated join values multiplies the records of the base frame
+
+        Args:
+        - frame (DataFrame): supplemental frame to be checked
+
+        Returns:
+        - None
+        """
+        duplicated_ids = frame.loc[
+            frame[VOC_JOIN_COLUMN].duplicated(), VOC_JOIN_COLUMN
+        ].unique()
+
+        if len(duplicated_ids) == 0:
+            return None
+
+        self.logger.warning(
+            f"Supplemental frame with columns {frame.columns.to_list()} has "
+            f"{len(duplicated_ids)} duplicated {VOC_JOIN_COLUMN} values "
+            f"({frame[VOC_JOIN_COLUMN].duplicated().sum()} extra records)"
+        )
+        self.logger.warning(duplicated_ids.tolist())
+
     def clean_frame(self, df: pd.DataFrame, columnList: List[str]) -> pd.DataFrame:
         """
         Returns a cleaned frame based from the list provided
@@ -89,7 +150,10 @@ class FrameGenerator:
 
     def create_processed_frame(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Creates the processed frame
+        Creates the processed frame.
+        The records are repeated for every role in VOC_ROLE_CONTACT_PREFIXES, using the contact columns of the role.
+        Only the contact columns and the role are stacked per role, they are joined by position
+        to the VOC_PROCESSED_COLUMNS of the record so the other columns are never repeated
 
         Args:
         - df (DataFrame): Where the new frame will base the data from
@@ -97,61 +161,130 @@ class FrameGenerator:
         Returns:
         - DataFrame
         """
-        frame = copy.deepcopy(df)
-        vdc_frame = copy.deepcopy(df)
-        fsr_frame = copy.deepcopy(df)
+        positions = pd.RangeIndex(len(df.index))
+        role_columns = list(VOC_ROLE_CONTACT_COLUMNS.keys()) + ["Role"]
+
+        # the contacts of the base records followed by the contacts of each role, indexed by the position of the record
+        contact_blocks = [df[role_columns].set_axis(positions)]
+        for role, prefix in VOC_ROLE_CONTACT_PREFIXES.items():
+            role_block = pd.DataFrame(
+                {
+                    column: df[f"{prefix}{role_suffix}"].to_numpy()
+                    for column, role_suffix in VOC_ROLE_CONTACT_COLUMNS.items()
+                },
+                index=positions,
+            )
+            role_block["Role"] = role
+            contact_blocks.append(role_block)
 
-        vdc_frame["First Name"] = vdc_frame["VDC_First_Name"]
-        vdc_frame["Last Name"] = vdc_frame["VDC_Last_Name"]
-        vdc_frame["Email"] = vdc_frame["VDC_Email"]
-        vdc_frame["Phone"] = vdc_frame["VDC_Phone"]
-        vdc_frame["Role"] = "VDC"
+        contact_frame = pd.concat(contact_blocks)
 
-        fsr_frame["First Name"] = fsr_frame["DXFSR_First_Name"]
-        fsr_frame["Last Name"] = fsr_frame["DXFSR_Last_Name"]
-        fsr_frame["Email"] = fsr_frame["DXFSR_Email"]
-        fsr_frame["Phone"] = fsr_frame["DXFSR_Phone"]
-        fsr_frame["Role"] = "DX FSR"
+        shared_columns = [
+            column
+            for column in VOC_PROCESSED_COLUMNS
+            if column in df.columns and column not in role_columns
+        ]
+        shared_frame = df[shared_columns].set_axis(positions)
 
-        # append the vdc frame to the frame
-        base_frame = pd.concat([frame, vdc_frame, fsr_frame], ignore_index=True)
+        # join the shared columns to each stacked contact by the position of its record
+        base_frame = shared_frame.take(contact_frame.index).reset_index(drop=True)
+        for column in role_columns:
+            base_frame[column] = contact_frame[column].to_numpy()
 
         return base_frame
 
-    def separate_valid_frames(
+    def partition_frames(
         self, df: pd.DataFrame, previous_failed_records: pd.DataFrame
-    ) -> pd.DataFrame:
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
-        Separate the valid data from the dataframe
+        Separates the valid and invalid data from the dataframe in a single pass.
+        The invalid data includes the reasons why each record failed
 
         Args:
-        - df (DataFrame): Where the new frame will base the data from
+        - df (DataFrame): Where the new frames will base the data from
         - previous_failed_records(DataFrame): Contains the previous failed records.
 
         Returns:
-        - List[DataFrame]
+        - Tuple[DataFrame, DataFrame]
         """
         # Transform sap_id column as string before we process
         fixer = ColumnFixer(self.logger)
-        vdf = fixer.fix_column_remove_decimals(df, VOC_JOIN_COLUMN)
+        fixed_frame = fixer.fix_column_remove_decimals(df, VOC_JOIN_COLUMN)
+
+        failure_reasons = self.retrieve_failure_reasons(fixed_frame)
+        is_valid = failure_reasons == ""
+
+        self.logger.info("Failure Reasons")
+        self.logger.info(failure_reasons[~is_valid].value_counts().to_dict())
+
         # Transform unique id column as string before we process to avoid duplication
-        vdf = fixer.fix_column_to_string(vdf, [VOC_JOIN_UNIQUE_ID])
+        valid_frame = fixer.fix_column_to_string(
+            fixed_frame.loc[is_valid].copy(), [VOC_JOIN_UNIQUE_ID]
+        )
+
+        invalid_frame = fixed_frame.loc[~is_valid].copy()
+        invalid_frame[VOC_FAILURE_REASON_COLUMN] = failure_reasons[~is_valid]
 
-        # Grab entries with valid first name, last name, and email
-        # VOC_JOIN_COLUMN is now a string type, valid frame should not be '1', '0', NULL, empty string ('') or sap_account_name should not be null
-        valid_frame = vdf.loc[
+        revalidated_frame = self.revalidate_failed_records(
+            valid_frame, previous_failed_records
+        )
+
+        failed_records_columns = VOC_SURVEY_EXPORT + VOC_SURVEY_FAILED_EXPORT_ADDONS
+
+        # always clean the frames to filter out unneeded columns
+        return (
+            self.clean_frame(revalidated_frame, VOC_SURVEY_EXPORT),
+            self.clean_frame(invalid_frame, failed_records_columns),
+        )
+
+    def retrieve_failure_reasons(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Returns the reasons why each record is invalid, separated by a semicolon.
+        Valid records have an empty string
+
+        VOC_JOIN_COLUMN should already be a string type, records are invalid if it is '1', '0', NULL, empty string ('')
+        or if any of the VOC_REQUIRED_COLUMNS is null
+
+        Args:
+        - df (DataFrame): frame to be validated
+
+        Returns:
+        - Series
+        """
+        failure_checks = [
+            (df[column].isnull(), reason)
+            for column, reason in VOC_REQUIRED_COLUMNS.items()
+        ]
+        failure_checks.append(
             (
-                (~vdf["First Name"].isnull())
-                & (~vdf["Last Name"].isnull())
-                & (~vdf["Email"].isnull())
-                & (~vdf["Product"].isnull())
-                & (~vdf["sap_account_name"].isnull())
-                & (vdf[VOC_JOIN_COLUMN] != "1")
-                & (vdf[VOC_JOIN_COLUMN] != "0")
-                & (vdf[VOC_JOIN_COLUMN] != "")
-                & (~vdf[VOC_JOIN_COLUMN].isnull())
+                df[VOC_JOIN_COLUMN].isnull()
+                | df[VOC_JOIN_COLUMN].isin(VOC_INVALID_JOIN_VALUES),
+                VOC_INVALID_JOIN_REASON,
+            )
+        )
+
+        failure_reasons = pd.Series("", index=df.index, dtype=object)
+        for failed, reason in failure_checks:
+            failure_reasons = failure_reasons.where(
+                ~failed, failure_reasons + reason + ";"
             )
-        ].copy()
+
+        return failure_reasons.str.rstrip(";")
+
+    def revalidate_failed_records(
+        self, valid_frame: pd.DataFrame, previous_failed_records: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Keeps the new valid records and the previous failed records that are now valid
+
+        Args:
+        - valid_frame (DataFrame): valid records of the current execution
+        - previous_failed_records(DataFrame): Contains the previous failed records.
+
+        Returns:
+        - DataFrame
+        """
+        fixer = ColumnFixer(self.logger)
 
         if not previous_failed_records.empty:
             # Transform sap_id column as string before processing previous dataframe
@@ -167,46 +300,23 @@ class FrameGenerator:
                 & (fixed_failed_records[VOC_JOIN_COLUMN] != "")
             ].copy()
 
-            # DT-3058: clean up possible duplicates in failed records as a safe guard to avoid duplicating the reprocessed records
-            saprole_failed_records = (
-                nonempty_failed_records[OLD_COMPARISON_COLUMNS].copy().drop_duplicates()
-            )
-            # Transform unique id column as string before comparison
-            saprole_failed_records = fixer.fix_column_to_string(
-                saprole_failed_records, [VOC_JOIN_UNIQUE_ID]
-            )
-
-            failed_uniqueids = saprole_failed_records[VOC_JOIN_UNIQUE_ID].to_list()
-            # log failed unique ids
-            self.logger.info("Failed Records SAP IDs")
-            self.logger.info(failed_uniqueids)
-
-            valid_uniqueids = valid_frame[VOC_JOIN_UNIQUE_ID].to_list()
-            self.logger.info("Failed Records SAP IDs")
-            self.logger.info(valid_uniqueids)
-
-            new_records = valid_frame[
-                ~valid_frame[VOC_JOIN_UNIQUE_ID].isin(failed_uniqueids)
-            ]
+            # DT-3058: the index only keeps unique keys, so duplicates in the failed records can't duplicate the reprocessed records
+            failed_record_index = RecordKeyIndex(
+                self.logger, OLD_COMPARISON_COLUMNS
+            ).build(nonempty_failed_records)
+            failed_uniqueid_index = RecordKeyIndex(
+                self.logger, [VOC_JOIN_UNIQUE_ID]
+            ).build(nonempty_failed_records)
 
-            temp_frame = copy.deepcopy(valid_frame)
+            new_records = valid_frame[~failed_uniqueid_index.contains(valid_frame)]
 
-            self.logger.info(new_records)
-            self.logger.info(new_records.to_markdown())
-            self.logger.info(saprole_failed_records.to_markdown())
-            self.logger.info(temp_frame.to_markdown())
-
-            # Transform both columns into a string before merging
-            temp_frame = fixer.fix_column_to_string(temp_frame, OLD_COMPARISON_COLUMNS)
-
-            saprole_failed_records = fixer.fix_column_to_string(
-                saprole_failed_records, OLD_COMPARISON_COLUMNS
-            )
-
-            old_failed_records = temp_frame.merge(
-                saprole_failed_records, on=OLD_COMPARISON_COLUMNS
+            # Transform the comparison columns into a string, the same as the failed records
+            old_failed_records = fixer.fix_column_to_string(
+                valid_frame[failed_record_index.contains(valid_frame)].copy(),
+                OLD_COMPARISON_COLUMNS,
             )
 
+            self.logger.info(new_records.to_markdown())
             self.logger.info(old_failed_records.to_markdown())
 
             revalidated_frame = pd.concat(
@@ -215,51 +325,12 @@ class FrameGenerator:
         else:
             revalidated_frame = valid_frame
 
-        # always clean the frame to filter out unneeded columns
-        cleaned_frame = self.clean_frame(revalidated_frame, VOC_SURVEY_EXPORT)
-
-        return cleaned_frame
-
-    def separate_invalid_frames(self, df: pd.DataFrame) -> pd.DataFrame:
-        """
-        Separate the invalid data from the dataframe
-
-        Args:
-        - df (DataFrame): Where the new frame will base the data from
-
-        Returns:
-        - DataFrame
-        """
-        # Transform sap_id column as string before we process
-        fixer = ColumnFixer(self.logger)
-        idf = fixer.fix_column_remove_decimals(df, VOC_JOIN_COLUMN)
-
-        # Grab entries that were not grabbed by above
-        # VOC_JOIN_COLUMN is now a string type, records are invalid if VOC_JOIN_COLUMN is '1', '0', NULL, empty string ('') or sap_account_name is null
-        invalid_frame = idf.loc[
-            (
-                (idf["First Name"].isnull())
-                | (idf["Last Name"].isnull())
-                | (idf["Email"].isnull())
-                | (idf["Product"].isnull())
-                | (idf["sap_account_name"].isnull())
-                | (idf[VOC_JOIN_COLUMN].isnull())
-                | (idf[VOC_JOIN_COLUMN] == "0")
-                | (idf[VOC_JOIN_COLUMN] == "1")
-                | (idf[VOC_JOIN_COLUMN] == "")
-            )
-        ]
-
-        failed_records_columns = VOC_SURVEY_EXPORT + VOC_SURVEY_FAILED_EXPORT_ADDONS
-
-        # always clean the frame to filter out unneeded columns
-        cleaned_frame = self.clean_frame(invalid_frame, failed_records_columns)
-
-        return cleaned_frame
+        return revalidated_frame
 
     def create_revenue_frame(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Create the revenue frame based from the provided frame
+        Create the revenue frame based from the provided frame.
+        Every revenue line in VOC_REVENUE_LINES becomes its own record
 
         Args:
         - df (DataFrame): Where the new frame will base the data from
@@ -267,44 +338,25 @@ class FrameGenerator:
         Returns:
         - DataFrame
         """
-        default_list = VOC_REVENUE_FRAME_LIST
-
-        list_saas = copy.deepcopy(default_list)
-        list_impl_fee = copy.deepcopy(default_list)
-        list_cag_fee = copy.deepcopy(default_list)
-
-        list_saas.append("SaaS Fee")
-        list_impl_fee.append("Implementation Fee")
-        list_cag_fee.append("IDEXX DX Spend")
-
-        # saas fee revenues
-        revenue_saas_frame = df[list_saas].copy()
-        revenue_saas_frame["Revenue Type"] = "MRR"
-        revenue_saas_frame["Description"] = "ezyvet/Neo/Cornerstone SaaS fee"
-        revenue_saas_frame = revenue_saas_frame.rename(
-            columns={"SaaS Fee": "Revenue Amount"}
-        )
-
-        # implementation fee revenues
-        revenue_impl_frame = df[list_impl_fee].copy()
-        revenue_impl_frame["Revenue Type"] = "One Time"
-        revenue_impl_frame["Description"] = "ezyvet/Neo/Cornerstone Implementation fee"
-        revenue_impl_frame = revenue_impl_frame.rename(
-            columns={"Implementation Fee": "Revenue Amount"}
-        )
-
-        # cag fee revenue
-        revenue_cag_frame = df[list_cag_fee].copy()
-        revenue_cag_frame["Revenue Type"] = "CAG ARR"
-        revenue_cag_frame["Description"] = "CAG Annual Recurring Revenue"
-        revenue_cag_frame = revenue_cag_frame.rename(
-            columns={"IDEXX DX Spend": "Revenue Amount"}
+        revenue_sources = list(VOC_REVENUE_LINES.keys())
+
+        # stack the revenue columns, one block of records per revenue line
+        merged_frame = df.melt(
+            id_vars=VOC_REVENUE_FRAME_LIST,
+            value_vars=revenue_sources,
+            var_name="Revenue Source",
+            value_name="Revenue Amount",
         )
 
-        merged_frame = pd.concat(
-            [revenue_saas_frame, revenue_impl_frame, revenue_cag_frame],
-            ignore_index=True,
+        sources = merged_frame.pop("Revenue Source").astype(
+            pd.CategoricalDtype(revenue_sources)
         )
+        merged_frame["Revenue Type"] = sources.map(
+            {source: line[0] for source, line in VOC_REVENUE_LINES.items()}
+        ).astype("category")
+        merged_frame["Description"] = sources.map(
+            {source: line[1] for source, line in VOC_REVENUE_LINES.items()}
+        ).astype("category")
 
         # set up the dates
         merged_frame["Revenue End Date"] = merged_frame["Project Go Live date"]
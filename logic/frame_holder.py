@@ -1,20 +1,29 @@
+import numpy as np
 import pandas as pd
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
-from typing import Optional, List
+from typing import Callable, Iterable, Iterator, Optional, List
 
+from ezyvet.data.logic.frame_generator import FrameGenerator
 from ezyvet.data.logic.snowflake_reader import SnowflakeReader
 from ezyvet.data.tools.column_fixer import ColumnFixer
+from ezyvet.data.tools.record_key_index import RecordKeyIndex
 
 # imports to read the previous failed records
 from ezyvet.data.models.voc_variables import (
+    CUSTOM_REQUEST_CHUNKSIZE,
     EMPTY_STRING_VAL,
+    VOC_JOIN_COLUMN,
     VOC_JOIN_UNIQUE_ID,
     DUPLICATED_RAW_COLUMNS,
+    SUPPLEMENTAL_MAX_WORKERS,
 )
 
 # import the hooks
 from ezyvet.data.models.hook_model import HookModel
+from ezyvet.data.models.fused_hook_model import FusedHookModel
 from ezyvet.data.hooks.main_maven_hook import MainMavenHook
 from ezyvet.data.hooks.main_team_hook import MainTeamHook
 from ezyvet.data.hooks.supp_dx_hook import SuppDxHook
@@ -57,6 +66,23 @@ class FrameHolder:
             MainTeamHook(),  # Teamwork
         ]
 
+    def retrieve_custom_date_columns(self) -> List[str]:
+        """
+        Returns the columns that place the records of the base hooks inside the date range of a custom request
+
+        Returns:
+        - List[str]
+        """
+        columns: List[str] = []
+        for hook in self.return_base_hooks():
+            columns += [
+                column
+                for column in hook.retrieve_custom_date_columns()
+                if column not in columns
+            ]
+
+        return columns
+
     def return_supplemental_hooks(self) -> List[HookModel]:
         """
         Returns the hooks to be used to supplement data
@@ -67,8 +93,7 @@ class FrameHolder:
         return [
             SuppDxHook(),  # DX ARR
             SuppSapHook(),  # SAP
-            SuppVDCHook(),  # VDC
-            SuppDXFSRHook(),  # DX FSR
+            FusedHookModel([SuppVDCHook(), SuppDXFSRHook()]),  # VDC and DX FSR
             SuppChargeBeeHook(),  # Chargebee / Neo Users
         ]
 
@@ -98,7 +123,12 @@ class FrameHolder:
         """
         # prepare the history hooks
         fixer = ColumnFixer(self.logger)
-        existing_uniqueids = self.base_frame[VOC_JOIN_UNIQUE_ID].to_list()
+        existing_uniqueids = fixer.fix_column_remove_decimals(
+            self.base_frame[[VOC_JOIN_UNIQUE_ID]].copy(), VOC_JOIN_UNIQUE_ID
+        )
+        existing_index = RecordKeyIndex(self.logger, [VOC_JOIN_UNIQUE_ID]).build(
+            existing_uniqueids
+        )
         previous_frame = pd.DataFrame()
         for origin, hook in self.return_previous_base_hooks().items():
             temp_failed_entries = failed_df[
@@ -108,11 +138,16 @@ class FrameHolder:
             temp_failed_entries = fixer.fix_column_remove_decimals(
                 temp_failed_entries, VOC_JOIN_UNIQUE_ID
             )
-            failed_uniqueids = temp_failed_entries[VOC_JOIN_UNIQUE_ID].to_list()
-            self.logger.info("filtered failed sap id list")
-            self.logger.info(failed_uniqueids)
             # if the unique ids is already present in the current valid entries, we skip
-            hook.unique_ids = list(set(failed_uniqueids) - set(existing_uniqueids))
+            hook.unique_ids = (
+                temp_failed_entries.loc[
+                    ~existing_index.contains(temp_failed_entries), VOC_JOIN_UNIQUE_ID
+                ]
+                .unique()
+                .tolist()
+            )
+            self.logger.info("filtered failed unique id list")
+            self.logger.info(hook.unique_ids)
             if not hook.unique_ids:
                 continue
             temp_frame = snowReader.get_dataframe_from_snowflake(hook)
@@ -141,10 +176,7 @@ class FrameHolder:
         # retrieve current valid entries
         snowReader = SnowflakeReader(self.logger)
         for hook in self.return_base_hooks():
-            if custom_filename != EMPTY_STRING_VAL:
-                daterange = custom_filename.split("_")
-                hook.custom_from = daterange[1]
-                hook.custom_to = daterange[2]
+            self.apply_custom_daterange(hook, custom_filename)
             # check if base_frame is empty
             if self.base_frame is None:
                 self.base_frame = self.remove_duplicates_from_frames(
@@ -168,12 +200,70 @@ class FrameHolder:
 
         self.logger.info(self.base_frame.to_markdown())
 
-    def retrieve_supplemental_frames(self, sap_ids: List[str]) -> Optional[None]:
+    def iterate_merged_frames(
+        self, custom_filename: str, chunksize: int = CUSTOM_REQUEST_CHUNKSIZE
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields the base frame chunk by chunk, merged with the supplemental frames of the chunk.
+        Used by custom requests so the peak memory depends on the chunksize rather than the date range.
+
+        Duplicates can span chunks, so they are removed afterwards by remove_duplicates_from_chunks
+
+        Args:
+        - custom_filename (str): Used to grab the from and to dates for custom files
+        - chunksize (int): number of base rows read and merged at a time
+
+        Returns:
+        - Iterator[DataFrame]
+        """
+        snowReader = SnowflakeReader(self.logger)
+        fg = FrameGenerator(self.logger)
+
+        for hook in self.return_base_hooks():
+            self.apply_custom_daterange(hook, custom_filename)
+
+            for chunk in snowReader.get_dataframe_chunks_from_snowflake(
+                hook, chunksize
+            ):
+                ids = list(dict.fromkeys(chunk[VOC_JOIN_COLUMN].to_list()))
+
+                if not ids:
+                    continue
+
+                # the supplemental frames only belong to the current chunk
+                self.supplemental_frames = []
+                self.retrieve_supplemental_frames(ids)
+
+                yield fg.merge_frames(chunk, self.supplemental_frames)
+
+        self.supplemental_frames = []
+
+    def apply_custom_daterange(self, hook: HookModel, custom_filename: str) -> None:
         """
-        Retrieves the supplemental data frames from snowflake
+        Applies the from and to dates of the custom request to the hook
 
         Args:
+        - hook (HookModel): base hook to be updated
+        - custom_filename (str): Used to grab the from and to dates for custom files
+
+        Returns:
         - None
+        """
+        if custom_filename != EMPTY_STRING_VAL:
+            daterange = custom_filename.split("_")
+            hook.custom_from = daterange[1]
+            hook.custom_to = daterange[2]
+
+    def retrieve_supplemental_frames(
+        self, sap_ids: List[str], max_workers: int = SUPPLEMENTAL_MAX_WORKERS
+    ) -> Optional[None]:
+        """
+        Retrieves the supplemental data frames from snowflake.
+        The hooks are queried concurrently but the frames are kept in the same order as the hooks
+
+        Args:
+        - sap_ids (List[str]): sap ids to be included in the supplemental hooks
+        - max_workers (int): number of hooks queried at the same time. 1 runs the hooks sequentially
 
         Returns:
         - Optional[None]
@@ -182,86 +272,175 @@ class FrameHolder:
             return None
 
         snowReader = SnowflakeReader(self.logger)
-        for hook in self.return_supplemental_hooks():
+        hooks = self.return_supplemental_hooks()
+        for hook in hooks:
             # make sure that the sap_ids are being included in the hook
             hook.sap_ids = sap_ids
-            self.supplemental_frames.append(
-                snowReader.get_dataframe_from_snowflake(hook)
-            )
+
+        if max_workers <= 1:
+            frames = [self.retrieve_timed_frame(snowReader, hook) for hook in hooks]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(hooks))
+            ) as executor:
+                # map returns the frames in the order of the hooks, not by completion
+                frames = list(
+                    executor.map(
+                        lambda hook: self.retrieve_timed_frame(snowReader, hook), hooks
+                    )
+                )
+
+        # fused hooks return a single frame that has to be split per hook
+        for hook, frame in zip(hooks, frames):
+            self.supplemental_frames += hook.split_frame(frame)
+
+    def retrieve_timed_frame(
+        self, snowReader: SnowflakeReader, hook: HookModel
+    ) -> pd.DataFrame:
+        """
+        Retrieves the data frame of the hook and logs how long the query took
+
+        Args:
+        - snowReader (SnowflakeReader): Class that uses the hook model
+        - hook (HookModel): hook to be queried
+
+        Returns:
+        - DataFrame
+        """
+        start_time = time.perf_counter()
+        frame = snowReader.get_dataframe_from_snowflake(hook)
+        elapsed_time = time.perf_counter() - start_time
+
+        self.logger.info(
+            f"{type(hook).__name__} returned {len(frame.index)} rows in {elapsed_time:.2f}s"
+        )
+
+        return frame
 
     def remove_duplicates_from_frames(
         self, raw_frame: pd.DataFrame, filter_cols: List[str] = DUPLICATED_RAW_COLUMNS
     ) -> pd.DataFrame:
         """
-        Removes duplicates from provided dataframe and choses the one with the most data in columns
+        Removes duplicates from provided dataframe and choses the one with the most data in columns.
+        If the duplicates have the same amount of data, the first one is retained
 
         Args:
         - raw_frame (pd.DataFrame): frame with duplicates
+        - filter_cols (List[str]): columns used to determine the duplicates
 
         Returns:
         - pd.DataFrame
         """
+        raw_duplicates = raw_frame.duplicated(filter_cols)
+
+        if not raw_duplicates.any():
+            return raw_frame
 
         cf = ColumnFixer(self.logger)
 
-        duplicated_frame = cf.fix_column_to_string(
-            (
-                raw_frame[raw_frame.duplicated(filter_cols)][filter_cols]
-                .copy()
-                .drop_duplicates(keep="first")
-            ),
-            filter_cols,
+        # duplicates are compared by their string values
+        key_frame = cf.fix_column_to_string(raw_frame[filter_cols].copy(), filter_cols)
+        group_ids = pd.Series(
+            key_frame.groupby(filter_cols, sort=False).ngroup().to_numpy()
         )
 
-        if duplicated_frame.empty:
-            return raw_frame
-
         self.logger.info("Raw Records")
         self.logger.info(raw_frame.to_json())
 
         self.logger.info("Duplicated Records")
-        self.logger.info(duplicated_frame.to_json())
+        self.logger.info(
+            key_frame[raw_duplicates.to_numpy()].drop_duplicates(keep="first").to_json()
+        )
 
-        final_frame = raw_frame.copy()
-        temp_frame = cf.fix_column_to_string(raw_frame.copy(), filter_cols)
+        # the filter columns are never empty once they are strings, so only the other columns are counted
+        number_of_nans = pd.Series(
+            raw_frame.drop(columns=filter_cols).isna().sum(axis=1).to_numpy()
+        )
 
-        del_index = []  # index to delete
-        for row_index, row in duplicated_frame.iterrows():
-            dynamic_conditions = []
+        duplicated_groups = group_ids[raw_duplicates.to_numpy()].unique()
+        in_duplicated_group = group_ids.isin(duplicated_groups)
 
-            # generate query
-            for col in filter_cols:
-                dynamic_conditions.append(f"`{col}` == '{row[col]}'")
-            query = f" & ".join(dynamic_conditions)
+        # idxmin returns the first row with the least amount of nans in each group
+        retain_positions = (
+            number_of_nans[in_duplicated_group].groupby(group_ids).idxmin().to_numpy()
+        )
+        drop_mask = in_duplicated_group.to_numpy()
+        drop_mask[retain_positions] = False
 
-            # grab all of the items with duplicated columns listed in filter_cols
-            col_checker = temp_frame.query(query).copy()
-            col_checker["number_of_nans"] = (
-                col_checker[col_checker.columns].isna().sum(1)
-            )
+        self.logger.info("Dropping Index")
+        self.logger.info(raw_frame.index[drop_mask].to_list())
+        final_frame = raw_frame[~drop_mask]
 
-            self.logger.info(query)
-            self.logger.info(col_checker.to_json())
+        self.logger.info("Cleaned Records")
+        self.logger.info(final_frame.to_json())
+
+        return final_frame
 
-            retain_index = 0
-            index_to_review = list(col_checker.index.values)
-            number_of_nans = len(col_checker.columns)  # grab the number of columns
-            for col_checker_index, row in col_checker.iterrows():
-                if row["number_of_nans"] < number_of_nans:
-                    retain_index = col_checker_index
-                    number_of_nans = row["number_of_nans"]
+    def remove_duplicates_from_chunks(
+        self,
+        read_chunks: Callable[[], Iterable[pd.DataFrame]],
+        filter_cols: List[str] = DUPLICATED_RAW_COLUMNS,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Removes duplicates across the chunks of a frame and yields the cleaned chunks.
+        Retains the same records as remove_duplicates_from_frames on the appended chunks,
+        without holding more than one chunk at a time.
 
-            indices_to_remove = [
-                index for index in index_to_review if index != retain_index
+        The chunks are read twice. The first pass only keeps the hash of the filter columns and the number of
+        empty values of each record, the second pass drops the duplicates of each chunk
+
+        Args:
+        - read_chunks (Callable[[], Iterable[pd.DataFrame]]): returns the chunks of the frame, called once per pass
+        - filter_cols (List[str]): columns used to determine the duplicates
+
+        Returns:
+        - Iterator[pd.DataFrame]
+        """
+        key_index = RecordKeyIndex(self.logger, filter_cols)
+        chunk_keys: List[np.ndarray] = []
+        chunk_nans: List[np.ndarray] = []
+        chunk_columns: List[set] = []
+        columns: set = set()
+
+        for chunk in read_chunks():
+            other_columns = set(chunk.columns) - set(filter_cols)
+            chunk_keys.append(key_index.hash_keys(chunk).to_numpy())
+            chunk_nans.append(chunk[list(other_columns)].isna().sum(axis=1).to_numpy())
+            chunk_columns.append(other_columns)
+            columns |= other_columns
+
+        if not chunk_keys:
+            return None
+
+        # columns missing from a chunk are empty once the chunks are appended
+        keys = np.concatenate(chunk_keys)
+        number_of_nans = np.concatenate(
+            [
+                nans + len(columns - other_columns)
+                for nans, other_columns in zip(chunk_nans, chunk_columns)
             ]
+        )
+        positions = np.arange(len(keys))
 
-            del_index += indices_to_remove
+        # sorted by key, then by the number of nans and the position, so the first record of each key is retained
+        order = np.lexsort((positions, number_of_nans, keys))
+        sorted_keys = keys[order]
+        first_of_key = np.ones(len(order), dtype=bool)
+        first_of_key[1:] = sorted_keys[1:] != sorted_keys[:-1]
 
-        self.logger.info("Dropping Index")
-        self.logger.info(del_index)
-        final_frame = final_frame.drop(index=del_index)
+        retain_mask = np.zeros(len(keys), dtype=bool)
+        retain_mask[order[first_of_key]] = True
 
-        self.logger.info("Cleaned Records")
-        self.logger.info(final_frame.to_json())
+        self.logger.info(
+            f"Dropping {len(keys) - retain_mask.sum()} duplicated records out of {len(keys)}"
+        )
 
-        return final_frame
+        offset = 0
+        for chunk in read_chunks():
+            chunk_mask = retain_mask[offset : offset + len(chunk.index)]
+            offset += len(chunk.index)
+
+            if chunk_mask.all():
+                yield chunk
+            else:
+                yield chunk[chunk_mask]
@@ -0,0 +1,330 @@
+import re
+import time
+import uuid
+import pandas as pd
+
+from logging import Logger
+from s3fs import S3FileSystem
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from ezyvet.data.models.voc_variables import (
+    BUCKET,
+    DEFAULT_FILE_PATH,
+    EMPTY_STRING_VAL,
+    FRAME_STORE_FOLDER_NAME,
+    FRAME_STORE_TTL,
+    INTEGRATION_NAME,
+)
+
+
+class FrameStore:
+    """
+    A class that stores the frames passed between the tasks of a run in s3.
+
+    The tasks pass the handle of the stored frame instead of the frame itself,
+    so the frames are loaded only by the tasks that use them. Empty frames are not stored.
+    The frames left behind by failed runs are removed once they are older than the ttl.
+
+    Large frames are stored chunk by chunk under a folder handle, ending with a slash,
+    so the stages can process them one chunk at a time
+    """
+
+    def __init__(self, logger: Logger, run_id: str):
+        """
+        Constructor for the FrameStore class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+        - run_id (str): id of the run the frames belong to
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+        safe_run_id = re.sub("[^0-9a-zA-Z_.-]", "_", run_id)
+        self.root = f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{FRAME_STORE_FOLDER_NAME}"
+        self.folder = f"{self.root}/{safe_run_id}"
+        self.chunk_counts: Dict[str, int] = {}
+
+    def save_frame(self, frame: pd.DataFrame, name: str) -> str:
+        """
+        Stores the frame and returns its handle. Returns NaN if the frame is empty
+
+        Args:
+        - frame (pd.DataFrame): frame to be stored
+        - name (str): name of the frame, used in the handle
+
+        Returns:
+        - str
+        """
+        if frame.empty:
+            return EMPTY_STRING_VAL
+
+        return self.write_frame(frame, f"{self.folder}/{name}_{uuid.uuid4().hex}")
+
+    def write_frame(self, frame: pd.DataFrame, path: str) -> str:
+        """
+        Writes the frame to the path and returns the path with its extension
+
+        The frame is stored as parquet. Frames with mixed types in a column can't be stored as parquet
+        without changing their values, so they are stored as pickle instead
+
+        Args:
+        - frame (pd.DataFrame): frame to be stored
+        - path (str): path of the frame without its extension
+
+        Returns:
+        - str
+        """
+        try:
+            with S3FileSystem().open(f"{path}.parquet", "wb") as fs:
+                frame.to_parquet(fs)
+            path = f"{path}.parquet"
+        except (TypeError, ValueError, ImportError) as e:
+            self.logger.info(f"Storing {path} as pickle, it can't be stored as parquet")
+            self.logger.info(e)
+            # the failed write can leave a partial parquet object behind
+            if S3FileSystem().exists(f"{path}.parquet"):
+                S3FileSystem().rm(f"{path}.parquet")
+            with S3FileSystem().open(f"{path}.pkl", "wb") as fs:
+                frame.to_pickle(fs)
+            path = f"{path}.pkl"
+
+        self.logger.info(f"Stored {len(frame.index)} records in {path}")
+
+        return path
+
+    def read_frame(self, path: str) -> pd.DataFrame:
+        """
+        Reads the frame stored in the path
+
+        Args:
+        - path (str): path of the frame with its extension
+
+        Returns:
+        - pd.DataFrame
+        """
+        with S3FileSystem().open(path, "rb") as fs:
+            if path.endswith(".pkl"):
+                frame = pd.read_pickle(fs)
+            else:
+                frame = pd.read_parquet(fs)
+
+        self.logger.info(f"Loaded {len(frame.index)} records from {path}")
+
+        return frame
+
+    def load_frame(self, handle: str) -> pd.DataFrame:
+        """
+        Loads the frame of the handle. Returns an empty frame if the handle is NaN.
+        The chunks of a chunked handle are appended into a single frame
+
+        Args:
+        - handle (str): handle returned when the frame was stored
+
+        Returns:
+        - pd.DataFrame
+        """
+        frames = list(self.iterate_chunks(handle))
+
+        if not frames:
+            return pd.DataFrame()
+
+        if len(frames) == 1:
+            return frames[0]
+
+        return pd.concat(frames, ignore_index=True)
+
+    def is_chunked(self, handle: str) -> bool:
+        """
+        Checks if the handle was stored chunk by chunk
+
+        Args:
+        - handle (str): handle returned when the frame was stored
+
+        Returns:
+        - bool
+        """
+
+        return handle is not None and handle.endswith("/")
+
+    def create_chunked_handle(self, name: str) -> str:
+        """
+        Returns a new handle for a frame stored chunk by chunk.
+        The handle has to be closed once every chunk was appended
+
+        Args:
+        - name (str): name of the frame, used in the handle
+
+        Returns:
+        - str
+        """
+        handle = f"{self.folder}/{name}_{uuid.uuid4().hex}/"
+        self.chunk_counts[handle] = 0
+
+        return handle
+
+    def append_chunk(self, handle: str, frame: pd.DataFrame) -> None:
+        """
+        Stores the frame as the next chunk of the handle. Empty frames are not stored
+
+        Args:
+        - handle (str): handle returned by create_chunked_handle
+        - frame (pd.DataFrame): chunk to be stored
+
+        Returns:
+        - None
+        """
+        if frame.empty:
+            return None
+
+        chunk = self.chunk_counts[handle]
+        self.write_frame(frame, f"{handle}part-{chunk:05d}")
+        self.chunk_counts[handle] = chunk + 1
+
+    def close_chunked_handle(self, handle: str) -> str:
+        """
+        Returns the handle once every chunk was appended. Returns NaN if no chunks were stored
+
+        Args:
+        - handle (str): handle returned by create_chunked_handle
+
+        Returns:
+        - str
+        """
+        chunks = self.chunk_counts.pop(handle, 0)
+
+        if chunks == 0:
+            return EMPTY_STRING_VAL
+
+        self.logger.info(f"Stored {chunks} chunks in {handle}")
+
+        return handle
+
+    def save_chunks(self, chunks: Iterable[pd.DataFrame], name: str) -> str:
+        """
+        Stores the frames chunk by chunk and returns the handle. Returns NaN if every frame is empty
+
+        Args:
+        - chunks (Iterable[pd.DataFrame]): chunks to be stored
+        - name (str): name of the frame, used in the handle
+
+        Returns:
+        - str
+        """
+        handle = self.create_chunked_handle(name)
+
+        for chunk in chunks:
+            self.append_chunk(handle, chunk)
+
+        return self.close_chunked_handle(handle)
+
+    def map_chunks(
+        self,
+        handle: str,
+        stage: Callable[[pd.DataFrame], pd.DataFrame],
+        name: str,
+    ) -> str:
+        """
+        Runs the stage on each chunk of the handle and stores the results chunk by chunk.
+        Only one chunk is loaded at a time
+
+        Args:
+        - handle (str): handle of the frame to be processed
+        - stage (Callable[[pd.DataFrame], pd.DataFrame]): stage run on each chunk
+        - name (str): name of the resulting frame, used in the handle
+
+        Returns:
+        - str
+        """
+
+        return self.save_chunks(
+            (stage(chunk) for chunk in self.iterate_chunks(handle)), name
+        )
+
+    def retrieve_chunk_paths(self, handle: str) -> List[str]:
+        """
+        Returns the paths of the chunks of the handle in the order they were stored.
+        Returns an empty list if the handle is NaN
+
+        Args:
+        - handle (str): handle returned when the frame was stored
+
+        Returns:
+        - List[str]
+        """
+        if handle is None or handle == EMPTY_STRING_VAL:
+            return []
+
+        if not self.is_chunked(handle):
+            return [handle]
+
+        return sorted(S3FileSystem().find(handle))
+
+    def iterate_chunks(self, handle: str) -> Iterator[pd.DataFrame]:
+        """
+        Yields the chunks of the handle one at a time. Frames stored at once are a single chunk
+
+        Args:
+        - handle (str): handle returned when the frame was stored
+
+        Returns:
+        - Iterator[pd.DataFrame]
+        """
+        for path in self.retrieve_chunk_paths(handle):
+            yield self.read_frame(path)
+
+    def cleanup(self):
+        """
+        Removes every frame stored for the run and the expired frames of the other runs
+        """
+        try:
+            if S3FileSystem().exists(self.folder):
+                S3FileSystem().rm(self.folder, recursive=True)
+                self.logger.info(f"Removed {self.folder}")
+        except Exception as e:
+            self.logger.exception("Error occured while removing files")
+            self.logger.exception(e)
+            self.logger.exception(self.folder)
+
+        self.expire_run_folders()
+
+    def expire_run_folders(self) -> None:
+        """
+        Removes the frames of the runs that weren't written for longer than the ttl, e.g. runs that failed
+
+        Returns:
+        - None
+        """
+        current_time = time.time()
+
+        try:
+            files = S3FileSystem().find(self.root, detail=True)
+        except Exception as e:
+            self.logger.info("Failed to list the stored frames. Skipping step")
+            self.logger.info(e)
+            return None
+
+        run_modified: Dict[str, float] = {}
+        for path, info in files.items():
+            relative_path = path.split(f"{FRAME_STORE_FOLDER_NAME}/", 1)[-1]
+            if "/" not in relative_path or "LastModified" not in info:
+                continue
+
+            run_folder = relative_path.split("/", 1)[0]
+            run_modified[run_folder] = max(
+                run_modified.get(run_folder, 0), info["LastModified"].timestamp()
+            )
+
+        for run_folder, modified in run_modified.items():
+            if current_time - modified <= FRAME_STORE_TTL:
+                continue
+
+            folder = f"{self.root}/{run_folder}"
+            try:
+                S3FileSystem().rm(folder, recursive=True)
+                self.logger.info(f"Removed the expired frames of {folder}")
+            except Exception as e:
+                self.logger.exception("Error occured while removing files")
+                self.logger.exception(e)
+                self.logger.exception(folder)
@@ -0,0 +1,382 @@
+import datetime as dt
+import json
+import pandas as pd
+
+from logging import Logger
+from s3fs import S3FileSystem
+from typing import List, Optional
+
+from ezyvet.data.logic.file_handler import FileHandler
+from ezyvet.data.logic.frame_holder import FrameHolder
+from ezyvet.data.models.voc_variables import (
+    BUCKET,
+    CONSOLIDATION_FILE_FORMAT,
+    DEFAULT_FILE_PATH,
+    INTEGRATION_NAME,
+    RUNNING_CONSOLIDATED_FOLDER_NAME,
+    VOC_CONSOLIDATION_DUPLICATE_FILTERS,
+    VOC_CONSOLIDATION_WINDOW_DAYS,
+)
+from ezyvet.data.tools.record_key_index import RecordKeyIndex
+
+
+class IncrementalConsolidator:
+    """
+    A class that keeps the running consolidated file of each consolidation window in s3.
+
+    The days from Friday to Tuesday are consolidated on Tuesday and the days from Wednesday to Thursday on Thursday.
+    Each daily frame is appended to the running file of its window so the consolidation only has to read one file.
+
+    The days covered by the running file are kept next to it. The running file is rebuilt from the daily files
+    when it doesn't cover every uploaded day before the current one, and it is only used by the consolidation
+    when it covers every uploaded day of the window
+    """
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the IncrementalConsolidator class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+
+    def retrieve_window_end(self, date: dt.date) -> dt.date:
+        """
+        Returns the consolidation day of the window the date belongs to
+
+        Args:
+        - date (dt.date): date of the daily frame
+
+        Returns:
+        - dt.date
+        """
+        days_until_consolidation = min(
+            (consolidation_day - date.weekday()) % 7
+            for consolidation_day in VOC_CONSOLIDATION_WINDOW_DAYS
+        )
+
+        return date + dt.timedelta(days=days_until_consolidation)
+
+    def retrieve_window_start(self, window_end: dt.date) -> dt.date:
+        """
+        Returns the first day of the window
+
+        Args:
+        - window_end (dt.date): consolidation day of the window
+
+        Returns:
+        - dt.date
+        """
+
+        return window_end - dt.timedelta(
+            days=VOC_CONSOLIDATION_WINDOW_DAYS[window_end.weekday()] - 1
+        )
+
+    def retrieve_daily_path(self, prefix: str, date: dt.date) -> str:
+        """
+        Returns the s3 path of the daily file of the date
+
+        Args:
+        - prefix (str): prefix of the daily file
+        - date (dt.date): date of the daily file
+
+        Returns:
+        - str
+        """
+        fh = FileHandler(self.logger)
+        filename = fh.dynamic_filename_generator(
+            prefix, date, fh.retrieve_file_extension(CONSOLIDATION_FILE_FORMAT)
+        )
+        dynamic_path = fh.dynamic_folderpath_generator(date)
+
+        return f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{dynamic_path}/{filename}"
+
+    def retrieve_uploaded_dates(
+        self, prefix: str, window_end: dt.date, last_date: dt.date
+    ) -> List[dt.date]:
+        """
+        Returns the days of the window up to the last date that have a daily file, the most recent day first.
+        Days uploaded only as csv are included
+
+        Args:
+        - prefix (str): prefix of the daily files
+        - window_end (dt.date): consolidation day of the window
+        - last_date (dt.date): last day to be checked
+
+        Returns:
+        - List[dt.date]
+        """
+        fh = FileHandler(self.logger)
+        window_start = self.retrieve_window_start(window_end)
+
+        uploaded_dates = []
+        date_loop = min(last_date, window_end)
+        while date_loop >= window_start:
+            if (
+                fh.retrieve_daily_file(
+                    self.retrieve_daily_path(prefix, date_loop),
+                    CONSOLIDATION_FILE_FORMAT,
+                )
+                is not None
+            ):
+                uploaded_dates.append(date_loop)
+            date_loop -= dt.timedelta(days=1)
+
+        return uploaded_dates
+
+    def retrieve_coverage_path(self, prefix: str, window_end: dt.date) -> str:
+        """
+        Returns the s3 path of the days covered by the running consolidated file of the window
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+
+        Returns:
+        - str
+        """
+        fh = FileHandler(self.logger)
+        running_path = self.retrieve_running_path(prefix, window_end)
+
+        return running_path.replace(
+            fh.retrieve_file_extension("parquet"), ".json"
+        )
+
+    def read_covered_dates(self, prefix: str, window_end: dt.date) -> List[dt.date]:
+        """
+        Returns the days covered by the running consolidated file of the window.
+        Returns an empty list if they don't exist or can't be read
+
+        Syntax:
+        {"dates": ["YYYY-MM-DD", ...]}
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+
+        Returns:
+        - List[dt.date]
+        """
+        path = self.retrieve_coverage_path(prefix, window_end)
+
+        try:
+            if S3FileSystem().exists(path):
+                with S3FileSystem().open(path, "r") as fs:
+                    return [dt.date.fromisoformat(date) for date in json.load(fs)["dates"]]
+        except Exception as e:
+            self.logger.exception("Error occured while reading file")
+            self.logger.exception(e)
+            self.logger.exception(path)
+
+        return []
+
+    def upload_covered_dates(
+        self, prefix: str, window_end: dt.date, dates: List[dt.date]
+    ) -> None:
+        """
+        Uploads the days covered by the running consolidated file of the window to s3
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+        - dates (List[dt.date]): days covered by the running file
+
+        Returns:
+        - None
+        """
+        path = self.retrieve_coverage_path(prefix, window_end)
+
+        try:
+            with S3FileSystem().open(path, "w") as fs:
+                json.dump(
+                    {"dates": sorted(date.isoformat() for date in set(dates))}, fs
+                )
+        except Exception as e:
+            self.logger.exception("Error occured while uploading file")
+            self.logger.exception(e)
+            self.logger.exception(path)
+
+    def retrieve_running_path(self, prefix: str, window_end: dt.date) -> str:
+        """
+        Returns the s3 path of the running consolidated file of the window
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+
+        Returns:
+        - str
+        """
+        fh = FileHandler(self.logger)
+        folder = fh.dynamic_folderpath_generator(
+            window_end, RUNNING_CONSOLIDATED_FOLDER_NAME
+        )
+        filename = fh.dynamic_filename_generator(
+            prefix, window_end, fh.retrieve_file_extension("parquet")
+        )
+
+        return f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{folder}/{filename}"
+
+    def read_running_frame(
+        self, prefix: str, window_end: dt.date
+    ) -> Optional[pd.DataFrame]:
+        """
+        Returns the running consolidated frame of the window. Returns None if the window has no running file
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+
+        Returns:
+        - Optional[pd.DataFrame]
+        """
+        fh = FileHandler(self.logger)
+
+        return fh.read_daily_file(
+            self.retrieve_running_path(prefix, window_end), "parquet"
+        )
+
+    def seed_running_frame(
+        self, prefix: str, window_end: dt.date, current_date: dt.date
+    ) -> pd.DataFrame:
+        """
+        Returns the consolidated frame of the daily files uploaded before the current date in the window.
+        Used when the running file doesn't cover exactly those days
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+        - current_date (dt.date): date of the daily frame
+
+        Returns:
+        - pd.DataFrame
+        """
+        fh = FileHandler(self.logger)
+
+        # the most recent day comes first, same as the consolidation of the daily files
+        frames = []
+        for date in self.retrieve_uploaded_dates(
+            prefix, window_end, current_date - dt.timedelta(days=1)
+        ):
+            frame = fh.read_daily_file(
+                self.retrieve_daily_path(prefix, date), CONSOLIDATION_FILE_FORMAT
+            )
+            if frame is not None:
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame()
+
+        self.logger.info(f"Seeding the running {prefix} file with {len(frames)} days")
+        holder = FrameHolder(self.logger)
+
+        return holder.remove_duplicates_from_frames(
+            pd.concat(frames, ignore_index=True),
+            VOC_CONSOLIDATION_DUPLICATE_FILTERS[prefix],
+        )
+
+    def append_frame(
+        self, prefix: str, frame: pd.DataFrame, current_date: dt.date
+    ) -> pd.DataFrame:
+        """
+        Appends the daily frame to the running consolidated file of its window and uploads it to s3.
+
+        Only the new records are checked against the keys of the running file.
+        The records of the daily frame are kept first, same as the consolidation of the daily files.
+        The running file is rebuilt from the daily files before the current date if it is missing, already covers
+        the current date, e.g. a re-run, or misses one of the uploaded days
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - frame (pd.DataFrame): daily frame to be appended
+        - current_date (dt.date): date of the daily frame
+
+        Returns:
+        - pd.DataFrame
+        """
+        column_duplicate_filter = VOC_CONSOLIDATION_DUPLICATE_FILTERS[prefix]
+        window_end = self.retrieve_window_end(current_date)
+        holder = FrameHolder(self.logger)
+        fh = FileHandler(self.logger)
+
+        # the new records are compared with the running records the way they are stored and read back
+        new_frame = holder.remove_duplicates_from_frames(
+            fh.retrieve_na_safe_frame(fh.retrieve_parquet_safe_frame(frame)),
+            column_duplicate_filter,
+        )
+        previous_dates = self.retrieve_uploaded_dates(
+            prefix, window_end, current_date - dt.timedelta(days=1)
+        )
+        running_frame = None
+        if set(self.read_covered_dates(prefix, window_end)) == set(previous_dates):
+            running_frame = self.read_running_frame(prefix, window_end)
+
+        if running_frame is None:
+            self.logger.info(
+                f"Running {prefix} file for {window_end} doesn't cover {previous_dates}, rebuilding it"
+            )
+            running_frame = self.seed_running_frame(prefix, window_end, current_date)
+
+        if running_frame.empty:
+            consolidated_frame = new_frame.reset_index(drop=True)
+        else:
+            new_index = RecordKeyIndex(self.logger, column_duplicate_filter).build(
+                new_frame
+            )
+            colliding = new_index.contains(running_frame).to_numpy()
+
+            self.logger.info(
+                f"{colliding.sum()} records of the running {prefix} file are duplicated by the new records"
+            )
+
+            # only the colliding records have to be compared with the new records
+            resolved_frame = holder.remove_duplicates_from_frames(
+                pd.concat([new_frame, running_frame[colliding]], ignore_index=True),
+                column_duplicate_filter,
+            )
+            consolidated_frame = pd.concat(
+                [resolved_frame, running_frame[~colliding]], ignore_index=True
+            )
+
+        self.logger.info(
+            f"Running {prefix} file for {window_end} has {len(consolidated_frame.index)} records"
+        )
+
+        # the days are only marked as covered once the running file was uploaded
+        if fh.upload_frame_to_parquet(
+            self.retrieve_running_path(prefix, window_end), consolidated_frame
+        ):
+            self.upload_covered_dates(
+                prefix, window_end, previous_dates + [current_date]
+            )
+
+        return consolidated_frame
+
+    def read_consolidated_frame(
+        self, prefix: str, window_end: dt.date
+    ) -> Optional[pd.DataFrame]:
+        """
+        Returns the running consolidated frame of the window if it covers every uploaded day of the window.
+        Returns None otherwise so the daily files are consolidated instead
+
+        Args:
+        - prefix (str): prefix of the consolidated file
+        - window_end (dt.date): consolidation day of the window
+
+        Returns:
+        - Optional[pd.DataFrame]
+        """
+        uploaded_dates = self.retrieve_uploaded_dates(prefix, window_end, window_end)
+        covered_dates = self.read_covered_dates(prefix, window_end)
+
+        if set(covered_dates) != set(uploaded_dates):
+            self.logger.info(
+                f"Running {prefix} file for {window_end} covers {sorted(covered_dates)} instead of {sorted(uploaded_dates)}"
+            )
+            return None
+
+        return self.read_running_frame(prefix, window_end)
@@ -0,0 +1,368 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from logging import Logger
+from s3fs import S3FileSystem
+from sqlalchemy.sql import Select
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ezyvet.data.models.hook_model import HookModel
+from ezyvet.data.models.voc_variables import (
+    BUCKET,
+    DEFAULT_FILE_PATH,
+    EMPTY_STRING_VAL,
+    INTEGRATION_NAME,
+    QUERY_CACHE_FOLDER_NAME,
+    QUERY_RESULT_CACHE_MAX_BYTES,
+    QUERY_RESULT_CACHE_TTL,
+)
+
+
+class QueryResultCache:
+    """
+    A class that caches the results of the hook queries in s3 as parquet.
+
+    The results are keyed by the rendered query, its parameters and the connection details, so retries and
+    custom requests with the same query don't read snowflake again. Each result is stored as
+    one parquet part per chunk. The index keeps when each result was created and last read,
+    results older than the ttl are removed and the least recently read results are removed
+    when the cache grows past its size.
+
+    The index is best-effort across processes. The lock only covers the threads of a single worker,
+    so mapped tasks and retries on other workers can overwrite each other's index updates or evict a result
+    while it is being read. Readers fall back to the live query if the cached result can't be read
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the QueryResultCache class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+        self.folder = f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{QUERY_CACHE_FOLDER_NAME}"
+        self.index_path = f"{self.folder}/index.json"
+
+    def retrieve_cache_key(self, hook: HookModel, stmt: Select) -> str:
+        """
+        Provides the key of the query result.
+        The parameters are part of the key since the rendered query only holds their names
+
+        Args:
+        - hook (HookModel): holds the connection id, database and schema
+        - stmt (Select): query of the hook
+
+        Returns:
+        - str
+        """
+        key_source = "\n".join(
+            [
+                hook.retrieve_conn_id(),
+                hook.retrieve_database(),
+                hook.retrieve_schema(),
+                str(stmt),
+                json.dumps(hook.retrieve_query_params(), sort_keys=True, default=str),
+            ]
+        )
+
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def retrieve_entry_folder(self, cache_key: str) -> str:
+        """
+        Provides the folder of the parts of the query result
+
+        Args:
+        - cache_key (str): key of the query result
+
+        Returns:
+        - str
+        """
+
+        return f"{self.folder}/{cache_key}"
+
+    def read_index(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the index of the cached results. Returns an empty index if it doesn't exist or can't be read
+
+        Syntax:
+        {KEY: {"created": EPOCH SECONDS, "accessed": EPOCH SECONDS, "parts": NUMBER OF PARTS}}
+
+        Returns:
+        - Dict[str, Dict[str, float]]
+        """
+        try:
+            if S3FileSystem().exists(self.index_path):
+                with S3FileSystem().open(self.index_path, "r") as fs:
+                    return json.load(fs)
+        except Exception as e:
+            self.logger.exception("Error occured while reading file")
+            self.logger.exception(e)
+            self.logger.exception(self.index_path)
+
+        return {}
+
+    def upload_index(self, index: Dict[str, Dict[str, float]]):
+        """
+        Uploads the index of the cached results to s3
+
+        Args:
+        - index (Dict[str, Dict[str, float]]): cached results and their timestamps
+        """
+        try:
+            with S3FileSystem().open(self.index_path, "w") as fs:
+                json.dump(index, fs, indent=2, sort_keys=True)
+        except Exception as e:
+            self.logger.exception("Error occured while uploading file")
+            self.logger.exception(e)
+            self.logger.exception(self.index_path)
+
+    def retrieve_part_paths(self, cache_key: str) -> Optional[List[str]]:
+        """
+        Returns the parts of the cached query result and marks it as read.
+        Returns None if the result isn't cached, has expired or the key is NaN
+
+        Args:
+        - cache_key (str): key of the query result
+
+        Returns:
+        - Optional[List[str]]
+        """
+        if cache_key == EMPTY_STRING_VAL:
+            return None
+
+        with self._lock:
+            index = self.read_index()
+            entry = index.get(cache_key)
+
+            if entry is None or time.time() - entry["created"] > QUERY_RESULT_CACHE_TTL:
+                return None
+
+            entry["accessed"] = time.time()
+            self.upload_index(index)
+
+        entry_folder = self.retrieve_entry_folder(cache_key)
+        self.logger.info(f"Reading the query result from the cache {entry_folder}")
+
+        return [
+            f"{entry_folder}/part-{part:05d}.parquet" for part in range(int(entry["parts"]))
+        ]
+
+    def download_parts(self, part_paths: List[str], folder: str) -> List[str]:
+        """
+        Copies the parts of the cached query result to a local folder and returns their local paths.
+        Each part is checked to be readable, so the result can't be evicted or found corrupt once it is being read
+
+        Args:
+        - part_paths (List[str]): s3 paths of the parts
+        - folder (str): local folder the parts are copied to
+
+        Returns:
+        - List[str]
+        """
+        local_paths = []
+        for part, path in enumerate(part_paths):
+            local_path = os.path.join(folder, f"part-{part:05d}.parquet")
+            S3FileSystem().get(path, local_path)
+            pq.read_metadata(local_path)
+            local_paths.append(local_path)
+
+        return local_paths
+
+    def read_part(self, path: str) -> pd.DataFrame:
+        """
+        Returns the frame of a cached part, either from s3 or from the local copy of the part
+
+        Args:
+        - path (str): path of the part
+
+        Returns:
+        - DataFrame
+        """
+        if path.startswith("s3://"):
+            with S3FileSystem().open(path, "rb") as fs:
+                table = pq.read_table(fs)
+        else:
+            table = pq.read_table(path)
+
+        # keep the same python types as the snowflake reads for dates and nullable integers
+        return table.to_pandas(date_as_object=True, integer_object_nulls=True)
+
+    def iterate_frames(self, part_paths: List[str]) -> Iterator[pd.DataFrame]:
+        """
+        Yields the frame of each cached part
+
+        Args:
+        - part_paths (List[str]): paths of the parts
+
+        Returns:
+        - Iterator[DataFrame]
+        """
+        for path in part_paths:
+            yield self.read_part(path)
+
+    def read_frame(self, part_paths: List[str]) -> pd.DataFrame:
+        """
+        Returns the cached query result as a single frame
+
+        Args:
+        - part_paths (List[str]): paths of the parts
+
+        Returns:
+        - DataFrame
+        """
+        frames = list(self.iterate_frames(part_paths))
+
+        if len(frames) == 1:
+            return frames[0]
+
+        return pd.concat(frames, ignore_index=True)
+
+    def cache_frame(self, cache_key: str, frame: pd.DataFrame) -> None:
+        """
+        Caches the query result. Nothing is cached if the key is NaN
+
+        Args:
+        - cache_key (str): key of the query result
+        - frame (DataFrame): query result
+
+        Returns:
+        - None
+        """
+        for _ in self.cache_chunks(cache_key, [frame]):
+            pass
+
+    def cache_chunks(
+        self, cache_key: str, chunks: Iterable[pd.DataFrame]
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields the chunks of the query result while caching each of them as a part.
+        The result is only added to the index once every chunk was cached.
+        Nothing is cached if the key is NaN or a chunk can't be stored as parquet
+
+        Args:
+        - cache_key (str): key of the query result
+        - chunks (Iterable[DataFrame]): chunks of the query result
+
+        Returns:
+        - Iterator[DataFrame]
+        """
+        caching = cache_key != EMPTY_STRING_VAL
+        entry_folder = self.retrieve_entry_folder(cache_key)
+        parts = 0
+
+        for chunk in chunks:
+            if caching:
+                path = f"{entry_folder}/part-{parts:05d}.parquet"
+                try:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    with S3FileSystem().open(path, "wb") as fs:
+                        pq.write_table(table, fs)
+                    parts += 1
+                except Exception as e:
+                    self.logger.info("Query result can't be cached. Skipping step")
+                    self.logger.info(e)
+                    caching = False
+
+            yield chunk
+
+        if not caching or parts == 0:
+            return None
+
+        with self._lock:
+            index = self.read_index()
+            index[cache_key] = {
+                "created": time.time(),
+                "accessed": time.time(),
+                "parts": parts,
+            }
+            self.evict_entries(index)
+            self.upload_index(index)
+
+        self.logger.info(f"Cached the query result in {entry_folder}")
+
+    def evict_entries(self, index: Dict[str, Dict[str, float]]) -> None:
+        """
+        Removes the expired results, the parts that aren't in the index anymore
+        and the least recently read results until the cache fits its size. The caller is expected to hold the lock
+
+        Args:
+        - index (Dict[str, Dict[str, float]]): cached results and their timestamps, updated in place
+
+        Returns:
+        - None
+        """
+        current_time = time.time()
+
+        try:
+            files = S3FileSystem().find(self.folder, detail=True)
+        except Exception as e:
+            self.logger.info("Failed to list the query result cache. Skipping step")
+            self.logger.info(e)
+            return None
+
+        entry_sizes: Dict[str, int] = {}
+        entry_modified: Dict[str, float] = {}
+        for path, info in files.items():
+            relative_path = path.split(f"{QUERY_CACHE_FOLDER_NAME}/", 1)[-1]
+            if "/" not in relative_path:
+                continue
+
+            cache_key = relative_path.split("/", 1)[0]
+            entry_sizes[cache_key] = entry_sizes.get(cache_key, 0) + info.get("size", 0)
+            if "LastModified" in info:
+                entry_modified[cache_key] = max(
+                    entry_modified.get(cache_key, 0), info["LastModified"].timestamp()
+                )
+
+        expired_keys = [
+            cache_key
+            for cache_key, entry in index.items()
+            if current_time - entry["created"] > QUERY_RESULT_CACHE_TTL
+        ]
+
+        # parts of results that were never indexed, e.g. interrupted writes, once no writer could still be using them
+        expired_keys += [
+            cache_key
+            for cache_key in entry_sizes
+            if cache_key not in index
+            and current_time - entry_modified.get(cache_key, current_time)
+            > QUERY_RESULT_CACHE_TTL
+        ]
+
+        least_recent_keys = sorted(
+            [cache_key for cache_key in index if cache_key not in expired_keys],
+            key=lambda cache_key: index[cache_key]["accessed"],
+        )
+        cache_size = sum(
+            entry_sizes.get(cache_key, 0)
+            for cache_key in entry_sizes
+            if cache_key not in expired_keys
+        )
+        while cache_size > QUERY_RESULT_CACHE_MAX_BYTES and len(least_recent_keys) > 1:
+            cache_key = least_recent_keys.pop(0)
+            cache_size -= entry_sizes.get(cache_key, 0)
+            expired_keys.append(cache_key)
+
+        for cache_key in expired_keys:
+            index.pop(cache_key, None)
+            entry_folder = self.retrieve_entry_folder(cache_key)
+            try:
+                if S3FileSystem().exists(entry_folder):
+                    S3FileSystem().rm(entry_folder, recursive=True)
+                    self.logger.info(f"Removed {entry_folder} from the query result cache")
+            except Exception as e:
+                self.logger.exception("Error occured while removing files")
+                self.logger.exception(e)
+                self.logger.exception(entry_folder)
@@ -1,19 +1,39 @@
 import pandas as pd
+import pyarrow as pa
+import re
 import sqlalchemy as sa
+import tempfile
+import threading
+import uuid
 
-from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
 from datetime import datetime
 from logging import Logger
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+from typing import Dict, Iterator, List, Tuple
 
+from ezyvet.data.logic.engine_cache import SnowflakeEngineCache
+from ezyvet.data.logic.query_result_cache import QueryResultCache
 from ezyvet.data.models.hook_model import HookModel
-from ezyvet.data.models.voc_variables import GROUP_BY_COLUMN_EXCLUSIONS
+from ezyvet.data.models.voc_variables import (
+    EMPTY_STRING_VAL,
+    GROUP_BY_COLUMN_EXCLUSIONS,
+    QUERY_RESULT_CACHE,
+    SAP_ID_TEMP_TABLE_THRESHOLD,
+)
 
 
 class SnowflakeReader:
     """
-    A class that grabs data from snowflake and return its dataframe equivalent
+    A class that grabs data from snowflake and return its dataframe equivalent.
+
+    The static part of each hook query is compiled once and stored on the class,
+    only the exclusions are added and the parameters bound on every read
     """
 
+    _compiled_queries: Dict[Tuple, Select] = {}
+    _lock = threading.Lock()
+
     def __init__(self, logger: Logger):
         """
         Constructor for the SnowflakeReader class.
@@ -36,6 +56,220 @@ class SnowflakeReader:
         Returns:
         - DataFrame
         """
+        cache = QueryResultCache(self.logger)
+        stmt = self.build_query(hook)
+        cache_key = self.retrieve_cache_key(hook, stmt)
+
+        # other workers can evict the cached result while it is read, the query is run instead
+        part_paths = cache.retrieve_part_paths(cache_key)
+        if part_paths is not None:
+            try:
+                return cache.read_frame(part_paths)
+            except Exception as e:
+                self.logger.warning("Reading the cached query result failed. Querying snowflake")
+                self.logger.warning(e)
+
+        # reuse the engine of hooks that share the same connection details
+        alchemy_engine = SnowflakeEngineCache(self.logger).retrieve_engine(hook)
+
+        # temp tables only live in the session, so the query has to share the connection
+        with alchemy_engine.connect() as connection:
+            try:
+                # the sap id filter changes once the sap ids are loaded into the temp table
+                if self.load_sap_id_table(connection, hook):
+                    stmt = self.build_query(hook)
+
+                if hook.retrieve_arrow_fetch():
+                    frame = self.read_arrow_frame(stmt, connection)
+                else:
+                    frame = pd.read_sql(stmt, connection)
+            finally:
+                self.drop_sap_id_table(connection, hook)
+
+        cache.cache_frame(cache_key, frame)
+
+        return frame
+
+    def get_dataframe_chunks_from_snowflake(
+        self, hook: HookModel, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields the dataframe from snowflake in chunks so only a single chunk is held in memory
+
+        Args:
+        - hook (HookModel): holds the schema and connection id to be used for the creation of snowflake hook
+        - chunksize (int): number of rows per chunk
+
+        Returns:
+        - Iterator[DataFrame]
+        """
+        cache = QueryResultCache(self.logger)
+        stmt = self.build_query(hook)
+        cache_key = self.retrieve_cache_key(hook, stmt)
+
+        # the parts are copied before the first chunk is yielded,
+        # so the query can still be run instead if other workers evicted the cached result
+        part_paths = cache.retrieve_part_paths(cache_key)
+        if part_paths is not None:
+            with tempfile.TemporaryDirectory() as folder:
+                local_paths = None
+                try:
+                    local_paths = cache.download_parts(part_paths, folder)
+                except Exception as e:
+                    self.logger.warning(
+                        "Reading the cached query result failed. Querying snowflake"
+                    )
+                    self.logger.warning(e)
+
+                if local_paths is not None:
+                    yield from cache.iterate_frames(local_paths)
+                    return None
+
+        # reuse the engine of hooks that share the same connection details
+        alchemy_engine = SnowflakeEngineCache(self.logger).retrieve_engine(hook)
+
+        with alchemy_engine.connect() as connection:
+            try:
+                # the sap id filter changes once the sap ids are loaded into the temp table
+                if self.load_sap_id_table(connection, hook):
+                    stmt = self.build_query(hook)
+
+                if hook.retrieve_arrow_fetch():
+                    chunks = self.read_arrow_chunks(stmt, connection, chunksize)
+                else:
+                    chunks = pd.read_sql(stmt, connection, chunksize=chunksize)
+
+                yield from cache.cache_chunks(cache_key, chunks)
+            finally:
+                self.drop_sap_id_table(connection, hook)
+
+    def retrieve_cache_key(self, hook: HookModel, stmt: Select) -> str:
+        """
+        Provides the key of the query result of the hook. Returns NaN if the result shouldn't be cached.
+
+        The key is built before the sap ids are loaded into a temp table,
+        so the query binds the sap ids instead of filtering against the random table name
+
+        Args:
+        - hook (HookModel): holds the connection details and query definition
+        - stmt (Select): query of the hook built by build_query
+
+        Returns:
+        - str
+        """
+        if not QUERY_RESULT_CACHE or not hook.retrieve_result_cacheable():
+            return EMPTY_STRING_VAL
+
+        return QueryResultCache(self.logger).retrieve_cache_key(hook, stmt)
+
+    def load_sap_id_table(self, connection: Connection, hook: HookModel) -> bool:
+        """
+        Loads the sap ids of the hook into a session temp table if there are too many
+        to be bound in the query and returns if they were loaded. The hook filters against the temp table afterwards
+
+        Args:
+        - connection (Connection): connection where the temp table will be created
+        - hook (HookModel): holds the sap ids to be loaded
+
+        Returns:
+        - bool
+        """
+        sap_ids = sorted({str(sap_id) for sap_id in hook.sap_ids if sap_id})
+
+        if len(sap_ids) <= SAP_ID_TEMP_TABLE_THRESHOLD:
+            return False
+
+        table_name = f"VOC_SAP_IDS_{uuid.uuid4().hex[:12].upper()}"
+        self.logger.info(f"Loading {len(sap_ids)} sap ids into {table_name}")
+
+        connection.execute(
+            sa.text(f"CREATE TEMPORARY TABLE {table_name} (SAP_ID VARCHAR)")
+        )
+        connection.execute(
+            sa.text(f"INSERT INTO {table_name} (SAP_ID) VALUES (:sap_id)"),
+            [{"sap_id": sap_id} for sap_id in sap_ids],
+        )
+
+        hook.sap_id_table = table_name
+
+        return True
+
+    def drop_sap_id_table(self, connection: Connection, hook: HookModel) -> None:
+        """
+        Drops the sap id temp table of the hook so it doesn't stay on the pooled connection
+
+        Args:
+        - connection (Connection): connection where the temp table was created
+        - hook (HookModel): holds the temp table name
+
+        Returns:
+        - None
+        """
+        if hook.sap_id_table == EMPTY_STRING_VAL:
+            return None
+
+        try:
+            connection.execute(sa.text(f"DROP TABLE IF EXISTS {hook.sap_id_table}"))
+        except Exception as e:
+            self.logger.warning(f"Failed to drop {hook.sap_id_table}")
+            self.logger.warning(e)
+
+        hook.sap_id_table = EMPTY_STRING_VAL
+
+    def build_query(self, hook: HookModel) -> Select:
+        """
+        Builds the select statement based from the hook definition.
+        The dynamic values of the exclusions are bound as parameters,
+        lists of values are bound to a single expanding parameter so the rendered query doesn't depend on their length
+
+        Args:
+        - hook (HookModel): holds the table, columns, joins and exclusions of the query
+
+        Returns:
+        - Select
+        """
+        stmt = self.retrieve_compiled_query(hook)
+        params = hook.retrieve_query_params()
+        expanding_params = [
+            name for name, value in params.items() if isinstance(value, (list, tuple))
+        ]
+
+        # apply all the exclusions for the where clause
+        for clause in hook.retrieve_exclusions():
+            text_clause = sa.text(clause)
+            bind_names = [
+                name for name in expanding_params if re.search(rf":{name}\b", clause)
+            ]
+            if bind_names:
+                text_clause = text_clause.bindparams(
+                    *[sa.bindparam(name, expanding=True) for name in bind_names]
+                )
+            stmt = stmt.where(text_clause)
+
+        # apply the filter that separates the hook from the hooks it can be fused with
+        for column in hook.retrieve_fusion_filter().keys():
+            stmt = stmt.where(
+                sa.text(f"{column} = :{hook.retrieve_fusion_param_name(column)}")
+            )
+
+        stmt = stmt.params(**params)
+
+        self.logger.info(str(stmt))
+        self.logger.info(params)
+
+        return stmt
+
+    def retrieve_compiled_query(self, hook: HookModel) -> Select:
+        """
+        Returns the static part of the hook query, compiling it if it doesn't exist yet.
+        Hooks of the same class share the query as long as their definition is the same
+
+        Args:
+        - hook (HookModel): holds the table, columns, renames, joins and group by of the query
+
+        Returns:
+        - Select
+        """
         try:
             table = hook.retrieve_table()
             cols = hook.retrieve_columns()
@@ -47,9 +281,52 @@ class SnowflakeReader:
             )
             raise e
 
-        # set up exclusions
-        exclusion_list = hook.retrieve_exclusions()
+        join_tables = hook.retrieve_join_tables()
+        group_by = hook.retrieve_group_by()
+        key = (
+            type(hook).__qualname__,
+            table,
+            tuple(cols),
+            tuple(renames.items()),
+            tuple(join_tables.items()) if join_tables else (),
+            group_by,
+        )
 
+        with self._lock:
+            stmt = self._compiled_queries.get(key)
+
+        if stmt is not None:
+            return stmt
+
+        self.logger.info(f"Compiling the query of {type(hook).__name__}")
+        stmt = self.compile_query(table, cols, renames, join_tables, group_by)
+
+        with self._lock:
+            self._compiled_queries[key] = stmt
+
+        return stmt
+
+    def compile_query(
+        self,
+        table: str,
+        cols: List[str],
+        renames: dict,
+        join_tables: dict,
+        group_by: bool,
+    ) -> Select:
+        """
+        Builds the select statement without the exclusions
+
+        Args:
+        - table (str): main table of the query
+        - cols (List[str]): columns of the query
+        - renames (dict): labels of the columns
+        - join_tables (dict): tables to be joined
+        - group_by (bool): if the query is grouped by the columns
+
+        Returns:
+        - Select
+        """
         # start building the query:
         columns = []
         for c in cols:
@@ -74,8 +351,8 @@ class SnowflakeReader:
         stmt = sa.select(columns).select_from(sa.table(table).alias("main"))
 
         # add a join clause if the hook says so
-        if hook.retrieve_join_tables():
-            for key, val in hook.retrieve_join_tables().items():
+        if join_tables:
+            for key, val in join_tables.items():
                 info = key.split(":", 1)
                 outer_conditions = val.split(":", 1)
                 stmt = stmt.join(
@@ -84,11 +361,7 @@ class SnowflakeReader:
                     isouter=bool(outer_conditions[0]),
                 )
 
-        # apply all the exclusions for the where clause
-        for clause in exclusion_list:
-            stmt = stmt.where(sa.text(clause))
-
-        if hook.retrieve_group_by():
+        if group_by:
             grouping_list = [
                 groupColumn
                 for groupColumn in cols
@@ -98,13 +371,113 @@ class SnowflakeReader:
             ]
             stmt = stmt.group_by(sa.text(", ".join(grouping_list)))
 
-        self.logger.info(str(stmt))
+        return stmt
+
+    def read_arrow_frame(self, stmt: Select, connection: Connection) -> pd.DataFrame:
+        """
+        Returns the dataframe by fetching the result batches as arrow tables
+        and building the frame column-wise instead of row by row
+
+        Args:
+        - stmt (Select): query to be executed
+        - connection (Connection): connection used to query snowflake
+
+        Returns:
+        - DataFrame
+        """
+        try:
+            result = connection.execute(stmt)
+            columns = list(result.keys())
+            # the dbapi cursor of the snowflake connector exposes the arrow batches
+            batches = list(result.cursor.fetch_arrow_batches())
+        except Exception as e:
+            self.logger.warning("Arrow fetch failed. Falling back to read_sql")
+            self.logger.warning(e)
+            return pd.read_sql(stmt, connection)
+
+        return self.convert_arrow_batches(batches, columns)
+
+    def read_arrow_chunks(
+        self, stmt: Select, connection: Connection, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields the dataframe in chunks of exactly the chunksize built from the arrow result batches,
+        only the last chunk can be smaller. Falls back to read_sql chunks if the arrow fetch fails
+
+        Args:
+        - stmt (Select): query to be executed
+        - connection (Connection): connection used to query snowflake
+        - chunksize (int): number of rows per chunk
+
+        Returns:
+        - Iterator[DataFrame]
+        """
+        try:
+            result = connection.execute(stmt)
+            columns = list(result.keys())
+            # the dbapi cursor of the snowflake connector exposes the arrow batches
+            batch_iterator = iter(result.cursor.fetch_arrow_batches())
+            first_batch = next(batch_iterator, None)
+        except Exception as e:
+            self.logger.warning("Arrow fetch failed. Falling back to read_sql")
+            self.logger.warning(e)
+            yield from pd.read_sql(stmt, connection, chunksize=chunksize)
+            return None
+
+        if first_batch is None:
+            return None
+
+        batches: List[pa.Table] = [first_batch]
+        row_count = first_batch.num_rows
+        for batch in batch_iterator:
+            batches.append(batch)
+            row_count += batch.num_rows
+
+            if row_count < chunksize:
+                continue
+
+            # the batches are cut at the chunksize, the rest is kept for the next chunk
+            table = pa.concat_tables(batches)
+            offset = 0
+            while row_count - offset >= chunksize:
+                yield self.convert_arrow_batches(
+                    [table.slice(offset, chunksize)], columns, False
+                )
+                offset += chunksize
+
+            batches = [table.slice(offset)]
+            row_count -= offset
+
+        while row_count > 0:
+            table = pa.concat_tables(batches)
+            yield self.convert_arrow_batches([table.slice(0, chunksize)], columns, False)
+            batches = [table.slice(chunksize)]
+            row_count = max(row_count - chunksize, 0)
+
+    def convert_arrow_batches(
+        self, batches: List[pa.Table], columns: List[str], self_destruct: bool = True
+    ) -> pd.DataFrame:
+        """
+        Converts the arrow batches to a single dataframe
+
+        Args:
+        - batches (List[pa.Table]): arrow batches returned by the cursor
+        - columns (List[str]): column names of the query
+        - self_destruct (bool): frees the arrow memory while converting.
+        Disabled for slices since the rest of the table shares their memory
+
+        Returns:
+        - DataFrame
+        """
+        if not batches:
+            return pd.DataFrame(columns=columns)
 
-        alchemy_hook = SnowflakeHook(
-            snowflake_conn_id=hook.retrieve_conn_id(),
-            database=hook.retrieve_database(),
-            schema=hook.retrieve_schema(),
+        # keep the same python types as read_sql for dates and nullable integers
+        frame = pa.concat_tables(batches).to_pandas(
+            date_as_object=True,
+            integer_object_nulls=True,
+            self_destruct=self_destruct,
         )
-        alchemy_engine = alchemy_hook.get_sqlalchemy_engine()
+        frame.columns = columns
 
-        return pd.read_sql(stmt, alchemy_engine)
+        return frame
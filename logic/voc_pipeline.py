@@ -0,0 +1,761 @@
+import pandas as pd
+
+from datetime import datetime, timedelta
+from logging import Logger
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ezyvet.data.logic.compute_fields import ComputeFields
+from ezyvet.data.logic.custom_request_manifest import CustomRequestManifest
+from ezyvet.data.logic.engine_cache import SnowflakeEngineCache
+from ezyvet.data.logic.failed_records_ledger import FailedRecordsLedger
+from ezyvet.data.logic.file_handler import FileHandler
+from ezyvet.data.logic.frame_generator import FrameGenerator
+from ezyvet.data.logic.frame_holder import FrameHolder
+from ezyvet.data.logic.frame_store import FrameStore
+from ezyvet.data.logic.incremental_consolidator import IncrementalConsolidator
+from ezyvet.data.logic.notifier import IntegrationNotifier
+from ezyvet.data.models.custom_request import customrequest
+from ezyvet.data.models.voc_variables import (
+    BUCKET,
+    CONSOLIDATED_FOLDER_NAME,
+    CONSOLIDATION_FILE_FORMAT,
+    DEFAULT_FILE_PATH,
+    DUPLICATED_CONSOLIDATED_COLUMNS,
+    EMPTY_CG_VAL,
+    EMPTY_REV_VAL,
+    EMPTY_STRING_VAL,
+    FILENAME_CG,
+    FILENAME_FAILED,
+    FILENAME_REV,
+    INCREMENTAL_CONSOLIDATION,
+    INTEGRATION_NAME,
+    VOC_ARTIFACT_FORMATS,
+    VOC_CONSOLIDATION_DUPLICATE_FILTERS,
+    VOC_CUSTOM_REQUEST_DATE_COLUMN,
+    VOC_JOIN_COLUMN,
+    VOC_REVENUE_EXPORT,
+)
+from ezyvet.data.tools.column_fixer import ColumnFixer
+from ezyvet.data.tools.custom_request_coalescer import CustomRequestCoalescer
+
+
+class VocPipeline:
+    """
+    A class that contains each stage of the VoC Integration.
+
+    The stages are used by the tasks of the DAG, or run one after the other in a single task by the fused mode
+    """
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the VocPipeline class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+
+    def retrieve_open_custom_filenames(self) -> List[str]:
+        """
+        Returns the custom requests that haven't been generated yet, the latest request first
+
+        Returns:
+        - List[str]
+        """
+        current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        recent_requested_files: List[str] = []
+
+        self.logger.info("Current Request List:")
+        self.logger.info(customrequest.REQ_LIST)
+
+        for reqdate, reqrange in customrequest.REQ_LIST.items():
+            reqdate_timestamp = datetime.strptime(reqdate, "%Y-%m-%d")
+            days_passed = abs((current_date - reqdate_timestamp).days)
+
+            # we only check entries less than N days
+            if days_passed > customrequest.DATE_RANGE:
+                continue
+
+            recent_requested_files.append(f"{reqdate}_{reqrange}")
+
+        self.logger.info("Recent Requested Files List:")
+        self.logger.info(recent_requested_files)
+
+        if not recent_requested_files:
+            return []
+
+        # the manifest is rebuilt from the custom request folders if it is missing
+        manifest = CustomRequestManifest(self.logger).retrieve_manifest()
+
+        if manifest is None:
+            return []
+
+        recent_filenames_list: List[str] = list(manifest.keys())
+
+        self.logger.info("Recent Uploaded Files List:")
+        self.logger.info(recent_filenames_list)
+
+        req_to_accomplish = list(
+            sorted(
+                set(recent_requested_files) - set(recent_filenames_list),
+                key=recent_requested_files.index,
+            )
+        )
+
+        self.logger.info("Requests Left to Accomplish:")
+        self.logger.info(req_to_accomplish)
+
+        return req_to_accomplish
+
+    def read_previous_failed_records(
+        self, request_filename: str = EMPTY_STRING_VAL
+    ) -> pd.DataFrame:
+        """
+        Read the failed records ledger from S3 and if successful return the dataframe.
+        Falls back to the failed records of the previous day if the ledger doesn't exist yet
+
+        Args:
+        - request_filename (str): contains the custom file name, returns a string NaN if empty
+
+        Returns:
+        - pd.DataFrame
+        """
+        # exit early if the request filename is valid
+        if request_filename != EMPTY_STRING_VAL:
+            return pd.DataFrame()
+
+        ledger = FailedRecordsLedger(self.logger)
+        df = ledger.read_ledger()
+
+        if not df.empty:
+            self.logger.info(
+                f"Read {len(df.index)} records from the failed records ledger"
+            )
+            return df
+
+        fh = FileHandler(self.logger)
+        previous_date = (datetime.now() - timedelta(days=1)).date()
+        dynamic_filename = fh.dynamic_filename_generator(FILENAME_FAILED, previous_date)
+        dynamic_path = fh.dynamic_folderpath_generator(previous_date)
+        key = (
+            f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{dynamic_path}/{dynamic_filename}"
+        )
+        path = f"s3://{BUCKET}/{key}"
+        df = fh.read_csvfile_to_frame(path)
+
+        self.logger.info(df.to_json())
+
+        return df
+
+    def read_snowflake_frame(
+        self,
+        previous_failed_frame: pd.DataFrame = pd.DataFrame(),
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Read data from snowflake and generate data frames based on return values.
+        Returns None if there are no records to process
+
+        Args:
+        - previous_failed_frame (pd.DataFrame): contains the records for the previous failed frame
+        - custom_filename (str): contains the custom file name, returns a string NaN if empty
+
+        Returns:
+        - Optional[pd.DataFrame]
+        """
+        holder = FrameHolder(self.logger)
+        fg = FrameGenerator(self.logger)
+
+        try:
+            holder.retrieve_base_frame(previous_failed_frame, custom_filename)
+            ids = holder.base_frame[VOC_JOIN_COLUMN].to_list()
+
+            # check if theres any sap ids that were returned. if not we just escape the whole function
+            if not ids:
+                return None
+
+            # retrieve the supplemental frames from snowflake
+            holder.retrieve_supplemental_frames(ids)
+        finally:
+            # close the shared snowflake connections once we're done reading
+            SnowflakeEngineCache(self.logger).dispose_engines()
+
+        # merge the frames via frame generator
+        combined_data_frame = fg.merge_frames(
+            holder.base_frame, holder.supplemental_frames
+        )
+
+        # remove the hook values from memory
+        holder = None
+
+        self.logger.info(combined_data_frame.to_json())
+        return combined_data_frame
+
+    def read_custom_request_chunks(
+        self, store: FrameStore, custom_filenames: List[str]
+    ) -> List[Tuple[str, str]]:
+        """
+        Stores the records of each custom request chunk by chunk and returns the handle of each request.
+        The handle is NaN if the request has no records
+
+        Requests with overlapping date ranges are read from snowflake once, each merged chunk is sliced per request.
+        Duplicates are removed per request afterwards by duplicate_sanity_check_chunks
+
+        Args:
+        - store (FrameStore): stores the chunks of the requests
+        - custom_filenames (List[str]): custom requests to be read
+
+        Returns:
+        - List[Tuple[str, str]]
+        """
+        holder = FrameHolder(self.logger)
+        coalescer = CustomRequestCoalescer(self.logger)
+        date_columns = holder.retrieve_custom_date_columns()
+        request_handles: Dict[str, str] = {}
+
+        for group in coalescer.coalesce_requests(custom_filenames):
+            coalesced_filename = coalescer.retrieve_coalesced_filename(group)
+            handles = {
+                custom_filename: store.create_chunked_handle("raw")
+                for custom_filename in group
+            }
+
+            # custom requests can span months, so they are read and merged chunk by chunk
+            try:
+                for chunk in holder.iterate_merged_frames(coalesced_filename):
+                    for custom_filename in group:
+                        request_chunk = coalescer.slice_frame(
+                            chunk, custom_filename, date_columns
+                        ).drop(columns=[VOC_CUSTOM_REQUEST_DATE_COLUMN], errors="ignore")
+                        store.append_chunk(handles[custom_filename], request_chunk)
+            finally:
+                SnowflakeEngineCache(self.logger).dispose_engines()
+
+            for custom_filename in group:
+                request_handles[custom_filename] = store.close_chunked_handle(
+                    handles[custom_filename]
+                )
+
+        return [
+            (custom_filename, request_handles[custom_filename])
+            for custom_filename in custom_filenames
+        ]
+
+    def duplicate_sanity_check(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        There are instances where the duplicate check in read snowflake to object
+        doesnt execute properly. We will rerun the method here before continuing the pipeline.
+
+        It should just skip if there are no more duplicates.
+
+        Args:
+        - df (pd.DataFrame): DataFrame to be cleaned
+
+        Returns:
+        - pd.DataFrame
+        """
+        holder = FrameHolder(self.logger)
+
+        # the stages see the missing values the way the frame store returns them in both execution modes
+        return holder.remove_duplicates_from_frames(
+            ColumnFixer(self.logger).fix_missing_values(df)
+        )
+
+    def duplicate_sanity_check_chunks(self, store: FrameStore, handle: str) -> str:
+        """
+        Removes the duplicates of the stored frame and returns the handle of the cleaned frame.
+        Frames stored chunk by chunk are cleaned across their chunks without appending them
+
+        Args:
+        - store (FrameStore): stores the frames of the run
+        - handle (str): handle of the DataFrame to be cleaned
+
+        Returns:
+        - str
+        """
+        if handle == EMPTY_STRING_VAL:
+            return EMPTY_STRING_VAL
+
+        if not store.is_chunked(handle):
+            checked_frame = self.duplicate_sanity_check(store.load_frame(handle))
+            return store.save_frame(checked_frame, "checked")
+
+        holder = FrameHolder(self.logger)
+        checked_chunks = holder.remove_duplicates_from_chunks(
+            lambda: store.iterate_chunks(handle)
+        )
+
+        return store.save_chunks(checked_chunks, "checked")
+
+    def process_computed_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Process the dataframe to acquire computed values
+
+        Args:
+        - df (pd.DataFrame): Dataframe that will be transformed
+
+        Returns:
+        - pd.DataFrame
+        """
+        cf = ComputeFields(self.logger)
+
+        return cf.add_computed_fields(df)
+
+    def create_revenue_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Creates revenue frame based from the existing one
+
+        Args:
+        - df (pd.DataFrame): Dataframe where we will copy from
+
+        Returns:
+        - pd.DataFrame
+        """
+        fg = FrameGenerator(self.logger)
+
+        return fg.create_revenue_frame(ColumnFixer(self.logger).fix_missing_values(df))
+
+    def create_cg_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Creates cg frame based from the existing one
+
+        Args:
+        - df (pd.DataFrame): Dataframe where we will copy from
+
+        Returns:
+        - pd.DataFrame
+        """
+        fg = FrameGenerator(self.logger)
+
+        return fg.create_processed_frame(
+            ColumnFixer(self.logger).fix_missing_values(df)
+        )
+
+    def separate_valid_invalid_entries(
+        self,
+        df: pd.DataFrame,
+        previous_failed_frame: pd.DataFrame = pd.DataFrame(),
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Separates the valid from the invalid entries in a single pass.
+        The failed records ledger is updated with the invalid entries if the execution is not a custom request
+
+        Args:
+        - df (pd.DataFrame): Dataframe where we will filter out the values
+        - previous_failed_frame (pd.DataFrame): Dataframe that contains the previous failed records
+        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+
+        Returns:
+        - Tuple[pd.DataFrame, pd.DataFrame]
+        """
+        fg = FrameGenerator(self.logger)
+        fixer = ColumnFixer(self.logger)
+        df = fixer.fix_missing_values(df)
+
+        # We should only use the previous frame if the custom_filename is empty
+        if custom_filename != EMPTY_STRING_VAL:
+            previous_failed_frame = pd.DataFrame()
+        previous_failed_frame = fixer.fix_missing_values(previous_failed_frame)
+
+        valid_frame, invalid_frame = fg.partition_frames(df, previous_failed_frame)
+
+        # custom requests don't affect the ledger
+        if custom_filename == EMPTY_STRING_VAL:
+            ledger = FailedRecordsLedger(self.logger)
+            ledger.update_ledger(invalid_frame, df, datetime.now().date())
+
+        return valid_frame, invalid_frame
+
+    def separate_valid_invalid_chunks(
+        self,
+        store: FrameStore,
+        handle: str,
+        previous_failed_frame: pd.DataFrame = pd.DataFrame(),
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> Tuple[str, str]:
+        """
+        Separates the valid from the invalid entries of each chunk of the stored frame
+        and returns the handles of the valid and invalid frames.
+        The daily records are a single chunk, so the ledger is updated once per run
+
+        Args:
+        - store (FrameStore): stores the frames of the run
+        - handle (str): handle of the Dataframe where we will filter out the values
+        - previous_failed_frame (pd.DataFrame): Dataframe that contains the previous failed records
+        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+
+        Returns:
+        - Tuple[str, str]
+        """
+        valid_handle = store.create_chunked_handle("valid")
+        invalid_handle = store.create_chunked_handle("invalid")
+
+        for chunk in store.iterate_chunks(handle):
+            valid_frame, invalid_frame = self.separate_valid_invalid_entries(
+                chunk, previous_failed_frame, custom_filename
+            )
+            store.append_chunk(valid_handle, valid_frame)
+            store.append_chunk(invalid_handle, invalid_frame)
+
+        return (
+            store.close_chunked_handle(valid_handle),
+            store.close_chunked_handle(invalid_handle),
+        )
+
+    def push_data_to_s3_bucket(
+        self,
+        df: pd.DataFrame,
+        filename: str,
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> str:
+        """
+        Generate the files from Data frame and Upload them to S3.
+        The formats are based from VOC_ARTIFACT_FORMATS, the key of the deliverable is returned
+
+        Args:
+        - df (pd.DataFrame): Dataframe to be converted to csv
+        - filename (str): csv filename
+        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+
+        Returns:
+        - str
+        """
+
+        return self.push_chunks_to_s3_bucket(lambda: [df], filename, custom_filename)
+
+    def push_chunks_to_s3_bucket(
+        self,
+        read_chunks: Callable[[], Iterable[pd.DataFrame]],
+        filename: str,
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> str:
+        """
+        Generate the files from the chunks of a Data frame and Upload them to S3, appending one chunk at a time.
+        The formats are based from VOC_ARTIFACT_FORMATS, the key of the deliverable is returned
+
+        Args:
+        - read_chunks (Callable[[], Iterable[pd.DataFrame]]): returns the chunks to be uploaded, called once per format
+        - filename (str): csv filename
+        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+
+        Returns:
+        - str
+        """
+        fh = FileHandler(self.logger)
+
+        # custom requests only upload the deliverable
+        file_formats = VOC_ARTIFACT_FORMATS.get(filename, ["csv"])
+        if custom_filename != EMPTY_STRING_VAL:
+            file_formats = file_formats[:1]
+
+        keys: List[str] = []
+        current_date = datetime.now().date()
+        for file_format in file_formats:
+            # build the filename
+            file_extension = fh.retrieve_file_extension(file_format)
+            if custom_filename == EMPTY_STRING_VAL:
+                dynamic_filename = fh.dynamic_filename_generator(
+                    filename, current_date, file_extension
+                )
+                dynamic_path = fh.dynamic_folderpath_generator(current_date)
+            else:
+                dynamic_filename = f"{filename}_{custom_filename}{file_extension}"
+                dynamic_path = fh.dynamic_folderpath_generator(
+                    current_date, customrequest.FOLDER
+                )
+
+            key = f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{dynamic_path}/{dynamic_filename}"
+            path = f"s3://{BUCKET}/{key}"
+            if not fh.upload_chunks(path, read_chunks(), file_format):
+                self.logger.info("Returning empty key")
+                return EMPTY_STRING_VAL
+
+            self.logger.info(key)
+            keys.append(key)
+
+        # keep the running consolidated file of the window up to date
+        if (
+            INCREMENTAL_CONSOLIDATION
+            and custom_filename == EMPTY_STRING_VAL
+            and filename in VOC_CONSOLIDATION_DUPLICATE_FILTERS
+        ):
+            consolidator = IncrementalConsolidator(self.logger)
+            consolidator.append_frame(
+                filename, pd.concat(list(read_chunks()), ignore_index=True), current_date
+            )
+
+        return keys[0]
+
+    def consolidate_cg_records(
+        self, is_import: bool = True, custom_filename: str = EMPTY_STRING_VAL
+    ) -> str:
+        """
+        Consolidates the records for previous days to a single file and upload it to s3
+
+        Args:
+        - is_import (bool): Flag whether to consolidate cgimport or revenue file
+        - custom_filename (str): used to determine whether we should skip the stage
+
+        Returns:
+        - str
+        """
+        # sanity check to skip the stage if we have a custom filename
+        if custom_filename != EMPTY_STRING_VAL:
+            return EMPTY_STRING_VAL
+
+        current_date = datetime.now()
+        current_day = current_date.weekday()
+
+        # 1 is tuesday and 3 is thursday
+        if current_day != 1 and current_day != 3:
+            self.logger.info(
+                "Won't consolidate records, date is neither tuesday nor thursday"
+            )
+            self.logger.info(current_day)
+            self.logger.info(current_date)
+            return EMPTY_STRING_VAL
+
+        fh = FileHandler(self.logger)
+
+        if is_import:
+            prefix = FILENAME_CG
+            column_duplicate_filter = DUPLICATED_CONSOLIDATED_COLUMNS
+        else:
+            prefix = FILENAME_REV
+            column_duplicate_filter = VOC_REVENUE_EXPORT
+
+        # the running file already contains the consolidated records of the window if it covers every day
+        running_frame = None
+        if INCREMENTAL_CONSOLIDATION:
+            consolidator = IncrementalConsolidator(self.logger)
+            running_frame = consolidator.read_consolidated_frame(
+                prefix, current_date.date()
+            )
+
+        if running_frame is not None:
+            finalised_frame = running_frame
+        else:
+            finalised_frame = fh.consolidate_dataframe(
+                current_day,
+                column_duplicate_filter,
+                prefix,
+                [],
+                current_date,
+                CONSOLIDATION_FILE_FORMAT,
+            )
+
+        # upload the dataframe
+        upload_folder = fh.dynamic_folderpath_generator(
+            current_date.date(), CONSOLIDATED_FOLDER_NAME
+        )
+        upload_filename = fh.dynamic_filename_generator(prefix, current_date.date())
+        upload_key = (
+            f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{upload_folder}/{upload_filename}"
+        )
+        upload_path = f"s3://{BUCKET}/{upload_key}"
+        fh.upload_frame_to_csv(upload_path, finalised_frame)
+
+        return upload_key
+
+    def check_send_mail(self, custom_filename: str, consolidated_keys: List[str]) -> bool:
+        """
+        Checks if there are files to be sent
+
+        Args:
+        - custom_filename (str): contains the custom file name if there is a new requested file
+        - consolidated_keys (List[str]): contains the keys for consolidated csv
+
+        Returns:
+        - bool
+        """
+
+        return not (
+            custom_filename == EMPTY_STRING_VAL
+            and consolidated_keys[0] == EMPTY_STRING_VAL
+            and consolidated_keys[1] == EMPTY_STRING_VAL
+        )
+
+    def send_mail(
+        self,
+        custom_filename: str = EMPTY_STRING_VAL,
+        custom_keys: List[str] = [EMPTY_STRING_VAL, EMPTY_STRING_VAL],
+        consolidated_keys: List[str] = [EMPTY_STRING_VAL, EMPTY_STRING_VAL],
+        failed_key: str = EMPTY_STRING_VAL,
+    ) -> None:
+        """
+        Send mail. Custom requests are marked as accomplished in the manifest first
+
+        Args:
+        - custom_filename (str): contains the custom file name if there is a new requested file
+        - custom_keys (List[str]): contains the keys for the recently uploaded csv
+        - consolidated_keys (List[str]): contains the keys for consolidated csv
+        - failed_key (str): contains the key for the failed records csv
+
+        Returns:
+        - None
+        """
+        if custom_filename != EMPTY_STRING_VAL:
+            key_list = custom_keys
+
+            # mark the custom request as accomplished once every file was pushed,
+            # the pushes run in parallel so they can't update the manifest themselves
+            manifest = CustomRequestManifest(self.logger)
+            manifest.record_uploads(custom_filename, custom_keys + [failed_key])
+        else:
+            key_list = consolidated_keys
+
+        iNotify = IntegrationNotifier(self.logger)
+
+        # capture empty keys
+        if key_list[0] != EMPTY_STRING_VAL:
+            final_cg_key = key_list[0]
+        else:
+            final_cg_key = EMPTY_CG_VAL
+
+        if key_list[1] != EMPTY_STRING_VAL:
+            final_rev_key = key_list[1]
+        else:
+            final_rev_key = EMPTY_REV_VAL
+
+        iNotify.notify_holders([final_cg_key, final_rev_key], custom_filename)
+
+        # send the failed list email as well
+        if failed_key != EMPTY_STRING_VAL:
+            iNotify.notify_holders([failed_key], custom_filename, False, True)
+
+    def send_skipped_mail(self) -> None:
+        """
+        Sends the skipped pipeline mail
+
+        Returns:
+        - None
+        """
+        iNotify = IntegrationNotifier(self.logger)
+        iNotify.notify_holders([], EMPTY_STRING_VAL, True)
+
+    def run(self, store: FrameStore) -> None:
+        """
+        Runs every stage of the pipeline one after the other, passing the frames in memory.
+        Every open custom request is processed in the run chunk by chunk, otherwise the default pipeline is run
+
+        Args:
+        - store (FrameStore): stores the chunks of the custom requests
+
+        Returns:
+        - None
+        """
+        custom_filenames = self.retrieve_open_custom_filenames()
+
+        if not custom_filenames:
+            previous_failed_frame = self.read_previous_failed_records()
+            raw_frame = self.read_snowflake_frame(previous_failed_frame)
+            self.run_stages(raw_frame, previous_failed_frame)
+            return None
+
+        for custom_filename, raw_handle in self.read_custom_request_chunks(
+            store, custom_filenames
+        ):
+            self.run_chunked_stages(store, raw_handle, custom_filename)
+
+    def run_stages(
+        self,
+        raw_frame: Optional[pd.DataFrame],
+        previous_failed_frame: pd.DataFrame = pd.DataFrame(),
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> None:
+        """
+        Runs the stages after the records were read from snowflake.
+        Sends the skipped mail if there are no records
+
+        Args:
+        - raw_frame (Optional[pd.DataFrame]): records read from snowflake
+        - previous_failed_frame (pd.DataFrame): Dataframe that contains the previous failed records
+        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+
+        Returns:
+        - None
+        """
+        if raw_frame is None:
+            self.send_skipped_mail()
+            return None
+
+        base_frame = self.process_computed_data(self.duplicate_sanity_check(raw_frame))
+        raw_frame = None
+
+        revenue_frame = self.create_revenue_frame(base_frame)
+        processed_frame = self.create_cg_frame(base_frame)
+        base_frame = None
+
+        valid_frame, invalid_frame = self.separate_valid_invalid_entries(
+            processed_frame, previous_failed_frame, custom_filename
+        )
+
+        rev_key = self.push_data_to_s3_bucket(revenue_frame, FILENAME_REV, custom_filename)
+        cg_key = self.push_data_to_s3_bucket(valid_frame, FILENAME_CG, custom_filename)
+        failed_key = self.push_data_to_s3_bucket(
+            invalid_frame, FILENAME_FAILED, custom_filename
+        )
+
+        consolidated_keys = [
+            self.consolidate_cg_records(True, custom_filename),
+            self.consolidate_cg_records(False, custom_filename),
+        ]
+
+        if self.check_send_mail(custom_filename, consolidated_keys):
+            self.send_mail(custom_filename, [cg_key, rev_key], consolidated_keys, failed_key)
+
+    def run_chunked_stages(
+        self,
+        store: FrameStore,
+        raw_handle: str,
+        custom_filename: str = EMPTY_STRING_VAL,
+    ) -> None:
+        """
+        Runs the stages on each chunk of the stored records and appends the results to the uploads,
+        so only one chunk is held at a time. Sends the skipped mail if there are no records
+
+        Args:
+        - store (FrameStore): stores the chunks of the records
+        - raw_handle (str): handle of the records read from snowflake
+        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+
+        Returns:
+        - None
+        """
+        if raw_handle == EMPTY_STRING_VAL:
+            self.send_skipped_mail()
+            return None
+
+        checked_handle = self.duplicate_sanity_check_chunks(store, raw_handle)
+        base_handle = store.map_chunks(
+            checked_handle, self.process_computed_data, "computed"
+        )
+
+        revenue_handle = store.map_chunks(base_handle, self.create_revenue_frame, "revenue")
+        processed_handle = store.map_chunks(base_handle, self.create_cg_frame, "cg")
+
+        valid_handle, invalid_handle = self.separate_valid_invalid_chunks(
+            store, processed_handle, pd.DataFrame(), custom_filename
+        )
+
+        rev_key = self.push_chunks_to_s3_bucket(
+            lambda: store.iterate_chunks(revenue_handle), FILENAME_REV, custom_filename
+        )
+        cg_key = self.push_chunks_to_s3_bucket(
+            lambda: store.iterate_chunks(valid_handle), FILENAME_CG, custom_filename
+        )
+        failed_key = self.push_chunks_to_s3_bucket(
+            lambda: store.iterate_chunks(invalid_handle), FILENAME_FAILED, custom_filename
+        )
+
+        consolidated_keys = [
+            self.consolidate_cg_records(True, custom_filename),
+            self.consolidate_cg_records(False, custom_filename),
+        ]
+
+        if self.check_send_mail(custom_filename, consolidated_keys):
+            self.send_mail(custom_filename, [cg_key, rev_key], consolidated_keys, failed_key)
@@ -8,6 +8,11 @@ class customrequest:
     Folder path where the custom requested files will be uploaded to
     """
 
+    MANIFEST = "manifest.json"
+    """
+    Filename of the manifest of the accomplished requests, stored in the custom request folder
+    """
+
     DATE_RANGE = 5
     """
     Range where we will still check if the request has been accomplished
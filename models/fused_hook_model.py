@@ -0,0 +1,230 @@
+import pandas as pd
+
+from typing import List
+
+from ezyvet.data.models.hook_model import HookModel
+
+
+class FusedHookModel(HookModel):
+    """
+    A class that fuses hooks reading the same table into a single query.
+
+    The hooks must share the table, columns and exclusions and only differ in the value of their fusion filter.
+    The query filters on all of the values and the result is split back into the frames of each hook.
+    """
+
+    def __init__(self, hooks: List[HookModel]):
+        super().__init__()
+
+        lead_hook = hooks[0]
+        filter_columns = set(lead_hook.retrieve_fusion_filter().keys())
+
+        if len(filter_columns) != 1:
+            raise ValueError(
+                f"{type(lead_hook).__name__} needs a single fusion filter column to be fused"
+            )
+
+        for hook in hooks[1:]:
+            if (
+                hook.retrieve_table() != lead_hook.retrieve_table()
+                or hook.retrieve_columns() != lead_hook.retrieve_columns()
+                or set(hook.retrieve_fusion_filter().keys()) != filter_columns
+            ):
+                raise ValueError(
+                    f"{type(hook).__name__} can't be fused with {type(lead_hook).__name__}"
+                )
+
+        self.hooks = hooks
+        self.filter_column = filter_columns.pop()
+
+    def retrieve_conn_id(self) -> str:
+        """
+        Provides the connection id for the hook
+
+        Returns:
+        - str
+        """
+
+        return self.hooks[0].retrieve_conn_id()
+
+    def retrieve_group_by(self) -> bool:
+        """
+        Provides if the query should be grouped
+
+        Returns:
+        - bool
+        """
+
+        return self.hooks[0].retrieve_group_by()
+
+    def retrieve_arrow_fetch(self) -> bool:
+        """
+        Provides if the results should be fetched as arrow batches instead of rows
+
+        Returns:
+        - bool
+        """
+
+        return self.hooks[0].retrieve_arrow_fetch()
+
+    def retrieve_result_cacheable(self) -> bool:
+        """
+        Provides if the query result can be cached
+
+        Returns:
+        - bool
+        """
+
+        return all(hook.retrieve_result_cacheable() for hook in self.hooks)
+
+    def retrieve_database(self) -> str:
+        """
+        Provides the database for the hook
+
+        Returns:
+        - str
+        """
+
+        return self.hooks[0].retrieve_database()
+
+    def retrieve_schema(self) -> str:
+        """
+        Provides the schema for the hook
+
+        Returns:
+        - str
+        """
+
+        return self.hooks[0].retrieve_schema()
+
+    def retrieve_table(self) -> str:
+        """
+        Provides the table name for the hook
+
+        Returns:
+        - str
+        """
+
+        return self.hooks[0].retrieve_table()
+
+    def retrieve_columns(self) -> List[str]:
+        """
+        Provides the column for the hook.
+        The fusion filter column is included so the result can be split
+
+        Returns:
+        - List[str]
+        """
+
+        return self.hooks[0].retrieve_columns() + [self.filter_column]
+
+    def retrieve_snowflake_csvmap(self) -> dict:
+        """
+        Provides the mapping for the snowflake and csv.
+        The fused query keeps the snowflake names, each hook mapping is applied when splitting
+
+        Returns:
+        - dict
+        """
+
+        return {}
+
+    def retrieve_exclusions(self) -> List[str]:
+        """
+        Provides the exclusions for the query
+
+        Returns:
+        - List[str]
+        """
+        lead_hook = self.hooks[0]
+        lead_hook.sap_ids = self.sap_ids
+        lead_hook.sap_id_table = self.sap_id_table
+
+        return lead_hook.retrieve_exclusions() + [
+            f"{self.filter_column} IN :{self.retrieve_fusion_param_name(self.filter_column)}"
+        ]
+
+    def retrieve_query_params(self) -> dict:
+        """
+        Provides the values bound to the parameters of the query.
+        The fusion filter values of every hook are bound to a single expanding parameter
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+        lead_hook = self.hooks[0]
+        lead_hook.sap_ids = self.sap_ids
+        lead_hook.sap_id_table = self.sap_id_table
+
+        params = lead_hook.retrieve_query_params()
+        params[self.retrieve_fusion_param_name(self.filter_column)] = [
+            hook.retrieve_fusion_filter()[self.filter_column] for hook in self.hooks
+        ]
+
+        return params
+
+    def retrieve_sap_id_column(self) -> str:
+        """
+        Provides the sap id column name for the query
+
+        Returns:
+        - str
+        """
+
+        return self.hooks[0].retrieve_sap_id_column()
+
+    def retrieve_join_tables(self) -> dict:
+        """
+        Provides the tables to be joined for the query
+
+        Returns:
+        - dict
+        """
+
+        return self.hooks[0].retrieve_join_tables()
+
+    def split_frame(self, frame: pd.DataFrame) -> List[pd.DataFrame]:
+        """
+        Splits the fused frame into the frame of each hook, in the same order as the hooks
+
+        Args:
+        - frame (DataFrame): frame returned by the fused query
+
+        Returns:
+        - List[DataFrame]
+        """
+        filter_label = self.retrieve_column_label(self.filter_column)
+        frames: List[pd.DataFrame] = []
+
+        for hook in self.hooks:
+            renames = {
+                self.retrieve_column_label(column): csv_column
+                for column, csv_column in hook.retrieve_snowflake_csvmap().items()
+            }
+            filter_value = hook.retrieve_fusion_filter()[self.filter_column]
+
+            hook_frame = (
+                frame.loc[frame[filter_label] == filter_value]
+                .drop(columns=[filter_label])
+                .rename(columns=renames)
+                .reset_index(drop=True)
+            )
+            frames.append(hook_frame)
+
+        return frames
+
+    def retrieve_column_label(self, column: str) -> str:
+        """
+        Provides the label the query gives to a column without a mapping
+
+        Args:
+        - column (str): snowflake column
+
+        Returns:
+        - str
+        """
+
+        return column.split(".", 1)[-1].strip('"')
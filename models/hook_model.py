@@ -1,3 +1,6 @@
+import pandas as pd
+import re
+
 from abc import ABC, abstractmethod
 from typing import List
 
@@ -14,6 +17,8 @@ class HookModel(ABC):
         self.custom_from = EMPTY_STRING_VAL
         self.custom_to = EMPTY_STRING_VAL
         self.sap_ids = []
+        self.sap_id_table = EMPTY_STRING_VAL
+        self.unique_ids = []
 
     def retrieve_conn_id(self) -> str:
         """
@@ -35,6 +40,170 @@ class HookModel(ABC):
 
         return False
 
+    def retrieve_sap_id_values(self) -> str:
+        """
+        Provides the values used by the sap id filter of the query.
+        Returns a subquery against the temp table if the sap ids were loaded into one,
+        otherwise the expanding parameter the sap ids are bound to
+
+        Returns:
+        - str
+        """
+
+        if self.sap_id_table != EMPTY_STRING_VAL:
+            return f"(SELECT SAP_ID FROM {self.sap_id_table})"
+
+        return ":sap_ids"
+
+    def retrieve_sap_id_params(self) -> dict:
+        """
+        Provides the sap ids bound to the sap id filter of the query.
+        The sap ids are bound to a single expanding parameter so the query is the same for any number of sap ids.
+        An empty value is bound if there are no sap ids so the filter doesn't match anything
+
+        Syntax:
+        {"sap_ids": [SAP ID]}
+
+        Returns:
+        - dict
+        """
+
+        return {"sap_ids": [str(x) for x in self.sap_ids if x] or [""]}
+
+    def retrieve_unique_id_values(self) -> str:
+        """
+        Provides the expanding parameter the unique ids are bound to.
+        Used by the hooks of the previous failed records, which filter by unique id
+
+        Returns:
+        - str
+        """
+
+        return ":unique_ids"
+
+    def retrieve_unique_id_params(self) -> dict:
+        """
+        Provides the unique ids bound to the unique id filter of the query.
+        The unique ids are bound to a single expanding parameter.
+        An empty value is bound if there are no unique ids so the filter doesn't match anything
+
+        Syntax:
+        {"unique_ids": [UNIQUE ID]}
+
+        Returns:
+        - dict
+        """
+
+        return {"unique_ids": [str(x) for x in self.unique_ids if x] or [""]}
+
+    def retrieve_query_params(self) -> dict:
+        """
+        Provides the values bound to the parameters of the query.
+        The dynamic values of the query, e.g. dates and sap ids, are bound so the rest of the query can be reused
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+
+        params = {}
+        if self.sap_id_table == EMPTY_STRING_VAL:
+            params.update(self.retrieve_sap_id_params())
+
+        params.update(self.retrieve_fusion_params())
+
+        return params
+
+    def retrieve_arrow_fetch(self) -> bool:
+        """
+        Provides if the results should be fetched as arrow batches instead of rows
+
+        Returns:
+        - bool
+        """
+
+        return False
+
+    def retrieve_result_cacheable(self) -> bool:
+        """
+        Provides if the query result can be cached.
+        Queries that filter against the current time return different records every run and shouldn't be cached
+
+        Returns:
+        - bool
+        """
+
+        return True
+
+    def retrieve_fusion_filter(self) -> dict:
+        """
+        Provides the filter that separates the hook from other hooks on the same table.
+        Hooks with the same table, columns and filter column can be fused into a single query
+
+        Syntax:
+        {"SNOWFLAKE COLUMN": "VALUE"}
+
+        Returns:
+        - dict
+        """
+
+        return {}
+
+    def retrieve_fusion_param_name(self, column: str) -> str:
+        """
+        Provides the name of the parameter the value of the fusion filter column is bound to
+
+        Args:
+        - column (str): snowflake column of the fusion filter
+
+        Returns:
+        - str
+        """
+
+        return f"fusion_{re.sub('[^0-9a-zA-Z_]', '_', column).lower()}"
+
+    def retrieve_fusion_params(self) -> dict:
+        """
+        Provides the values of the fusion filter bound to the parameters of the query
+
+        Syntax:
+        {PARAMETER NAME: VALUE}
+
+        Returns:
+        - dict
+        """
+
+        return {
+            self.retrieve_fusion_param_name(column): value
+            for column, value in self.retrieve_fusion_filter().items()
+        }
+
+    def retrieve_custom_date_columns(self) -> List[str]:
+        """
+        Provides the csv columns that place a record inside the date range of a custom request.
+        A record belongs to a custom request if any of the columns is within its date range
+
+        Returns:
+        - List[str]
+        """
+
+        return []
+
+    def split_frame(self, frame: pd.DataFrame) -> List[pd.DataFrame]:
+        """
+        Splits the frame returned by the query into the frames expected by the integration
+
+        Args:
+        - frame (DataFrame): frame returned by the query
+
+        Returns:
+        - List[DataFrame]
+        """
+
+        return [frame]
+
     def current_records(self) -> bool:
         """
         Returns if we're grabbing the current records.
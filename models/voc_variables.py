@@ -24,6 +24,12 @@ CRON_SCHEDULE = "0 8 * * *"
 CRON Schedule for automated task executions
 """
 
+FUSED_PIPELINE = True
+"""
+Default value of the fused_pipeline DAG param.
+The fused pipeline runs every stage in a single task, otherwise each stage runs in its own task for debugging
+"""
+
 DEFAULT_PRODUCTION_NAME = "prod"
 """
 Default Production name
@@ -41,12 +47,64 @@ GROUP_BY_COLUMN_EXCLUSIONS = ["SUM("]
 Dictates the columns that will be excluded in the group by
 """
 
+SUPPLEMENTAL_MAX_WORKERS = 5
+"""
+Number of supplemental hooks that can be queried against snowflake at the same time. 1 runs the hooks sequentially
+"""
+
+SNOWFLAKE_POOL_SIZE = 5
+"""
+Number of connections kept open per shared snowflake engine
+"""
+
+SNOWFLAKE_POOL_MAX_OVERFLOW = 2
+"""
+Number of connections that can be opened on top of the pool size when the pool is exhausted
+"""
+
+SNOWFLAKE_ENGINE_IDLE_TIMEOUT = 900
+"""
+Seconds a shared snowflake engine or connection can stay idle before it is disposed
+"""
+
+SAP_ID_TEMP_TABLE_THRESHOLD = 1000
+"""
+Number of sap ids a hook can render in its query before they are loaded into a session temp table instead
+"""
+
+CUSTOM_REQUEST_CHUNKSIZE = 50000
+"""
+Number of base rows read and merged at a time for custom requests
+"""
+
+QUERY_RESULT_CACHE = False
+"""
+Caches the query results of the hooks in s3 so identical queries, e.g. task retries
+and custom requests, don't read snowflake again. Hooks that query against the current time are never cached
+"""
+
+QUERY_RESULT_CACHE_TTL = 43200
+"""
+Seconds a cached query result can be read before it is removed
+"""
+
+QUERY_RESULT_CACHE_MAX_BYTES = 2147483648
+"""
+Size the query result cache can grow to before the least recently read results are removed
+"""
+
 # DataFrame Merge Variables
 VOC_JOIN_COLUMN = "SAP ID"
 """
 Dictates the column name of where the data frames will merge against each other
 """
 
+SINGLE_PASS_MERGE = True
+"""
+Joins all of the supplemental frames to the base frame in one step.
+Supplemental frames are deduplicated by the join column, keeping the first record
+"""
+
 # DataFrame Merge Variables
 VOC_JOIN_UNIQUE_ID = "UNIQUE ID"
 """
@@ -64,6 +122,15 @@ ROLE_DEFAULT_VALUE = "Project Stakeholder"
 Default value for role column
 """
 
+USER_BRACKET_TABLE = (
+    [(1, "1"), (2, "2-9"), (10, "10-19"), (20, "20-29"), (30, "30-49"), (50, "50-74")]
+    + [(edge, f"{edge}-{edge + 24}") for edge in range(75, 750, 25)]
+    + [(750, "750+")]
+)
+"""
+Lower edge and label of each user bracket. 750+ is a catch all and user counts below 1 don't have a bracket
+"""
+
 # Column Fixer Variables
 DATE_COLUMNS = ["Project Go Live date", "Project Start Date"]
 """
@@ -131,6 +198,22 @@ CONSOLIDATED_FOLDER_NAME = "consolidated"
 S3 Consolidated Folder Name
 """
 
+FRAME_STORE_FOLDER_NAME = "frames"
+"""
+S3 Folder Name of the frames passed between the tasks, removed at the end of each run
+"""
+
+FRAME_STORE_TTL = 259200
+"""
+Seconds after their last write the frames of a run are removed by the cleanup of the later runs.
+Failed runs keep their frames so their tasks can be cleared and retried until then
+"""
+
+QUERY_CACHE_FOLDER_NAME = "querycache"
+"""
+S3 Folder Name of the cached query results
+"""
+
 # Filenames
 FILENAME_CG = "CGImport"
 """
@@ -147,6 +230,57 @@ FILENAME_FAILED = "CGFailedRecords"
 Filename to be used for the records that has incomplete data
 """
 
+# File formats
+VOC_FILE_FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "parquet": ".parquet",
+}
+"""
+Supported file formats and their file extensions
+
+Syntax:
+{FORMAT: FILE EXTENSION}
+"""
+
+VOC_ARTIFACT_FORMATS = {
+    FILENAME_CG: ["csv", "parquet"],
+    FILENAME_REV: ["csv", "parquet"],
+    FILENAME_FAILED: ["csv"],
+}
+"""
+Formats each daily artifact is uploaded in. The first format is the deliverable shared with the holders,
+the rest are internal copies. Custom requests only upload the deliverable
+
+Syntax:
+{FILENAME PREFIX: [FORMAT, ...]}
+"""
+
+CONSOLIDATION_FILE_FORMAT = "parquet"
+"""
+Format of the daily artifacts read by the consolidation. Falls back to csv for the days without it
+"""
+
+CONSOLIDATION_MAX_WORKERS = 5
+"""
+Number of daily files read at the same time by the consolidation
+"""
+
+FAILED_LEDGER_FOLDER = "ledger"
+"""
+Folder inside the integration folder that contains the failed records ledger
+"""
+
+FAILED_LEDGER_FILENAME = "CGFailedRecordsLedger.parquet"
+"""
+Filename of the rolling ledger of the records that has incomplete data
+"""
+
+FAILED_LEDGER_RETENTION_DAYS = 30
+"""
+Number of days a failed record stays in the ledger after it was last seen
+"""
+
 # Empty Variables Value
 EMPTY_STRING_VAL = "NaN"
 """
@@ -172,6 +306,42 @@ VOC_REVENUE_FRAME_LIST = [
 Columns to be copied from processed dataframe to be used for revenue CSV
 """
 
+VOC_ROLE_CONTACT_PREFIXES = {
+    "VDC": "VDC_",
+    "DX FSR": "DXFSR_",
+}
+"""
+Roles that get their own copy of the record in the Customer Gauge CSV and the prefix of their contact columns
+
+Syntax:
+ROLE : CONTACT COLUMN PREFIX
+"""
+
+VOC_ROLE_CONTACT_COLUMNS = {
+    "First Name": "First_Name",
+    "Last Name": "Last_Name",
+    "Email": "Email",
+    "Phone": "Phone",
+}
+"""
+Contact columns that are replaced by the contact of the role
+
+Syntax:
+CONTACT COLUMN : ROLE CONTACT COLUMN WITHOUT THE PREFIX
+"""
+
+VOC_REVENUE_LINES = {
+    "SaaS Fee": ("MRR", "ezyvet/Neo/Cornerstone SaaS fee"),
+    "Implementation Fee": ("One Time", "ezyvet/Neo/Cornerstone Implementation fee"),
+    "IDEXX DX Spend": ("CAG ARR", "CAG Annual Recurring Revenue"),
+}
+"""
+Revenue lines generated for the revenue CSV
+
+Syntax:
+SOURCE COLUMN : (REVENUE TYPE, DESCRIPTION)
+"""
+
 # Mapping the Voc Revenue CSV Requirements
 VOC_REVENUE_EXPORT = [
     "Account Name - SAP ID",
@@ -185,10 +355,82 @@ VOC_REVENUE_EXPORT = [
 Columns that will be shown in the generated revenue CSV
 """
 
+# Incremental Consolidation Variables
+INCREMENTAL_CONSOLIDATION = True
+"""
+Determines if the consolidation uses the running consolidated files updated after each daily upload.
+The consolidation reads every daily file of the window if disabled or if the running file doesn't cover every uploaded day
+"""
+
+VOC_CONSOLIDATION_WINDOW_DAYS = {
+    1: 5,
+    3: 2,
+}
+"""
+Number of days consolidated on each consolidation day, 1 is tuesday and 3 is thursday
+
+Syntax:
+WEEKDAY : NUMBER OF DAYS
+"""
+
+RUNNING_CONSOLIDATED_FOLDER_NAME = "running"
+"""
+S3 Folder Name of the running consolidated files
+"""
+
+VOC_CONSOLIDATION_DUPLICATE_FILTERS = {
+    FILENAME_CG: DUPLICATED_CONSOLIDATED_COLUMNS,
+    FILENAME_REV: VOC_REVENUE_EXPORT,
+}
+"""
+Columns used to determine the duplicates of each consolidated file
+
+Syntax:
+FILENAME PREFIX : [COLUMN, ...]
+"""
+
+# Custom Request Variables
+VOC_CUSTOM_REQUEST_DATE_COLUMN = "Custom Request Date"
+"""
+Column that holds the audit date of the mavenlink records in custom requests.
+Only used to slice the coalesced custom requests, it is removed before the records are processed
+"""
+
+# Validation Variables
+VOC_REQUIRED_COLUMNS = {
+    "First Name": "MISSING_FIRST_NAME",
+    "Last Name": "MISSING_LAST_NAME",
+    "Email": "MISSING_EMAIL",
+    "Product": "MISSING_PRODUCT",
+    "sap_account_name": "SAP_ACCOUNT_NOT_FOUND",
+}
+"""
+Columns that can't be null for the record to be valid and the failure reason if they are
+
+Syntax:
+COLUMN : FAILURE REASON
+"""
+
+VOC_INVALID_JOIN_VALUES = ["0", "1", ""]
+"""
+Values of the join column that makes the record invalid
+"""
+
+VOC_INVALID_JOIN_REASON = "INVALID_SAP_ID"
+"""
+Failure reason if the join column is null or one of the invalid values
+"""
+
+VOC_FAILURE_REASON_COLUMN = "Failure Reason"
+"""
+Column that contains the reasons why the record failed
+"""
+
 # Mapping the additional columns for the survey export failed entries
 VOC_SURVEY_FAILED_EXPORT_ADDONS = [
     "Record Origin",
     "UNIQUE ID",
+    VOC_FAILURE_REASON_COLUMN,
 ]
 """
 Additional columns that will be shown in the generated failed revenue on top of the default Customer Gauge columns
@@ -234,6 +476,20 @@ VOC_SURVEY_EXPORT = [
 Columns that will be shown in the generated Customer Gauge CSV
 """
 
+VOC_PROCESSED_COLUMNS = list(
+    dict.fromkeys(
+        VOC_SURVEY_EXPORT
+        + VOC_SURVEY_FAILED_EXPORT_ADDONS
+        + OLD_COMPARISON_COLUMNS
+        + list(VOC_REQUIRED_COLUMNS.keys())
+        + [VOC_JOIN_COLUMN, VOC_JOIN_UNIQUE_ID]
+    )
+)
+"""
+Columns of the processed frame, used by the validation, the failed records ledger and the Customer Gauge CSV.
+Only these columns are repeated for every role in VOC_ROLE_CONTACT_PREFIXES
+"""
+
 # NA Values for Pandas
 VOC_NA_VALUES = [
     "",
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from logging import Logger
+from typing import List, Tuple
+
+
+class BracketBinner:
+    """
+    A class that bins numeric values into brackets for the VoC Integration
+    """
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the BracketBinner class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+
+    def parse_numbers(self, values: pd.Series, whole_numbers: bool) -> pd.Series:
+        """
+        Parses the values into floats. Unparsable values become NaN
+
+        Whole numbers are parsed the same way int() would,
+        numbers are truncated and strings with decimals are unparsable
+
+        Args:
+        - values (Series): values to be parsed
+        - whole_numbers (bool): determines if the values should be parsed as whole numbers
+
+        Returns:
+        - Series
+        """
+        numbers = pd.to_numeric(values, errors="coerce").astype(float)
+        numbers = numbers.where(np.isfinite(numbers))
+
+        if not whole_numbers:
+            return numbers
+
+        is_string = values.map(type) == str
+        whole_strings = (
+            values.where(is_string, "").astype(str).str.fullmatch(r"\s*[+-]?\d+\s*")
+        )
+
+        return np.trunc(numbers.where(~is_string | whole_strings))
+
+    def bin_values(
+        self,
+        values: pd.Series,
+        bracket_table: List[Tuple[float, str]],
+        value_name: str,
+        whole_numbers: bool = True,
+    ) -> pd.Series:
+        """
+        Bins the values into the brackets of the table.
+        Values that are unparsable or below the first bracket are returned as an empty string
+
+        Syntax:
+        [(LOWER EDGE, LABEL), ...] sorted by the lower edge. The last bracket is a catch all
+
+        Args:
+        - values (Series): values to be binned
+        - bracket_table (List[Tuple[float, str]]): lower edge and label of each bracket
+        - value_name (str): name of the values, used for logging
+        - whole_numbers (bool): determines if the values should be parsed as whole numbers
+
+        Returns:
+        - Series
+        """
+        numbers = self.parse_numbers(values, whole_numbers)
+
+        edges = np.array([edge for edge, _ in bracket_table], dtype=float)
+        # the extra empty label is used for the values below the first edge
+        labels = np.array([label for _, label in bracket_table] + [""], dtype=object)
+
+        positions = np.searchsorted(edges, numbers.to_numpy(), side="right") - 1
+        invalid = numbers.isnull().to_numpy() | (positions < 0)
+        positions[invalid] = -1
+
+        invalid_values = values[invalid]
+        if not invalid_values.empty:
+            self.logger.info(
+                f"Cannot Determine {value_name} Bracket for {len(invalid_values.index)} values. "
+                f"Original Values: {invalid_values.to_list()}"
+            )
+
+        return pd.Series(labels[positions], index=values.index, dtype=object)
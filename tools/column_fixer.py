@@ -62,6 +62,27 @@ class ColumnFixer:
 
         return temp_frame
 
+    def fix_missing_values(self, raw_frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fixes the missing values of the text columns by transforming them to None,
+        the same way they come back from parquet. NaN is truthy while None isn't
+
+        Args:
+        - raw_frame (DataFrame): Data frame to be fixed
+
+        Returns:
+        - DataFrame
+        """
+
+        temp_frame = raw_frame
+
+        for column in temp_frame.select_dtypes(include="object").columns:
+            temp_frame[column] = temp_frame[column].where(
+                temp_frame[column].notna(), None
+            )
+
+        return temp_frame
+
     def fix_column_to_float(
         self, raw_frame: pd.DataFrame, columns: List[str]
     ) -> pd.DataFrame:
@@ -114,10 +135,25 @@ class ColumnFixer:
         - DataFrame
         """
 
-        temp_frame = self.fix_column_to_string(raw_frame, [col_name])
+        return self.fix_columns_remove_decimals(raw_frame, [col_name])
 
-        for index, row in temp_frame.iterrows():
-            if "." in row[col_name]:
-                temp_frame.loc[index, col_name] = row[col_name].split(".")[0]
+    def fix_columns_remove_decimals(
+        self, raw_frame: pd.DataFrame, columns: List[str]
+    ) -> pd.DataFrame:
+        """
+        Fixes the columns by making them into strings and removing everything after the first decimal point
+
+        Args:
+        - raw_frame (DataFrame): Data frame to be fixed
+        - columns (List[str]): columns to be fixed
+
+        Returns:
+        - DataFrame
+        """
+
+        temp_frame = self.fix_column_to_string(raw_frame, columns)
+
+        for column in columns:
+            temp_frame[column] = temp_frame[column].str.split(".", n=1).str[0]
 
         return temp_frame
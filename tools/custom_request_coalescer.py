@@ -0,0 +1,126 @@
+import pandas as pd
+
+from logging import Logger
+from typing import List, Tuple
+
+
+class CustomRequestCoalescer:
+    """
+    A class that coalesces custom requests with overlapping date ranges
+    so their records are read once and sliced per request
+    """
+
+    def __init__(self, logger: Logger):
+        """
+        Constructor for the CustomRequestCoalescer class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+
+    def parse_daterange(self, custom_filename: str) -> Tuple[str, str]:
+        """
+        Returns the from and to dates of the custom request
+
+        Syntax:
+        "Date Requested_DateFrom_DateTo" e.g. "2023-11-17_2023-01-01_2023-10-31"
+
+        Args:
+        - custom_filename (str): custom request
+
+        Returns:
+        - Tuple[str, str]
+        """
+        daterange = custom_filename.split("_")
+
+        return daterange[1], daterange[2]
+
+    def coalesce_requests(self, custom_filenames: List[str]) -> List[List[str]]:
+        """
+        Groups the custom requests whose date ranges overlap.
+        The groups keep the order of their first request
+
+        Args:
+        - custom_filenames (List[str]): custom requests to be grouped
+
+        Returns:
+        - List[List[str]]
+        """
+        # the dates are in YYYY-MM-DD so they are ordered as strings
+        ordered_requests = sorted(custom_filenames, key=self.parse_daterange)
+
+        groups: List[List[str]] = []
+        group_to = ""
+        for custom_filename in ordered_requests:
+            date_from, date_to = self.parse_daterange(custom_filename)
+
+            if groups and date_from <= group_to:
+                groups[-1].append(custom_filename)
+                group_to = max(group_to, date_to)
+            else:
+                groups.append([custom_filename])
+                group_to = date_to
+
+        groups.sort(key=lambda group: min(custom_filenames.index(x) for x in group))
+
+        self.logger.info(
+            f"Coalesced {len(custom_filenames)} custom requests into {len(groups)} reads: {groups}"
+        )
+
+        return groups
+
+    def retrieve_coalesced_filename(self, group: List[str]) -> str:
+        """
+        Returns a custom request that covers the date ranges of every request in the group
+
+        Args:
+        - group (List[str]): custom requests with overlapping date ranges
+
+        Returns:
+        - str
+        """
+        dateranges = [self.parse_daterange(custom_filename) for custom_filename in group]
+        requested_date = group[0].split("_")[0]
+        date_from = min(date_from for date_from, _ in dateranges)
+        date_to = max(date_to for _, date_to in dateranges)
+
+        return f"{requested_date}_{date_from}_{date_to}"
+
+    def slice_frame(
+        self, frame: pd.DataFrame, custom_filename: str, date_columns: List[str]
+    ) -> pd.DataFrame:
+        """
+        Returns the records of the frame that belong to the custom request.
+        A record belongs to the request if any of the date columns is within its date range, same as the query
+
+        Args:
+        - frame (pd.DataFrame): records of the coalesced custom requests
+        - custom_filename (str): custom request
+        - date_columns (List[str]): columns that place a record inside the date range
+
+        Returns:
+        - pd.DataFrame
+        """
+        date_from, date_to = self.parse_daterange(custom_filename)
+        in_range = pd.Series(False, index=frame.index)
+
+        for column in date_columns:
+            if column not in frame.columns:
+                continue
+
+            dates = pd.to_datetime(frame[column], errors="coerce")
+            if getattr(dates.dt, "tz", None) is not None:
+                dates = dates.dt.tz_localize(None)
+            dates = dates.dt.normalize()
+
+            in_range |= (dates >= pd.Timestamp(date_from)) & (
+                dates <= pd.Timestamp(date_to)
+            )
+
+        self.logger.info(f"{in_range.sum()} records belong to {custom_filename}")
+
+        return frame[in_range].reset_index(drop=True)
@@ -0,0 +1,70 @@
+import pandas as pd
+
+from logging import Logger
+from typing import List
+
+
+class RecordKeyIndex:
+    """
+    A class that indexes records by a hash of their key columns so other frames can be checked against it
+    """
+
+    def __init__(self, logger: Logger, key_columns: List[str]):
+        """
+        Constructor for the RecordKeyIndex class.
+
+        Args:
+        - logger (Logger): uses the logger for audit and debugging purposes
+        - key_columns (List[str]): columns that make up the key of the record
+
+        Returns:
+        - None
+        """
+        self.logger = logger
+        self.key_columns = key_columns
+        self.keys = pd.Index([], dtype="uint64")
+
+    def hash_keys(self, frame: pd.DataFrame) -> pd.Series:
+        """
+        Returns the hash of the key columns of each record.
+        The key columns are compared by their string values
+
+        Args:
+        - frame (DataFrame): frame to be hashed
+
+        Returns:
+        - Series
+        """
+
+        return pd.util.hash_pandas_object(
+            frame[self.key_columns].astype(str), index=False
+        )
+
+    def build(self, frame: pd.DataFrame) -> "RecordKeyIndex":
+        """
+        Indexes the keys of the frame
+
+        Args:
+        - frame (DataFrame): frame to be indexed
+
+        Returns:
+        - RecordKeyIndex
+        """
+        self.keys = pd.Index(self.hash_keys(frame).unique())
+
+        self.logger.info(f"Indexed {len(self.keys)} keys of {self.key_columns}")
+
+        return self
+
+    def contains(self, frame: pd.DataFrame) -> pd.Series:
+        """
+        Returns if the key of each record of the frame is in the index
+
+        Args:
+        - frame (DataFrame): frame to be checked
+
+        Returns:
+        - Series
+        """
+
+        return self.hash_keys(frame).isin(self.keys)
@@ -2,18 +2,17 @@ import logging
 import pytz
 
 from airflow.decorators import dag, task
-from datetime import datetime, timedelta
-from pandas import DataFrame
-from typing import Optional, List
+from airflow.models.param import Param
+from datetime import datetime
+from typing import Dict, List
 
 from ezyvet.data.models.voc_variables import (
     CRON_SCHEDULE,
     EMPTY_STRING_VAL,
-    EMPTY_CG_VAL,
-    EMPTY_REV_VAL,
     FILENAME_REV,
     FILENAME_CG,
     FILENAME_FAILED,
+    FUSED_PIPELINE,
     INTEGRATION_TAGS,
     MAX_ACTIVE_RUN,
     TIMEZONE,
@@ -22,186 +21,137 @@ from ezyvet.data.models.voc_variables import (
 log = logging.getLogger(__name__)
 
 
+def retrieve_frame_store():
+    """
+    Returns the frame store of the current run
+
+    Returns:
+    - FrameStore
+    """
+    from airflow.operators.python import get_current_context
+    from ezyvet.data.logic.frame_store import FrameStore
+
+    return FrameStore(log, get_current_context()["run_id"])
+
+
 @dag(
     schedule=CRON_SCHEDULE,
     start_date=datetime(2023, 9, 1, tzinfo=pytz.timezone(TIMEZONE)),
     catchup=False,
     tags=INTEGRATION_TAGS,
     max_active_runs=MAX_ACTIVE_RUN,
+    params={
+        "fused_pipeline": Param(
+            FUSED_PIPELINE,
+            type="boolean",
+            description="Runs every stage in a single task. Disable to run each stage in its own task",
+        )
+    },
 )
 def voc_integration():
-    @task
-    def return_open_custom_filename() -> str:
+    @task.branch(task_id="check_execution_mode")
+    def check_execution_mode() -> str:
         """
-        Returns if the items in the custom request file has been generated already
+        Checks if the pipeline should run in a single task or in a task per stage
 
         Returns:
         - str
         """
-        import re
-        from s3fs import S3FileSystem
-        from ezyvet.data.logic.file_handler import FileHandler
-        from ezyvet.data.models.custom_request import customrequest
-        from ezyvet.data.models.voc_variables import (
-            BUCKET,
-            DEFAULT_FILE_PATH,
-            DEFAULT_PRODUCTION_NAME,
-            INTEGRATION_NAME,
-            INTEGRATION_ENVIRONMENT,
-        )
-
-        current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        recent_requested_files: List[str] = []
-
-        log.info("Current Request List:")
-        log.info(customrequest.REQ_LIST)
-
-        for reqdate, reqrange in customrequest.REQ_LIST.items():
-            reqdate_timestamp = datetime.strptime(reqdate, "%Y-%m-%d")
-            days_passed = abs((current_date - reqdate_timestamp).days)
-
-            # we only check entries less than N days
-            if days_passed > customrequest.DATE_RANGE:
-                continue
-
-            recent_requested_files.append(f"{reqdate}_{reqrange}")
-
-        log.info("Recent Requested Files List:")
-        log.info(recent_requested_files)
-
-        if not recent_requested_files:
-            return EMPTY_STRING_VAL
+        from airflow.operators.python import get_current_context
 
-        fh = FileHandler(log)
-
-        path = f"s3://{BUCKET}/{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{customrequest.FOLDER}"
-        files = []
-        i = 0
-
-        try:
-            while i <= (customrequest.DATE_RANGE + 1):
-                date_finder = (datetime.now() - timedelta(days=i)).date()
-                files += S3FileSystem().find(
-                    fh.dynamic_folderpath_generator(date_finder, path)
-                )
-                i += 1
-        except Exception as e:
-            log.info("Failed to connect to s3. Skipping step")
-            log.info(e)
-            return EMPTY_STRING_VAL
-
-        recent_filenames_list: List[str] = []
-        for filepath in files:
-            temp_filename = filepath.split("/")[len(filepath.split("/")) - 1]
+        if get_current_context()["params"]["fused_pipeline"]:
+            return "run_fused_pipeline"
+        else:
+            return "return_open_custom_filenames"
 
-            if temp_filename == "":
-                continue
-            recent_filenames_list.append(
-                re.sub("[aA-zZ]{1,}_", "", temp_filename.split(".")[0])
-            )
+    @task
+    def run_fused_pipeline() -> None:
+        """
+        Runs every stage of the pipeline in this task, the frames are passed in memory.
+        The custom requests are stored chunk by chunk between the stages
 
-        log.info("Recent Uploaded Files List:")
-        log.info(recent_filenames_list)
+        Returns:
+        - None
+        """
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        req_to_accomplish = list(
-            sorted(
-                set(recent_requested_files) - set(recent_filenames_list),
-                key=recent_requested_files.index,
-            )
-        )
+        VocPipeline(log).run(retrieve_frame_store())
 
-        log.info("Requests Left to Accomplish:")
-        log.info(req_to_accomplish)
+    @task
+    def return_open_custom_filenames() -> List[str]:
+        """
+        Returns the custom requests that haven't been generated yet.
+        Returns a single NaN if there are none so the default pipeline is run
 
-        if not req_to_accomplish:
-            return EMPTY_STRING_VAL
+        Returns:
+        - List[str]
+        """
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        # we only do one of the requests
-        return req_to_accomplish[0]
+        return VocPipeline(log).retrieve_open_custom_filenames() or [EMPTY_STRING_VAL]
 
     @task
-    def read_previous_failed_records_from_s3(
-        request_filename: str = EMPTY_STRING_VAL,
-    ) -> DataFrame:
+    def read_previous_failed_records_from_s3(custom_filenames: List[str]) -> str:
         """
-        Read data from S3 and if successful return the dataframe
+        Read the failed records ledger from S3 and if successful return the handle of the dataframe.
+        Falls back to the failed records of the previous day if the ledger doesn't exist yet
 
         Args:
-        - custom_request (bool): Checks if the execution is a custom request
+        - custom_filenames (List[str]): open custom requests, a single NaN if the execution is not a custom request
 
         Returns:
-        - DataFrame
+        - str
         """
-        from ezyvet.data.logic.file_handler import FileHandler
-        from ezyvet.data.models.voc_variables import (
-            BUCKET,
-            DEFAULT_FILE_PATH,
-            INTEGRATION_NAME,
-        )
-
-        # exit early if the request filename is valid
-        if request_filename != EMPTY_STRING_VAL:
-            return DataFrame()
-
-        fh = FileHandler(log)
-        previous_date = (datetime.now() - timedelta(days=1)).date()
-        dynamic_filename = fh.dynamic_filename_generator(FILENAME_FAILED, previous_date)
-        dynamic_path = fh.dynamic_folderpath_generator(previous_date)
-        key = (
-            f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{dynamic_path}/{dynamic_filename}"
-        )
-        path = f"s3://{BUCKET}/{key}"
-        df = fh.read_csvfile_to_frame(path)
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        log.info(df.to_json())
+        df = VocPipeline(log).read_previous_failed_records(custom_filenames[0])
 
-        return df
+        return retrieve_frame_store().save_frame(df, "previous_failed")
 
     @task
     def read_snowflake_to_object(
-        previous_failed_frame=DataFrame(), custom_filename: str = EMPTY_STRING_VAL
-    ) -> Optional[DataFrame]:
+        previous_failed_handle: str, custom_filenames: List[str]
+    ) -> List[Dict[str, str]]:
         """
-        Read data from snowflake and generate data frames based on return values
+        Read data from snowflake and returns the handle of the records of each request.
+        The handle is NaN if the request has no records
+
+        Syntax:
+        [{"custom_filename": CUSTOM FILENAME OR NaN, "handle": HANDLE OR NaN}]
 
         Args:
-        - previous_failed_frame (DataFrame): contains the records for the previous failed frame
-        - custom_file (str): contains the custom file name, returns a string NaN if empty
+        - previous_failed_handle (str): handle of the frame that contains the records for the previous failed frame
+        - custom_filenames (List[str]): open custom requests, a single NaN if the execution is not a custom request
 
         Returns:
-        - Dataframe
+        - List[Dict[str, str]]
         """
-        from ezyvet.data.logic.frame_generator import FrameGenerator
-        from ezyvet.data.logic.frame_holder import FrameHolder
-        from ezyvet.data.models.voc_variables import VOC_JOIN_COLUMN
-
-        holder = FrameHolder(log)
-        holder.retrieve_base_frame(previous_failed_frame, custom_filename)
-        ids = holder.base_frame[VOC_JOIN_COLUMN].to_list()
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        # check if theres any sap ids that were returned. if not we just escape the whole function
-        if not ids:
-            return None
+        store = retrieve_frame_store()
+        pipeline = VocPipeline(log)
 
-        # create instance of the frame generator
-        fg = FrameGenerator(log)
-
-        # retrieve the supplemental frames from snowflake
-        holder.retrieve_supplemental_frames(ids)
+        # custom requests are read together and stored chunk by chunk
+        if custom_filenames[0] != EMPTY_STRING_VAL:
+            return [
+                {"custom_filename": custom_filename, "handle": raw_handle}
+                for custom_filename, raw_handle in pipeline.read_custom_request_chunks(
+                    store, custom_filenames
+                )
+            ]
 
-        # merge the frames via frame generator
-        combined_data_frame = fg.merge_frames(
-            holder.base_frame, holder.supplemental_frames
+        combined_data_frame = pipeline.read_snowflake_frame(
+            store.load_frame(previous_failed_handle)
         )
 
-        # remove the hook values from memory
-        holder = None
+        raw_handle = EMPTY_STRING_VAL
+        if combined_data_frame is not None:
+            raw_handle = store.save_frame(combined_data_frame, "raw")
 
-        log.info(combined_data_frame.to_json())
-        return combined_data_frame
+        return [{"custom_filename": EMPTY_STRING_VAL, "handle": raw_handle}]
 
     @task
-    def duplicate_sanity_check(df: DataFrame) -> DataFrame:
+    def duplicate_sanity_check(request: Dict[str, str]) -> Dict[str, str]:
         """
         There are instances where the duplicate check in read snowflake to object
         doesnt execute properly. We will rerun the method here before continuing the pipeline.
@@ -209,372 +159,267 @@ def voc_integration():
         It should just skip if there are no more duplicates.
 
         Args:
-        - df (DataFrame): DataFrame to be cleaned
+        - request (Dict[str, str]): custom filename and handle of the Dataframe to be cleaned
 
         Returns:
-        - DataFrame
+        - Dict[str, str]
         """
-        from ezyvet.data.logic.frame_holder import FrameHolder
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        fh = FrameHolder(log)
-
-        checked_frame = fh.remove_duplicates_from_frames(df)
-
-        return checked_frame
+        return {
+            "custom_filename": request["custom_filename"],
+            "handle": VocPipeline(log).duplicate_sanity_check_chunks(
+                retrieve_frame_store(), request["handle"]
+            ),
+        }
 
     @task
-    def process_computed_data(df: DataFrame) -> DataFrame:
+    def process_computed_data(request: Dict[str, str]) -> Dict[str, str]:
         """
         Process the dataframe to acquire computed values
 
         Args:
-        - df (DataFrame): Dataframe that will be transformed
+        - request (Dict[str, str]): custom filename and handle of the Dataframe that will be transformed
 
         Returns:
-        - Dataframe
+        - Dict[str, str]
         """
-        from ezyvet.data.logic.compute_fields import ComputeFields
-
-        cf = ComputeFields(log)
-        processed_frame = cf.add_computed_fields(df)
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        return processed_frame
+        return {
+            "custom_filename": request["custom_filename"],
+            "handle": retrieve_frame_store().map_chunks(
+                request["handle"], VocPipeline(log).process_computed_data, "computed"
+            ),
+        }
 
     @task
-    def create_revenue_frame(df: DataFrame) -> DataFrame:
+    def create_revenue_frame(request: Dict[str, str]) -> Dict[str, str]:
         """
         Creates revenue frame based from the existing one
 
         Args:
-        - df (DataFrame): Dataframe where we will copy from
+        - request (Dict[str, str]): custom filename and handle of the Dataframe where we will copy from
 
         Returns:
-        - Dataframe
+        - Dict[str, str]
         """
-        from ezyvet.data.logic.frame_generator import FrameGenerator
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        fg = FrameGenerator(log)
-        revenue_frame = fg.create_revenue_frame(df)
-
-        return revenue_frame
+        return {
+            "custom_filename": request["custom_filename"],
+            "handle": retrieve_frame_store().map_chunks(
+                request["handle"], VocPipeline(log).create_revenue_frame, "revenue"
+            ),
+        }
 
     @task
-    def create_cg_frame(df: DataFrame) -> DataFrame:
+    def create_cg_frame(request: Dict[str, str]) -> Dict[str, str]:
         """
         Creates cg frame based from the existing one
 
         Args:
-        - df (DataFrame): Dataframe where we will copy from
+        - request (Dict[str, str]): custom filename and handle of the Dataframe where we will copy from
 
         Returns:
-        - Dataframe
+        - Dict[str, str]
         """
-        from ezyvet.data.logic.frame_generator import FrameGenerator
-
-        fg = FrameGenerator(log)
-        cg_frame = fg.create_processed_frame(df)
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        return cg_frame
+        return {
+            "custom_filename": request["custom_filename"],
+            "handle": retrieve_frame_store().map_chunks(
+                request["handle"], VocPipeline(log).create_cg_frame, "cg"
+            ),
+        }
 
     @task
     def separate_valid_invalid_entries(
-        df: DataFrame,
-        valid: bool,
-        previousFailedRecords: DataFrame = DataFrame(),
-        custom_filename: str = EMPTY_STRING_VAL,
-    ) -> DataFrame:
+        request: Dict[str, str], previous_failed_handle: str = EMPTY_STRING_VAL
+    ) -> Dict[str, str]:
         """
-        Separates the valid from the invalid entries
+        Separates the valid from the invalid entries in a single pass.
+        The failed records ledger is updated with the invalid entries if the execution is not a custom request
+
+        Syntax:
+        {"custom_filename": CUSTOM FILENAME OR NaN, "valid": HANDLE OR NaN, "invalid": HANDLE OR NaN}
 
         Args:
-        - df (DataFrame): Dataframe where we will filter out the values
-        - valid (bool): Determines whether we are getting valid or invalid values
-        - previousFailedRecords (DataFrame): Dataframe that contains the previous failed records
-        - custom_filename (str): Contains the customfile name for requests. Returns NaN if empty
+        - request (Dict[str, str]): custom filename and handle of the Dataframe where we will filter out the values
+        - previous_failed_handle (str): handle of the Dataframe that contains the previous failed records
 
         Returns:
-        - DataFrame
+        - Dict[str, str]
         """
-        from ezyvet.data.logic.frame_generator import FrameGenerator
-
-        fg = FrameGenerator(log)
-        if valid:
-            # We should only use the previous frame if the custom_filename is empty
-            if custom_filename != EMPTY_STRING_VAL:
-                previousFrame = DataFrame()
-            else:
-                previousFrame = previousFailedRecords
-            result_frame = fg.separate_valid_frames(df, previousFrame)
-        else:
-            result_frame = fg.separate_invalid_frames(df)
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
+
+        store = retrieve_frame_store()
+        valid_handle, invalid_handle = VocPipeline(log).separate_valid_invalid_chunks(
+            store,
+            request["handle"],
+            store.load_frame(previous_failed_handle),
+            request["custom_filename"],
+        )
 
-        return result_frame
+        return {
+            "custom_filename": request["custom_filename"],
+            "valid": valid_handle,
+            "invalid": invalid_handle,
+        }
 
     @task
     def push_data_to_s3_bucket(
-        df: DataFrame, filename: str, custom_filename: str = EMPTY_STRING_VAL
-    ) -> Optional[str]:
+        request: Dict[str, str], filename: str, frame: str = "handle"
+    ) -> str:
         """
-        Generate CSV from Data frame and Upload it to S3
+        Generate the files from Data frame and Upload them to S3, appending one chunk at a time.
+        The formats are based from VOC_ARTIFACT_FORMATS, the key of the deliverable is returned
 
         Args:
-        - df (DataFrame): Dataframe to be converted to csv
+        - request (Dict[str, str]): custom filename and handles of the Dataframes to be converted to csv
         - filename (str): csv filename
-        - custom_filename (str):
-        - timestamp (float): return
+        - frame (str): key of the handle to be uploaded in the request
 
         Returns:
         - str
         """
-        from ezyvet.data.logic.file_handler import FileHandler
-        from ezyvet.data.models.custom_request import customrequest
-        from ezyvet.data.models.voc_variables import (
-            BUCKET,
-            DEFAULT_FILE_PATH,
-            INTEGRATION_NAME,
-        )
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        if df.empty:
-            log.info("Returning empty key")
-            return EMPTY_STRING_VAL
-
-        fh = FileHandler(log)
-
-        # build the filename
-        current_date = datetime.now().date()
-        if custom_filename == EMPTY_STRING_VAL:
-            dynamic_filename = fh.dynamic_filename_generator(filename, current_date)
-            dynamic_path = fh.dynamic_folderpath_generator(current_date)
-        else:
-            dynamic_filename = f"{filename}_{custom_filename}.csv"
-            dynamic_path = fh.dynamic_folderpath_generator(
-                current_date, customrequest.FOLDER
-            )
+        store = retrieve_frame_store()
 
-        key = (
-            f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{dynamic_path}/{dynamic_filename}"
+        return VocPipeline(log).push_chunks_to_s3_bucket(
+            lambda: store.iterate_chunks(request[frame]),
+            filename,
+            request["custom_filename"],
         )
-        path = f"s3://{BUCKET}/{key}"
-        fh.upload_frame_to_csv(path, df)
-
-        log.info(key)
-        return key
-
-    @task
-    def send_mail(
-        custom_filename: str = EMPTY_STRING_VAL,
-        custom_keys: List[str] = [EMPTY_STRING_VAL, EMPTY_STRING_VAL],
-        consolidated_keys: List[str] = [EMPTY_STRING_VAL, EMPTY_STRING_VAL],
-        failed_key: str = EMPTY_STRING_VAL,
-    ) -> None:
-        """
-        Send mail
-
-        Args:
-        - custom_filename (str): contains the custom file name if there is a new requested file
-        - custom_keys (List[str]): contains the keys for the recently uploaded csv
-        - consolidated_keys (List[str]): contains the keys for consolidated csv
-        - failed_key (str): contains the key for the failed records csv
-
-        Returns:
-        - None
-        """
-        from ezyvet.data.logic.notifier import IntegrationNotifier
-
-        if custom_filename != EMPTY_STRING_VAL:
-            key_list = custom_keys
-        else:
-            key_list = consolidated_keys
-
-        iNotify = IntegrationNotifier(log)
-
-        # capture empty keys
-        if key_list[0] != EMPTY_STRING_VAL:
-            final_cg_key = key_list[0]
-        else:
-            final_cg_key = EMPTY_CG_VAL
-
-        if key_list[1] != EMPTY_STRING_VAL:
-            final_rev_key = key_list[1]
-        else:
-            final_rev_key = EMPTY_REV_VAL
-
-        iNotify.notify_holders([final_cg_key, final_rev_key], custom_filename)
-
-        # send the failed list email as well
-        if failed_key != EMPTY_STRING_VAL:
-            iNotify.notify_holders([failed_key], custom_filename, False, True)
 
     @task
     def consolidate_cg_records(
-        is_import: bool = True, custom_filename: str = EMPTY_STRING_VAL
+        is_import: bool, raw_requests: List[Dict[str, str]]
     ) -> str:
         """
-        Consolidates the records for previous days to a single file and upload it to s3
+        Consolidates the records for previous days to a single file and upload it to s3.
+        Skipped for custom requests and if there were no records
 
         Args:
         - is_import (bool): Flag whether to consolidate cgimport or revenue file
-        - custom_filename (str): used to determine whether we should skip the task
+        - raw_requests (List[Dict[str, str]]): custom filename and handle of the records of each request
 
         Returns:
         - str
         """
-        from ezyvet.data.logic.file_handler import FileHandler
-        from ezyvet.data.models.voc_variables import (
-            BUCKET,
-            CONSOLIDATED_FOLDER_NAME,
-            DEFAULT_FILE_PATH,
-            DUPLICATED_CONSOLIDATED_COLUMNS,
-            INTEGRATION_NAME,
-            VOC_REVENUE_EXPORT,
-        )
-
-        # sanity check to skip task if we have a custom filename
-        if custom_filename != EMPTY_STRING_VAL:
-            return EMPTY_STRING_VAL
-
-        current_date = datetime.now()
-        current_day = current_date.weekday()
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        # 1 is tuesday and 3 is thursday
-        if current_day != 1 and current_day != 3:
-            log.info("Won't consolidate records, date is neither tuesday nor thursday")
-            log.info(current_day)
-            log.info(current_date)
+        if raw_requests[0]["handle"] == EMPTY_STRING_VAL:
             return EMPTY_STRING_VAL
 
-        fh = FileHandler(log)
-
-        if is_import:
-            prefix = FILENAME_CG
-            column_duplicate_filter = DUPLICATED_CONSOLIDATED_COLUMNS
-        else:
-            prefix = FILENAME_REV
-            column_duplicate_filter = VOC_REVENUE_EXPORT
-
-        finalised_frame = fh.consolidate_dataframe(
-            current_day, column_duplicate_filter, prefix, [], current_date
+        return VocPipeline(log).consolidate_cg_records(
+            is_import, raw_requests[0]["custom_filename"]
         )
 
-        # upload the dataframe
-        upload_folder = fh.dynamic_folderpath_generator(
-            current_date.date(), CONSOLIDATED_FOLDER_NAME
-        )
-        upload_filename = fh.dynamic_filename_generator(prefix, current_date.date())
-        upload_key = (
-            f"{DEFAULT_FILE_PATH}/{INTEGRATION_NAME}/{upload_folder}/{upload_filename}"
-        )
-        upload_path = f"s3://{BUCKET}/{upload_key}"
-        fh.upload_frame_to_csv(upload_path, finalised_frame)
-
-        return upload_key
-
-    @task.branch(task_id="check_skipped_mail")
-    def check_skipped_mail(Value) -> str:
+    @task
+    def send_mail(
+        raw_requests: List[Dict[str, str]],
+        cg_keys: List[str],
+        rev_keys: List[str],
+        failed_keys: List[str],
+        consolidated_keys: List[str] = [EMPTY_STRING_VAL, EMPTY_STRING_VAL],
+    ) -> None:
         """
-        Checks if the value is not empty.
-        Stops the pipeline if it fails the check
+        Send mail for each request. The skipped mail is sent for the requests without records
+        and no mail is sent if there are no files to be sent
 
         Args:
-        - Value (object): Object to check if it is not empty
+        - raw_requests (List[Dict[str, str]]): custom filename and handle of the records of each request
+        - cg_keys (List[str]): contains the keys for the recently uploaded cg csv of each request
+        - rev_keys (List[str]): contains the keys for the recently uploaded revenue csv of each request
+        - failed_keys (List[str]): contains the keys for the failed records csv of each request
+        - consolidated_keys (List[str]): contains the keys for consolidated csv
 
         Returns:
-        - str
-        """
-        if Value is not None:
-            return "duplicate_sanity_check"
-        else:
-            return "send_skipped_mail"
-
-    @task.branch(task_id="check_send_mail")
-    def check_send_mail(custom_filename: str, consolidated_keys: List[str]) -> str:
+        - None
         """
-        Checks if the value is not empty.
-        Stops the pipeline if it fails the check
+        from ezyvet.data.logic.voc_pipeline import VocPipeline
 
-        Args:
-        - Value (object): Object to check if it is not empty
+        pipeline = VocPipeline(log)
 
-        Returns:
-        - str
-        """
-        if (
-            custom_filename == EMPTY_STRING_VAL
-            and consolidated_keys[0] == EMPTY_STRING_VAL
-            and consolidated_keys[1] == EMPTY_STRING_VAL
+        # the mapped keys are in the order of the requests
+        for request, cg_key, rev_key, failed_key in zip(
+            raw_requests, cg_keys, rev_keys, failed_keys
         ):
-            return None
-        else:
-            return "send_mail"
+            custom_filename = request["custom_filename"]
 
-    @task
-    def send_skipped_mail() -> None:
+            if request["handle"] == EMPTY_STRING_VAL:
+                pipeline.send_skipped_mail()
+            elif pipeline.check_send_mail(custom_filename, consolidated_keys):
+                pipeline.send_mail(
+                    custom_filename, [cg_key, rev_key], consolidated_keys, failed_key
+                )
+
+    @task(trigger_rule="none_failed")
+    def cleanup_frame_store() -> None:
         """
-        Sends the skipped pipeline mail
+        Removes the frames passed between the tasks of the run and the expired frames of the failed runs.
+        Runs once every task is done or skipped, failed runs keep their frames so their tasks can be retried
 
         Returns:
         - None
         """
-        from ezyvet.data.logic.notifier import IntegrationNotifier
+        retrieve_frame_store().cleanup()
 
-        iNotify = IntegrationNotifier(log)
-        iNotify.notify_holders([], EMPTY_STRING_VAL, True)
+    # run the whole pipeline in a single task unless it is disabled
+    mode_op = check_execution_mode()
+    fused = run_fused_pipeline()
 
-    # check if all custom files have been created
-    custom_filename = return_open_custom_filename()
+    # every open custom request is processed in the run
+    custom_filenames = return_open_custom_filenames()
 
     # load the previous failed frame is possible
-    previous_failed_frame = read_previous_failed_records_from_s3(custom_filename)
-
-    # create and populate the base frame
-    raw_dataframe = read_snowflake_to_object(previous_failed_frame, custom_filename)
+    previous_failed_frame = read_previous_failed_records_from_s3(custom_filenames)
 
-    branch_op = check_skipped_mail(raw_dataframe)
+    # create and populate the base frame of each request, overlapping requests are read once
+    raw_requests = read_snowflake_to_object(previous_failed_frame, custom_filenames)
 
-    # send skipped mail if possible
-    skipped = send_skipped_mail()
-
-    # sanity check the duplicates if they have been removed in the list
-    checked_dataframe = duplicate_sanity_check(raw_dataframe)
-
-    # logic when we can process the data
-    base_frame = process_computed_data(checked_dataframe)
+    # the stages fan out over the requests, requests without records pass the NaN handle through
+    checked_requests = duplicate_sanity_check.expand(request=raw_requests)
+    base_requests = process_computed_data.expand(request=checked_requests)
 
     # create the frames to be uploaded base from the frame generated previously
-    revenue_dataframe = create_revenue_frame(base_frame)
-    processed_dataframe = create_cg_frame(base_frame)
+    revenue_requests = create_revenue_frame.expand(request=base_requests)
+    processed_requests = create_cg_frame.expand(request=base_requests)
 
     # separate the processed frame between valid and invalid entries
-    valid_frame = separate_valid_invalid_entries(
-        processed_dataframe, True, previous_failed_frame, custom_filename
-    )
-    invalid_frame = separate_valid_invalid_entries(processed_dataframe, False)
+    separated_requests = separate_valid_invalid_entries.partial(
+        previous_failed_handle=previous_failed_frame
+    ).expand(request=processed_requests)
 
     # push the frames to s3
-    rev_key = push_data_to_s3_bucket(revenue_dataframe, FILENAME_REV, custom_filename)
-    cg_key = push_data_to_s3_bucket(valid_frame, FILENAME_CG, custom_filename)
-    failed_key = push_data_to_s3_bucket(invalid_frame, FILENAME_FAILED, custom_filename)
-
-    consolidated_cgimport_records = consolidate_cg_records(True, custom_filename)
-    consolidated_cgrevenue_records = consolidate_cg_records(False, custom_filename)
-
-    branch_send_op = check_send_mail(
-        custom_filename, [consolidated_cgimport_records, consolidated_cgrevenue_records]
+    rev_keys = push_data_to_s3_bucket.partial(filename=FILENAME_REV).expand(
+        request=revenue_requests
+    )
+    cg_keys = push_data_to_s3_bucket.partial(filename=FILENAME_CG, frame="valid").expand(
+        request=separated_requests
     )
+    failed_keys = push_data_to_s3_bucket.partial(
+        filename=FILENAME_FAILED, frame="invalid"
+    ).expand(request=separated_requests)
+
+    consolidated_cgimport_records = consolidate_cg_records(True, raw_requests)
+    consolidated_cgrevenue_records = consolidate_cg_records(False, raw_requests)
 
     notif_mail = send_mail(
-        custom_filename,
-        [cg_key, rev_key],
+        raw_requests,
+        cg_keys,
+        rev_keys,
+        failed_keys,
         [consolidated_cgimport_records, consolidated_cgrevenue_records],
-        failed_key,
     )
 
     # setup dependencies
-    raw_dataframe >> branch_op >> checked_dataframe
-    branch_op >> skipped
-    cg_key >> consolidated_cgimport_records
-    rev_key >> consolidated_cgrevenue_records
-    branch_send_op >> notif_mail
+    mode_op >> [fused, custom_filenames]
+    cg_keys >> consolidated_cgimport_records
+    rev_keys >> consolidated_cgrevenue_records
+    [fused, notif_mail] >> cleanup_frame_store()
 
 
 voc_integration()